@@ -0,0 +1,36 @@
+from enum import Enum
+from typing import Any
+
+class EPaxosMessageType(Enum):
+    PRE_ACCEPT = 1
+    PRE_ACCEPT_OK = 2
+    SLOW_ACCEPT = 3
+    SLOW_ACCEPT_OK = 4
+    COMMIT = 5
+
+class EPaxosMessage:
+    def __init__(
+        self,
+        from_ip: str,
+        to_ip: str,
+        message_type: EPaxosMessageType,
+        instance: str,
+        message_content: Any,
+    ):
+        self.from_ip = from_ip
+        self.to_ip = to_ip
+        self.message_type = message_type
+
+        # Instancja "replika.slot" - każda replika ma własną przestrzeń instancji.
+        self.instance = instance
+        # {"command": str, "seq": int, "deps": [[replika, slot], ...]}
+        self.message_content = message_content
+
+    def to_dict(self) -> dict:
+        return {
+            "from_ip": self.from_ip,
+            "to_ip": self.to_ip,
+            "message_type": self.message_type.name,
+            "instance": self.instance,
+            "message_content": self.message_content,
+        }
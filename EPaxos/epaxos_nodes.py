@@ -0,0 +1,384 @@
+import os
+import sys
+import time
+from datetime import datetime
+from enum import IntEnum
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from account_state import AccountStore
+from history import HistoryIndex
+from operations import operation_effects
+from quorum import epaxos_fast_quorum
+from epaxos_messages import EPaxosMessage, EPaxosMessageType
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
+
+InstanceId = Tuple[int, int]
+NO_EFFECTS: Tuple[FrozenSet[str], FrozenSet[str]] = (frozenset(), frozenset())
+
+class Status(IntEnum):
+    PRE_ACCEPTED = 1
+    ACCEPTED = 2
+    COMMITTED = 3
+    EXECUTED = 4
+
+@dataclass
+class Instance:
+    command: str
+    seq: int
+    deps: Set[InstanceId]
+    status: Status
+
+@dataclass
+class LeaderState:
+    """Lider instancji (replika, która przyjęła operację) zbiera odpowiedzi PRE_ACCEPT_OK, a w razie różnic SLOW_ACCEPT_OK."""
+    targets: List[str]
+    deadline: float
+    seq: int
+    deps: FrozenSet[InstanceId]
+    replies: Dict[str, Tuple[int, FrozenSet[InstanceId]]] = field(default_factory=dict)
+    accept_oks: Set[str] = field(default_factory=set)
+    slow: bool = False
+
+def instance_str(instance: InstanceId) -> str:
+    return f"{instance[0]}.{instance[1]}"
+
+def parse_instance(instance: Any) -> InstanceId:
+    replica, slot = str(instance).split(".")
+    return int(replica), int(slot)
+
+class Log:
+    """Kolejność wykonania instancji na tej replice - operacje przemienne mogą się w niej różnić między replikami."""
+
+    def __init__(self) -> None:
+        self._records: List[Tuple[int, int, int, float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def append(self, instance: InstanceId, seq: int, message: str, timestamp: datetime) -> None:
+        self._records.append((instance[0], instance[1], seq, timestamp.timestamp(), message))
+
+    def entry(self, index: int) -> dict:
+        replica, slot, seq, ts, message = self._records[index]
+        return {
+            "instance": f"{replica}.{slot}",
+            "seq": seq,
+            "timestamp": str(datetime.fromtimestamp(ts)),
+            "message": message,
+        }
+
+    @property
+    def entries(self) -> List[dict]:
+        return [self.entry(i) for i in range(len(self._records))]
+
+class Node:
+    """
+    Replika EPaxosa: każda replika jest liderem własnych instancji, więc operacje przyjmuje każdy węzeł.
+    Instancja dostaje zależności (kolidujące instancje) i seq; gdy kworum szybkie zwróci te same
+    atrybuty, jest zatwierdzana po jednym RTT, w przeciwnym razie po dodatkowej rundzie SLOW_ACCEPT.
+    Wykonanie: silnie spójne składowe grafu zależności od liści, wewnątrz składowej wg (seq, instancja).
+    Bez odzyskiwania instancji po awarii lidera (Explicit Prepare).
+    """
+
+    def __init__(self, ip_addr: str, up_to_date: bool, ID: int, logger: Optional[Callable[[str, str], None]] = None) -> None:
+        self.ID = ID
+        self.ip_addr: str = ip_addr
+        self.logger = logger
+
+        self.accounts: AccountStore = AccountStore({'KONTO_A': 10000.00, 'KONTO_B': 5000.00})
+
+        self.instances: Dict[InstanceId, Instance] = {}
+        self.next_slot = 0
+        # Ostatnia instancja każdej repliki obciążająca / uznająca dane konto - źródło zależności.
+        self._last_debit: Dict[str, Dict[int, InstanceId]] = {}
+        self._last_credit: Dict[str, Dict[int, InstanceId]] = {}
+        self._committed: Set[InstanceId] = set()
+        # Wykonanie przyrostowe: zatwierdzone instancje czekające na daną zależność (odwrotny indeks)
+        # oraz instancje, które przechodnio czekają na niezatwierdzoną instancję (i odwrotnie).
+        self._dependents: Dict[InstanceId, Set[InstanceId]] = {}
+        self._blocked: Dict[InstanceId, InstanceId] = {}
+        self._blocked_by: Dict[InstanceId, Set[InstanceId]] = {}
+
+        self.leading: Dict[InstanceId, LeaderState] = {}
+        self.slow_timeout = 0.2
+        self.fast_commits = 0
+        self.slow_commits = 0
+        self.on_executed: Optional[Callable[[InstanceId], None]] = None
+        self._now = time.monotonic
+
+        self.log = Log()
+        self.history = HistoryIndex(self.accounts)
+
+    def log_event(self, message: str, level: str = "INFO"):
+        if self.logger:
+            self.logger(message, level)
+        else:
+            print(f"[{level}] {message}")
+
+    # --- Atrybuty instancji ---
+    def _attributes(self, command: str, leader: int) -> Tuple[int, Set[InstanceId]]:
+        """Zależności: per konto ostatnie kolidujące instancje każdej repliki; seq = 1 + max seq zależności."""
+        debit, credit = operation_effects(command) or NO_EFFECTS
+        deps: Set[InstanceId] = set()
+        for account in debit | credit:
+            deps.update(self._last_debit.get(account, {}).values())
+        for account in debit:
+            deps.update(self._last_credit.get(account, {}).values())
+        # Uznania jednej repliki na tym samym koncie tworzą łańcuch, więc "ostatnie uznanie repliki"
+        # przechodnio obejmuje wszystkie jej wcześniejsze uznania, od których zależy obciążenie.
+        for account in credit:
+            own = self._last_credit.get(account, {}).get(leader)
+            if own is not None:
+                deps.add(own)
+        seq = 1 + max((self.instances[d].seq for d in deps if d in self.instances), default=0)
+        return seq, deps
+
+    def _record(self, instance: InstanceId, command: str, seq: int, deps: Iterable[InstanceId], status: Status) -> Instance:
+        inst = self.instances.get(instance)
+        if inst is None:
+            inst = self.instances[instance] = Instance(command, seq, set(deps), status)
+            debit, credit = operation_effects(command) or NO_EFFECTS
+            for accounts, index in ((debit, self._last_debit), (credit, self._last_credit)):
+                for account in accounts:
+                    latest = index.setdefault(account, {})
+                    if latest.get(instance[0], (instance[0], -1))[1] < instance[1]:
+                        latest[instance[0]] = instance
+        elif inst.status < Status.COMMITTED and status >= inst.status:
+            inst.seq, inst.deps, inst.status = seq, set(deps), status
+        inst.deps.discard(instance)
+        if inst.status == Status.COMMITTED and instance not in self._committed:
+            self._committed.add(instance)
+            for dep in inst.deps:
+                known = self.instances.get(dep)
+                if known is None or known.status < Status.EXECUTED:
+                    self._dependents.setdefault(dep, set()).add(instance)
+            # Instancje zablokowane na tej mogą już iść dalej - sprawdzi je kaskada po jej wykonaniu.
+            for waiting in self._blocked_by.pop(instance, ()):
+                self._blocked.pop(waiting, None)
+        return inst
+
+    # --- Lider instancji ---
+    def propose(self, message_pool: List[EPaxosMessage], nodes_ips: Iterable[str], command: str) -> InstanceId:
+        instance = (self.ID, self.next_slot)
+        self.next_slot += 1
+        seq, deps = self._attributes(command, self.ID)
+        self._record(instance, command, seq, deps, Status.PRE_ACCEPTED)
+        others = [ip for ip in nodes_ips if ip != self.ip_addr]
+        state = self.leading[instance] = LeaderState(others, self._now() + self.slow_timeout, seq, frozenset(deps))
+        if not others:
+            self._commit(message_pool, instance, state)
+            return instance
+        self.send_message(message_pool, others, EPaxosMessageType.PRE_ACCEPT, instance, command, seq, deps)
+        return instance
+
+    def _fast_quorum_reached(self, state: LeaderState) -> bool:
+        return len(state.replies) + 1 >= epaxos_fast_quorum(len(state.targets) + 1)
+
+    def _finish_pre_accept(self, message_pool: List[EPaxosMessage], instance: InstanceId, state: LeaderState) -> None:
+        if all(seq == state.seq and deps == state.deps for seq, deps in state.replies.values()):
+            self.fast_commits += 1
+            self._commit(message_pool, instance, state)
+            return
+        self._start_slow(message_pool, instance, state)
+
+    def _start_slow(self, message_pool: List[EPaxosMessage], instance: InstanceId, state: LeaderState) -> None:
+        """Repliki widziały inne kolidujące instancje - sumujemy atrybuty i utrwalamy je w większości."""
+        state.slow = True
+        state.seq = max([state.seq] + [seq for seq, _ in state.replies.values()])
+        state.deps = frozenset(state.deps.union(*(deps for _, deps in state.replies.values())))
+        command = self.instances[instance].command
+        self._record(instance, command, state.seq, state.deps, Status.ACCEPTED)
+        self.send_message(message_pool, state.targets, EPaxosMessageType.SLOW_ACCEPT, instance, command, state.seq, state.deps)
+
+    def _commit(self, message_pool: List[EPaxosMessage], instance: InstanceId, state: LeaderState) -> None:
+        self.leading.pop(instance, None)
+        if state.slow:
+            self.slow_commits += 1
+        command = self.instances[instance].command
+        self._record(instance, command, state.seq, state.deps, Status.COMMITTED)
+        self.log_event(f"Committed {instance_str(instance)} ({'slow' if state.slow else 'fast'} path): {command}", "CONSENSUS")
+        self.send_message(message_pool, state.targets, EPaxosMessageType.COMMIT, instance, command, state.seq, state.deps)
+        self.execute_committed(instance)
+
+    def expire(self, message_pool: List[EPaxosMessage], quorum: int) -> None:
+        """Wywoływane cyklicznie: bez kworum szybkiego po slow_timeout lider przechodzi na ścieżkę wolną z większością."""
+        now = self._now()
+        for instance, state in list(self.leading.items()):
+            if state.slow or now < state.deadline: continue
+            if len(state.replies) + 1 >= quorum:
+                self.log_event(f"Fast quorum timed out for {instance_str(instance)}, using slow path", "WARNING")
+                self._start_slow(message_pool, instance, state)
+
+    # --- Wykonanie ---
+    def is_executed(self, instance: InstanceId) -> bool:
+        inst = self.instances.get(instance)
+        return inst is not None and inst.status == Status.EXECUTED
+
+    def execute_committed(self, instance: Optional[InstanceId] = None) -> int:
+        """
+        Wykonuje to, co odblokowało zatwierdzenie `instance`: graf przeglądany jest tylko od niej, a po wykonaniu
+        każdej instancji - od jej zatwierdzonych zależnych. Bez argumentu sprawdza wszystkie zatwierdzone.
+        """
+        pending = sorted(self._committed) if instance is None else [instance]
+        executed = 0
+        while pending:
+            root = pending.pop(0)
+            if root not in self._committed or root in self._blocked: continue
+            for done in self._execute_from(root):
+                executed += 1
+                pending.extend(sorted(d for d in self._dependents.pop(done, ()) if d in self._committed))
+        return executed
+
+    def _block(self, path: Iterable[InstanceId], missing: InstanceId) -> None:
+        for waiting in path:
+            self._blocked[waiting] = missing
+            self._blocked_by.setdefault(missing, set()).add(waiting)
+
+    def _execute_from(self, root: InstanceId) -> List[InstanceId]:
+        """
+        Iteracyjny Tarjan od `root`. Zależność niezatwierdzona (albo już na taką czekająca) zatrzymuje przegląd
+        i blokuje całą bieżącą ścieżkę; składowe domknięte przed nią są wykonywane. Zwraca wykonane instancje.
+        """
+        index: Dict[InstanceId, int] = {root: 0}
+        low: Dict[InstanceId, int] = {root: 0}
+        stack: List[InstanceId] = [root]
+        on_stack: Set[InstanceId] = {root}
+        components: List[List[InstanceId]] = []
+        work = [(root, iter(sorted(self.instances[root].deps)))]
+        while work:
+            node, deps = work[-1]
+            descended = False
+            for dep in deps:
+                inst = self.instances.get(dep)
+                if inst is None or inst.status < Status.COMMITTED or dep in self._blocked:
+                    self._block([n for n, _ in work], self._blocked.get(dep, dep))
+                    work = []
+                    break
+                if inst.status == Status.EXECUTED:
+                    continue
+                if dep not in index:
+                    index[dep] = low[dep] = len(index)
+                    stack.append(dep)
+                    on_stack.add(dep)
+                    work.append((dep, iter(sorted(inst.deps))))
+                    descended = True
+                    break
+                if dep in on_stack:
+                    low[node] = min(low[node], index[dep])
+            if descended or not work:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+        # Tarjan zwraca składowe od liści grafu zależności - to jest kolejność wykonania.
+        executed = []
+        for component in components:
+            for instance in sorted(component, key=lambda i: (self.instances[i].seq, i)):
+                self._apply(instance)
+                executed.append(instance)
+        return executed
+
+    def _apply(self, instance: InstanceId) -> None:
+        inst = self.instances[instance]
+        self.execute_transaction(inst.command)
+        inst.status = Status.EXECUTED
+        self._committed.discard(instance)
+        self.log.append(instance, inst.seq, inst.command, datetime.now())
+        self.history.record(len(self.log) - 1, inst.command, self.accounts)
+        if self.on_executed:
+            self.on_executed(instance)
+
+    def execute_transaction(self, transaction_data: str):
+        parts = [p.strip() for p in transaction_data.split(';')]
+        if not parts: return False
+
+        tx_type = parts[0].upper()
+
+        if tx_type == "TRANSFER" and len(parts) >= 4:
+            source, dest, amount = parts[1], parts[2], float(parts[3])
+            if self.accounts.get(source, 0.0) >= amount:
+                self.accounts[source] -= amount
+                self.accounts[dest] = self.accounts.get(dest, 0.0) + amount
+                self.log_event(f"Transferred {amount} {source}->{dest}", "INFO")
+                return True
+            self.log_event(f"Insufficient funds on {source}", "ERROR")
+            return False
+
+        if tx_type == "DEPOSIT" and len(parts) >= 3:
+            account, amount = parts[1], float(parts[2])
+            self.accounts[account] = self.accounts.get(account, 0.0) + amount
+            self.log_event(f"Deposited {amount} to {account}", "INFO")
+            return True
+
+        if tx_type == "WITHDRAW" and len(parts) >= 3:
+            account, amount = parts[1], float(parts[2])
+            if self.accounts.get(account, 0.0) >= amount:
+                self.accounts[account] -= amount
+                self.log_event(f"Withdrawn {amount} from {account}", "INFO")
+                return True
+            self.log_event(f"Insufficient funds on {account}", "ERROR")
+            return False
+        return False
+
+    # --- Sieć ---
+    def send_message(self, message_pool: List[EPaxosMessage], target_ip: Iterable[str], message_type: EPaxosMessageType,
+                     instance: InstanceId, command: str, seq: int, deps: Iterable[InstanceId]) -> None:
+        content = {"command": command, "seq": seq, "deps": [list(d) for d in sorted(deps)]}
+        for ip in target_ip:
+            message_pool.append(EPaxosMessage(self.ip_addr, ip, message_type, instance_str(instance), content))
+
+    def receive_message(self, message: EPaxosMessage, message_pool: List[EPaxosMessage], quorum: int, nodes_ips: Iterable[str]) -> None:
+        mtype = message.message_type
+        instance = parse_instance(message.instance)
+        content = message.message_content
+        command, seq = content.get("command", ""), int(content.get("seq", 0))
+        deps = frozenset(tuple(d) for d in content.get("deps", []))
+
+        if mtype == EPaxosMessageType.PRE_ACCEPT:
+            known = self.instances.get(instance)
+            if known is not None and known.status >= Status.ACCEPTED: return
+            local_seq, local_deps = self._attributes(command, instance[0])
+            local_deps.discard(instance)
+            seq, deps = max(seq, local_seq), deps | local_deps
+            self._record(instance, command, seq, deps, Status.PRE_ACCEPTED)
+            self.send_message(message_pool, [message.from_ip], EPaxosMessageType.PRE_ACCEPT_OK, instance, command, seq, deps)
+            return
+
+        if mtype == EPaxosMessageType.PRE_ACCEPT_OK:
+            state = self.leading.get(instance)
+            if state is None or state.slow: return
+            state.replies[message.from_ip] = (seq, deps)
+            if self._fast_quorum_reached(state):
+                self._finish_pre_accept(message_pool, instance, state)
+            return
+
+        if mtype == EPaxosMessageType.SLOW_ACCEPT:
+            known = self.instances.get(instance)
+            if known is not None and known.status >= Status.COMMITTED: return
+            self._record(instance, command, seq, deps, Status.ACCEPTED)
+            self.send_message(message_pool, [message.from_ip], EPaxosMessageType.SLOW_ACCEPT_OK, instance, command, seq, deps)
+            return
+
+        if mtype == EPaxosMessageType.SLOW_ACCEPT_OK:
+            state = self.leading.get(instance)
+            if state is None or not state.slow: return
+            state.accept_oks.add(message.from_ip)
+            if len(state.accept_oks) + 1 >= quorum:
+                self._commit(message_pool, instance, state)
+            return
+
+        if mtype == EPaxosMessageType.COMMIT:
+            self._record(instance, command, seq, deps, Status.COMMITTED)
+            self.execute_committed(instance)
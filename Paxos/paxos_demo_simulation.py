@@ -5,6 +5,7 @@ from typing import Dict, List
 
 from paxos_nodes import Node
 from paxos_messages import PaxosMessage, PaxosMessageType
+from paxos_locks import with_tx_id
 
 def ips(nodes):
     return [n.ip_addr for n in nodes]
@@ -28,7 +29,7 @@ def show_paxos_state(label, nodes):
         # podsumowanie „ile razy” dana wartość była policzona w fazie ACCEPTED
         if n.accepted_phase_values:
             summary = ", ".join(
-                [f"#{k}:({v.count})" for k, v in sorted(n.accepted_phase_values.items())]
+                [f"#{k[0][0]}.{k[0][1]}:{v!r}({n.accepted_votes.count(k)})" for k, v in sorted(n.accepted_phase_values.items())]
             )
             print(f"  accepted_phase_values: {summary}")
         else:
@@ -159,8 +160,9 @@ def run_concurrency_conflict(nodes):
     nodes_ips = ips(nodes)
 
     # dwie kolizyjne transakcje na tym samym koncie
-    tx_A = "WITHDRAW;KONTO_A;100;TX_ID:TX_A_1"
-    tx_B = "WITHDRAW;KONTO_A;200;TX_ID:TX_B_1"
+    tx_A = with_tx_id("WITHDRAW;KONTO_A;100", A.ID)
+    tx_B = with_tx_id("WITHDRAW;KONTO_A;200", B.ID)
+    tx_id_A = tx_A.split("TX_ID:", 1)[1]
 
     print("\n--- KROK 1: Obaj propozytorzy (A i B) wysyłają PREPARE ---")
     
@@ -180,8 +182,8 @@ def run_concurrency_conflict(nodes):
     
     print("\n--- KROK 2: Symulacja Zakleszczenia Zasobów (Resource Lock) ---")
     
-    nodes[2].locked_accounts["KONTO_A"] = "TX_A_1" 
-    print(f"[SETUP] Node C ma zablokowane KONTO_A przez TX_A_1")
+    nodes[2].try_lock_all(tx_id_A, ["KONTO_A"])
+    print(f"[SETUP] Node C ma zablokowane KONTO_A przez {tx_id_A}")
 
     msg_accept = PaxosMessage(
         from_ip=B.ip_addr, 
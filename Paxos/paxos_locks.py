@@ -0,0 +1,115 @@
+"""
+Tablica blokad kont dla transakcji Paxosa (wait-die).
+
+Blokada powstaje przy ACCEPT transakcji z TX_ID i trwa do decyzji (albo wygaśnięcia dzierżawy).
+Starsza transakcja czeka w kolejce FIFO konta, młodsza ginie od razu - oczekiwanie idzie tylko
+od starszej do młodszej, więc cykl (zakleszczenie) nie może powstać. Transakcja ponawiana zachowuje
+swój TX_ID, czyli wiek, więc w końcu staje się najstarszą i nie głoduje.
+"""
+import re
+import time
+from collections import deque
+from enum import Enum
+from typing import Callable, Deque, Dict, Iterable, List, Set, Tuple
+
+_TIMESTAMP = re.compile(r"\d+")
+
+
+class LockOutcome(Enum):
+    GRANTED = 1
+    WAIT = 2
+    DIE = 3
+
+
+def new_tx_id(node_id: int) -> str:
+    """TX_ID uporządkowany czasem utworzenia: '<znacznik ns>-<id węzła>'."""
+    return f"{time.time_ns()}-{node_id}"
+
+
+def with_tx_id(operation: str, node_id: int) -> str:
+    """Operacja z TX_ID: istniejący zostaje, brakujący jest generowany przez new_tx_id (wiek = chwila zgłoszenia)."""
+    if "TX_ID:" in operation:
+        return operation
+    return f"{operation};TX_ID:{new_tx_id(node_id)}"
+
+
+def tx_age(tx_id: str) -> Tuple[int, int, str]:
+    """Klucz wieku (mniejszy = starsza): numeryczny prefiks porównywany jak liczba, nie jak napis."""
+    match = _TIMESTAMP.match(tx_id)
+    if match:
+        return (0, int(match.group()), tx_id)
+    return (1, 0, tx_id)
+
+
+class LockTable:
+    def __init__(self, ttl: float = 2.0, now: Callable[[], float] = time.monotonic) -> None:
+        self.ttl = ttl
+        self._now = now
+        # konto -> transakcja trzymająca blokadę
+        self.holders: Dict[str, str] = {}
+        # konto -> transakcje czekające (FIFO); transakcja czeka na wszystkie swoje konta naraz
+        self.queues: Dict[str, Deque[str]] = {}
+        self.waiting: Dict[str, List[str]] = {}
+        self.leases: Dict[str, float] = {}
+
+    def holds(self, tx_id: str) -> bool:
+        return tx_id in self.leases
+
+    def rivals(self, tx_id: str, accounts: Iterable[str]) -> Set[str]:
+        """Transakcje trzymające konta albo stojące w ich kolejkach przed `tx_id`."""
+        rivals = set()
+        for account in accounts:
+            holder = self.holders.get(account)
+            if holder is not None and holder != tx_id:
+                rivals.add(holder)
+            rivals.update(t for t in self.queues.get(account, ()) if t != tx_id)
+        return rivals
+
+    def acquire(self, tx_id: str, accounts: Iterable[str]) -> LockOutcome:
+        accounts = sorted(set(accounts))
+        if tx_id in self.waiting:
+            return LockOutcome.WAIT
+        rivals = self.rivals(tx_id, accounts)
+        if not rivals:
+            for account in accounts:
+                self.holders[account] = tx_id
+            self.leases[tx_id] = self._now() + self.ttl
+            return LockOutcome.GRANTED
+        if any(tx_age(tx_id) > tx_age(rival) for rival in rivals):
+            return LockOutcome.DIE
+        self.waiting[tx_id] = accounts
+        for account in accounts:
+            self.queues.setdefault(account, deque()).append(tx_id)
+        return LockOutcome.WAIT
+
+    def release(self, tx_id: str) -> List[str]:
+        """Zwalnia blokady (lub miejsce w kolejce) transakcji; zwraca transakcje, które właśnie je dostały."""
+        self.leases.pop(tx_id, None)
+        for account in [a for a, holder in self.holders.items() if holder == tx_id]:
+            del self.holders[account]
+        for account in self.waiting.pop(tx_id, ()):
+            queue = self.queues[account]
+            queue.remove(tx_id)
+            if not queue: del self.queues[account]
+        return self._grant_waiting()
+
+    def expire(self) -> List[str]:
+        """Zwalnia blokady transakcji, których decyzja nie dotarła przed końcem dzierżawy."""
+        now = self._now()
+        granted = []
+        for tx_id in [t for t, expires in self.leases.items() if now >= expires]:
+            granted.extend(self.release(tx_id))
+        return granted
+
+    def _grant_waiting(self) -> List[str]:
+        granted = []
+        for tx_id, accounts in list(self.waiting.items()):
+            if all(account not in self.holders and self.queues[account][0] == tx_id for account in accounts):
+                del self.waiting[tx_id]
+                for account in accounts:
+                    self.queues[account].popleft()
+                    if not self.queues[account]: del self.queues[account]
+                    self.holders[account] = tx_id
+                self.leases[tx_id] = self._now() + self.ttl
+                granted.append(tx_id)
+        return granted
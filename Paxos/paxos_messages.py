@@ -6,6 +6,14 @@ class PaxosMessageType(Enum):
     PROMISE = 2
     ACCEPT = 3
     ACCEPTED = 4
+    DECIDED = 5
+    FAST_ACCEPT = 6
+    FAST_ACCEPTED = 7
+    FAST_COMMIT = 8
+    FAST_ABORT = 9
+    CATCHUP_REQUEST = 10
+    CATCHUP_REPLY = 11
+    ACCEPT_REJECT = 12
 
 class PaxosMessage:
     def __init__(
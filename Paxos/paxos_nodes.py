@@ -1,26 +1,123 @@
-import random
+import hashlib
+import os
+import sys
 import time
-from collections import defaultdict
+from bisect import bisect_left, bisect_right, insort
 from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from account_state import AccountStore
+from history import HistoryIndex
+from log_view import LogEntriesView
+from operations import commutes, operation_effects
+from quorum import QuorumCounter, fast_quorum
 from paxos_messages import PaxosMessage, PaxosMessageType
-from typing import Iterable, List, Optional, Tuple, Dict, Callable
-from dataclasses import dataclass
+from paxos_locks import LockOutcome, LockTable, tx_age
+from typing import Any, Iterable, List, Optional, Set, Tuple, Dict, Callable
+from dataclasses import dataclass, field
+
+RoundId = Tuple[int, int]
+AcceptKey = Tuple[RoundId, bytes]
+# Miejsce wpisu w kolejności wykonania wspólnej dla replik: decyzja (runda, 0, (0, 0)),
+# szybka operacja (runda `after` z FAST_COMMIT, 1, id operacji) - zaraz po rundzie, po której ją zatwierdzono.
+OrderKey = Tuple[RoundId, int, RoundId]
+
+@dataclass
+class PendingPhase:
+    """Faza wysłana w trybie oszczędnym tylko do części węzłów - po deadline idzie do reszty."""
+    message_type: PaxosMessageType
+    round_identifier: str
+    value: str
+    remaining: List[str]
+    deadline: float
+
+@dataclass
+class CatchUp:
+    """Synchronizacja learnera: decyzje z rundami > after od peers[0]; bez odpowiedzi do deadline - kolejny peer."""
+    after: RoundId
+    peers: List[str]
+    deadline: float = 0.0
+    # Zaczęta nie wyżej niż synced_through - po zakończeniu przesuwa synced_through.
+    from_synced: bool = False
+    learned: int = 0
+
+@dataclass
+class LockRetry:
+    """Transakcja propozytora, której rundę akceptorzy odrzucili (wait-die); wraca po decyzji blokujących albo po deadline."""
+    value: str
+    nodes_ips: List[str]
+    blockers: Set[str]
+    deadline: float
+
+@dataclass
+class AppliedBase:
+    """Stan po wpisach zwiniętych z _applied - od niego startuje przebudowa; decyzje rund <= key[0] już w nim są."""
+    key: OrderKey
+    accounts: Dict[str, float]
+    tx_ids: Dict[str, None]
+    log_length: int = 0
+
+@dataclass
+class FastProposal:
+    """Szybka operacja u koordynatora: głosy FAST_ACCEPTED zbierane do kworum szybkiego albo deadline."""
+    value: str
+    targets: List[str]
+    deadline: float
+    oks: Set[str] = field(default_factory=set)
+    rejects: Set[str] = field(default_factory=set)
+    after: RoundId = (0, 0)
 
 @dataclass
-class AcceptedValue:
-    value: str = ""
-    count: int = 0
+class FastEntry:
+    """Szybka operacja u akceptora: after=None do FAST_COMMIT, który ustawia jej miejsce w kolejności wykonania."""
+    value: str
+    expires: float
+    after: Optional[RoundId] = None
+
+def value_digest(value: str) -> bytes:
+    """Stałej długości skrót wartości - klucz stanu learnera zamiast całego stringa."""
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+
+def _timestamp_to_float(timestamp: Any) -> float:
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    return datetime.fromisoformat(str(timestamp)).timestamp()
 
 class Log:
+    """
+    Log zdecydowanych wartości. Wpis to krotka (runda, id_węzła, timestamp, wartość)
+    z timestampem jako float - bez dictów i stringów z datą na każdy wpis.
+    """
+
     def __init__(self) -> None:
-        self.entries: list[dict] = []
+        self._records: List[Tuple[int, int, float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @property
+    def entries(self) -> LogEntriesView:
+        return LogEntriesView(self)
 
     def append(self, request_number: Tuple[int,int], message:str, timestamp: datetime)-> None:
-        self.entries.append({
-            "request_number": request_number,
-            "timestamp": str(timestamp),
-            "message": message
-        })
+        self._records.append((request_number[0], request_number[1], _timestamp_to_float(timestamp), message))
+
+    def clear(self) -> None:
+        self._records.clear()
+
+    def truncate(self, length: int) -> None:
+        del self._records[length:]
+
+    def entry(self, index: int) -> dict:
+        round_num, node_id, ts, message = self._records[index]
+        return {
+            "request_number": (round_num, node_id),
+            "timestamp": str(datetime.fromtimestamp(ts)),
+            "message": message,
+        }
 
 class Node:
     def __init__(self, ip_addr: str, up_to_date: bool, ID: int, logger: Optional[Callable[[str, str], None]] = None) -> None:
@@ -28,8 +125,15 @@ class Node:
         self.ip_addr: str = ip_addr
         self.logger = logger
         
-        self.accounts: dict[str, float] = {'KONTO_A': 10000.00, 'KONTO_B': 5000.00}
-        self.locked_accounts: dict[str, str] = {}
+        self.initial_accounts: Dict[str, float] = {'KONTO_A': 10000.00, 'KONTO_B': 5000.00}
+        self.accounts: AccountStore = AccountStore(self.initial_accounts)
+        # Blokady kont transakcji z TX_ID: od ACCEPT do decyzji, wait-die z kolejkami FIFO.
+        self.locks = LockTable(now=lambda: self._now())
+        self._lock_waiters: Dict[str, Tuple[PaxosMessage, int, List[str]]] = {}
+        self._lock_retries: Dict[str, LockRetry] = {}
+        # Ostatnie wykonane TX_ID (kolejność wstawiania) - zabezpieczenie przed podwójnym wykonaniem, najwyżej tx_dedup_window.
+        self.applied_tx_ids: Dict[str, None] = {}
+        self.tx_dedup_window = 10000
         
         # --- Paxos State ---
         self._highest_promised_id = (0, 0)
@@ -37,13 +141,64 @@ class Node:
         self.accepted_value = ""
         self.proposer_round_id = (0, 0)
         self.accept_sent = False
-        self.promises_received = {}
+        self.promises_received: Dict[RoundId, Dict[str, str]] = {}
+        self.accept_rejects: Set[str] = set()
         self.message_content = ""
         
-        self.accepted_phase_values_id = 0
-        self.accepted_phase_values: defaultdict[int, AcceptedValue] = defaultdict(AcceptedValue)
+        # Stan learnera: (runda, skrót wartości) -> wartość; głosy ACCEPTED liczy accepted_votes.
+        # Zamknięte są tylko rundy z decided_values; runda niższa od decided_watermark, której kworum
+        # domknie się później, też zostaje zdecydowana. Watermark służy do sprzątania i wykrywania luk.
+        self.accepted_phase_values: Dict[AcceptKey, str] = {}
+        self.accepted_votes = QuorumCounter()
+        self.decided_watermark: RoundId = (0, 0)
+        self.undecided_rounds_limit = 1024
+        # Zdecydowane wartości rund - źródło dla learnerów, które nadrabiają (CATCHUP_REQUEST/CATCHUP_REPLY);
+        # decided_rounds trzyma te rundy rosnąco, więc odpowiedź nie sortuje całej historii.
+        self.decided_values: Dict[RoundId, str] = {}
+        self.decided_rounds: List[RoundId] = []
+        self.catchup: Optional[CatchUp] = None
+        self.catchup_batch = 64
+        self.catchup_timeout = 1.0
+        # Co catchup_interval kolejny peer dostaje pytanie o decyzje po synced_through - węzeł, który zgubił
+        # wszystkie wiadomości jakichś rund, nie ma innego sygnału luki.
+        self.catchup_interval = 2.0
+        self.synced_through: RoundId = (0, 0)
+        self._next_sync = 0.0
+        self._catchup_requests = 0
         
         self.log = Log()
+        self.history = HistoryIndex(self.accounts)
+        # Wykonane wpisy w kolejności kanonicznej: (klucz, numer wpisu, wartość, czas wykonania, czy trafił do logu).
+        # Po 2 * applied_window wpisach starsza połowa przechodzi do _base, a decyzje jej rund odpadają z decided_values
+        # (decided_floor); spóźniona decyzja sprzed _base staje zaraz za nim.
+        self._applied: List[Tuple[OrderKey, RoundId, str, datetime, bool]] = []
+        self._base = AppliedBase(((0, 0), 0, (0, 0)), dict(self.initial_accounts), {})
+        self.applied_window = 10000
+
+        self._now = time.monotonic
+        # Tryb oszczędny: PREPARE/ACCEPT tylko do najszybszego kworum (wg zmierzonej latencji),
+        # reszta dostaje fazę po thrifty_timeout, jeśli kworum nie odpowiedziało.
+        self.thrifty = False
+        self.thrifty_timeout = 0.2
+        self.peer_latency: Dict[str, float] = {}
+        self.pending_phase: Optional[PendingPhase] = None
+        self._phase_started: Dict[PaxosMessageType, Tuple[RoundId, float]] = {}
+        # Wyróżniony learner: ACCEPTED trafia tylko do propozytora, który rozsyła DECIDED.
+        self.distinguished_learner = False
+        # Flexible Paxos: rozmiary kworów faz 1 i 2 (None - kworum przekazane w receive_message).
+        self.phase1_quorum: Optional[int] = None
+        self.phase2_quorum: Optional[int] = None
+        # Szybka ścieżka dla operacji przemiennych: koordynator (dowolny węzeł) zatwierdza ją po jednym RTT,
+        # bez rundy Paxosa. Akceptor głosuje tylko na operacje przemienne ze wszystkim, co ma w toku;
+        # zatwierdzona operacja stoi w kolejności wykonania zaraz po rundzie `after` z FAST_COMMIT.
+        self.fast_timeout = 0.2
+        self.fast_pending_ttl = 2.0
+        self.fast_proposals: Dict[RoundId, FastProposal] = {}
+        self.fast_pending: Dict[RoundId, FastEntry] = {}
+        self._fast_seq = 0
+        self._deferred_decisions: List[Tuple[RoundId, str]] = []
+        self._blocked_accepts: List[Tuple[PaxosMessage, int, List[str]]] = []
+        self.on_fast_outcome: Optional[Callable[[RoundId, bool], None]] = None
 
     
     def log_event(self, message: str, level: str = "INFO"):
@@ -52,6 +207,17 @@ class Node:
         else:
             print(f"[{level}] {message}")
 
+    @property
+    def locked_accounts(self) -> Dict[str, str]:
+        return self.locks.holders
+
+    @property
+    def decided_floor(self) -> RoundId:
+        return self._base.key[0]
+
+    def _is_decided(self, round_id: RoundId) -> bool:
+        return round_id <= self.decided_floor or round_id in self.decided_values
+
     @property
     def highest_promised_id(self) -> Tuple[int, int]:
         return self._highest_promised_id
@@ -71,11 +237,23 @@ class Node:
     def reset_paxos_state(self) -> None:
         self.accepted_value = ""
         self.promises_received.clear()
+        self.accept_rejects.clear()
         self.message_content = ""
-        self.accepted_phase_values_id = 0
         self.accept_sent = False
-        self.accepted_phase_values.clear()
-        self.locked_accounts.clear()
+
+    def _collect_decided(self, decided_round: RoundId) -> None:
+        """Przesuwa watermark i usuwa stan learnera rund już zdecydowanych; pozostałe rundy dalej zbierają głosy."""
+        if decided_round > self.decided_watermark:
+            self.decided_watermark = decided_round
+        closed = lambda key: self._is_decided(key[0])
+        # Rundy poniżej watermarku bez decyzji (np. przegrane pojedynki propozytorów) - ponad limit odpadają najstarsze.
+        undecided = {key[0] for key in self.accepted_phase_values if key[0] < self.decided_watermark and not closed(key)}
+        excess = len(undecided) - self.undecided_rounds_limit
+        dropped = set(sorted(undecided)[:excess]) if excess > 0 else set()
+        stale = [key for key in self.accepted_phase_values if closed(key) or key[0] in dropped]
+        for key in stale:
+            del self.accepted_phase_values[key]
+        self.accepted_votes.prune(lambda key: closed(key) or key[0] in dropped)
 
     def _get_required_accounts(self, tx_data: str) -> List[str]:
         parts = [p.strip() for p in tx_data.split(';')]
@@ -96,22 +274,49 @@ class Node:
     def set_new_proposal(self, new_value: str, next_round_id: Tuple[int, int]) -> None:
         self.message_content = new_value
         self.promises_received.clear()
+        self.accept_rejects.clear()
         self.accept_sent = False
         self.proposer_round_id = tuple(next_round_id)
 
     def try_lock_all(self, transaction_id: str, required_accounts: List[str]) -> bool:
-        for account_id in required_accounts:
-            owner_id = self.locked_accounts.get(account_id)
-            if owner_id and owner_id < transaction_id:
-                return False
-        for account_id in required_accounts:
-            self.locked_accounts[account_id] = transaction_id
-        return True
+        return self.locks.acquire(transaction_id, required_accounts) is LockOutcome.GRANTED
     
     def unlock_all(self, transaction_id: str) -> None:
-        keys_to_delete = [k for k, tid in self.locked_accounts.items() if tid == transaction_id]
-        for key in keys_to_delete:
-            del self.locked_accounts[key]
+        self._lock_waiters.pop(transaction_id, None)
+        self._grant_lock_waiters(self.locks.release(transaction_id))
+
+    def _grant_lock_waiters(self, granted: List[str]) -> None:
+        """ACCEPT-y transakcji, które dostały blokady, wracają do przetworzenia przez _replay_blocked_accepts."""
+        while granted:
+            tx_id = granted.pop(0)
+            waiter = self._lock_waiters.pop(tx_id, None)
+            stale = waiter is None or self._round_id_from_message(waiter[0]) < self.highest_promised_id \
+                or self._round_id_from_message(waiter[0]) <= self.decided_watermark
+            if stale:
+                # Runda czekającego ACCEPT została przebita - blokady przechodzą na kolejnych w kolejce.
+                granted.extend(self.locks.release(tx_id))
+                continue
+            self._blocked_accepts.append(waiter)
+
+    def expire_locks(self, message_pool: List[PaxosMessage]) -> None:
+        """Wywoływane cyklicznie: zwalnia blokady transakcji, których decyzja nie dotarła."""
+        granted = self.locks.expire()
+        if not granted and not self._lock_retries: return
+        self._grant_lock_waiters(granted)
+        self._resume_after_unlock(message_pool)
+
+    def _resume_after_unlock(self, message_pool: List[PaxosMessage]) -> None:
+        self._replay_blocked_accepts(message_pool)
+        if self.message_content: return
+        # Własna propozycja nie jest w toku - ponawiamy najstarszą odrzuconą transakcję, której blokujące
+        # transakcje już zdecydowano (albo minęła ich dzierżawa) i której kont nie trzyma u nas nikt inny.
+        now = self._now()
+        for tx_id, retry in sorted(self._lock_retries.items(), key=lambda item: tx_age(item[0])):
+            if retry.blockers and now < retry.deadline: continue
+            if self.locks.rivals(tx_id, self._get_required_accounts(retry.value)): continue
+            del self._lock_retries[tx_id]
+            self.schedule_retry(retry.value, message_pool, retry.nodes_ips)
+            return
     
     def execute_transaction(self, transaction_data: str):
         parts = [p.strip() for p in transaction_data.split(';')]
@@ -147,12 +352,192 @@ class Node:
                 return False
         return False
 
+    def _observe_latency(self, peer: str, phase: PaxosMessageType, round_id: RoundId) -> None:
+        started = self._phase_started.get(phase)
+        if started is None or started[0] != round_id: return
+        sample = self._now() - started[1]
+        previous = self.peer_latency.get(peer)
+        self.peer_latency[peer] = sample if previous is None else 0.875 * previous + 0.125 * sample
+
+    def phase_quorum(self, message_type: PaxosMessageType, default: int) -> int:
+        """Kworum fazy, do której należy wiadomość: PREPARE/PROMISE - Q1, ACCEPT/ACCEPTED/DECIDED - Q2."""
+        if message_type in (PaxosMessageType.PREPARE, PaxosMessageType.PROMISE):
+            return self.phase1_quorum or default
+        return self.phase2_quorum or default
+
+    def phase_targets(self, nodes_ips: Iterable[str], quorum: int, preferred: Iterable[str] = ()) -> List[str]:
+        """Najszybsze kworum: najpierw ten węzeł, potem `preferred`, dalej wg latencji (niezmierzone najpierw)."""
+        preferred = set(preferred)
+        others = sorted(
+            (ip for ip in nodes_ips if ip != self.ip_addr),
+            key=lambda ip: (ip not in preferred, self.peer_latency.get(ip, 0.0)),
+        )
+        return [self.ip_addr] + others[:quorum - 1]
+
+    def plan_phase(self, nodes_ips: Iterable[str], quorum: int, value: str, message_type: PaxosMessageType,
+                   round_identifier: str, preferred: Iterable[str] = ()) -> List[str]:
+        """Wybiera adresatów PREPARE/ACCEPT: wszyscy albo (tryb oszczędny) najszybsze kworum."""
+        nodes_ips = list(nodes_ips)
+        targets = nodes_ips
+        self.pending_phase = None
+        if self.thrifty:
+            targets = self.phase_targets(nodes_ips, self.phase_quorum(message_type, quorum), preferred)
+            remaining = [ip for ip in nodes_ips if ip not in targets]
+            if remaining:
+                self.pending_phase = PendingPhase(message_type, round_identifier, value, remaining,
+                                                  self._now() + self.thrifty_timeout)
+        self._phase_started[message_type] = (self._round_id_from_str(round_identifier), self._now())
+        return targets
+
+    def broadcast_phase(self, message_pool: List[PaxosMessage], nodes_ips: Iterable[str], quorum: int, value: str,
+                        message_type: PaxosMessageType, round_identifier: str, preferred: Iterable[str] = ()) -> None:
+        targets = self.plan_phase(nodes_ips, quorum, value, message_type, round_identifier, preferred)
+        self.send_message(message_pool, targets, value, message_type, round_identifier)
+
+    def expire_pending_phase(self, message_pool: List[PaxosMessage]) -> None:
+        """Wywoływane cyklicznie: po przekroczeniu czasu faza idzie do pozostałych węzłów."""
+        pending = self.pending_phase
+        if pending is None or self._now() < pending.deadline: return
+        self.pending_phase = None
+        round_id = self._round_id_from_str(pending.round_identifier)
+        if pending.message_type == PaxosMessageType.PREPARE:
+            still_needed = round_id == tuple(self.proposer_round_id) and not self.accept_sent
+        else:
+            still_needed = round_id > self.decided_watermark
+        if still_needed:
+            self.log_event(f"Quorum too slow for {pending.message_type.name} {round_id}, sending to the rest", "WARNING")
+            for ip in pending.remaining:
+                message_pool.append(PaxosMessage(self.ip_addr, ip, pending.message_type, pending.round_identifier, pending.value))
+
+    def fast_quorum_size(self, nodes_ips: Iterable[str], quorum: int) -> int:
+        return fast_quorum(len(list(nodes_ips)), self.phase_quorum(PaxosMessageType.ACCEPT, quorum))
+
+    def start_fast_proposal(self, message_pool: List[PaxosMessage], nodes_ips: Iterable[str], value: str) -> Optional[RoundId]:
+        """FAST_ACCEPT do wszystkich; None, gdy maszyna stanów nie zna operacji (zostaje zwykły Paxos)."""
+        if operation_effects(value) is None: return None
+        self._fast_seq += 1
+        op_id = (self._fast_seq, self.ID)
+        targets = list(nodes_ips)
+        self.fast_proposals[op_id] = FastProposal(value, targets, self._now() + self.fast_timeout)
+        self.send_message(message_pool, targets, value, PaxosMessageType.FAST_ACCEPT, f"{op_id[0]}.{op_id[1]}")
+        return op_id
+
+    def _finish_fast(self, message_pool: List[PaxosMessage], op_id: RoundId, committed: bool) -> None:
+        proposal = self.fast_proposals.pop(op_id, None)
+        if proposal is None: return
+        rid = f"{op_id[0]}.{op_id[1]}"
+        if committed:
+            self.log_event(f"Fast path committed {proposal.value} after round {proposal.after}", "CONSENSUS")
+            content = f"{proposal.after[0]}.{proposal.after[1]};{proposal.value}"
+            self.send_message(message_pool, proposal.targets, content, PaxosMessageType.FAST_COMMIT, rid)
+        else:
+            self.log_event(f"Fast path conflict for {proposal.value}, falling back to Paxos", "WARNING")
+            self.send_message(message_pool, proposal.targets, proposal.value, PaxosMessageType.FAST_ABORT, rid)
+        if self.on_fast_outcome:
+            self.on_fast_outcome(op_id, committed)
+
+    def expire_fast(self, message_pool: List[PaxosMessage]) -> None:
+        """Wywoływane cyklicznie: koordynator porzuca szybkie operacje bez kworum, akceptor - osierocone wpisy."""
+        now = self._now()
+        for op_id in [k for k, p in self.fast_proposals.items() if now >= p.deadline]:
+            self._finish_fast(message_pool, op_id, False)
+        expired = [k for k, e in self.fast_pending.items() if now >= e.expires]
+        if not expired: return
+        for op_id in expired:
+            # Koordynator nie zdążył zatwierdzić ani odwołać - operacji nie uznajemy (spóźniony FAST_COMMIT ją przywróci).
+            self.log_event(f"Dropping unresolved fast operation {op_id}", "WARNING")
+            del self.fast_pending[op_id]
+        self._drain_ordered()
+        self._replay_blocked_accepts(message_pool)
+
+    def request_catchup(self, message_pool: List[PaxosMessage], nodes_ips: Iterable[str], after: RoundId = (0, 0)) -> None:
+        """Prosi peera o decyzje z rundami > after (przy starcie i po wykryciu luki); jedna synchronizacja naraz."""
+        if self._start_catchup(message_pool, nodes_ips, after):
+            self.log_event(f"Catching up decisions after round {after}", "INFO")
+
+    def sync_decisions(self, message_pool: List[PaxosMessage], nodes_ips: Iterable[str]) -> None:
+        """Wywoływane cyklicznie: co catchup_interval pyta kolejnego peera o decyzje po synced_through."""
+        if self.catchup is not None or self._now() < self._next_sync: return
+        self._next_sync = self._now() + self.catchup_interval
+        self._start_catchup(message_pool, nodes_ips, self.synced_through)
+
+    def _start_catchup(self, message_pool: List[PaxosMessage], nodes_ips: Iterable[str], after: RoundId) -> bool:
+        if self.catchup is not None: return False
+        peers = [ip for ip in nodes_ips if ip != self.ip_addr]
+        if not peers: return False
+        # Węzły zaczynają od różnych peerów (restart kilku naraz nie obciąża jednego), kolejne synchronizacje - od następnego.
+        start = (self.ID + self._catchup_requests) % len(peers)
+        self._catchup_requests += 1
+        self.catchup = CatchUp(after, peers[start:] + peers[:start], from_synced=after <= self.synced_through)
+        self._send_catchup_request(message_pool)
+        return True
+
+    def _send_catchup_request(self, message_pool: List[PaxosMessage]) -> None:
+        catchup = self.catchup
+        catchup.deadline = self._now() + self.catchup_timeout
+        self.send_message(message_pool, catchup.peers[:1], "", PaxosMessageType.CATCHUP_REQUEST,
+                          f"{catchup.after[0]}.{catchup.after[1]}")
+
+    def expire_catchup(self, message_pool: List[PaxosMessage]) -> None:
+        """Wywoływane cyklicznie: peer nie odpowiedział na CATCHUP_REQUEST - pytamy następnego."""
+        if self.catchup is None or self._now() < self.catchup.deadline: return
+        self.catchup.peers.pop(0)
+        if not self.catchup.peers:
+            self.log_event(f"Catch-up after round {self.catchup.after} failed, no peer answered", "WARNING")
+            self.catchup = None
+            return
+        self._send_catchup_request(message_pool)
+
+    def _decided_before(self, round_id: RoundId) -> RoundId:
+        position = bisect_left(self.decided_rounds, round_id)
+        return self.decided_rounds[position - 1] if position else self.decided_floor
+
+    def _conflicts_in_flight(self, value: str) -> bool:
+        """Czy operacja koliduje z czymś, czego kolejność na tym węźle nie jest jeszcze ustalona."""
+        if any(not commutes(value, e.value) for e in self.fast_pending.values()):
+            return True
+        if any(not commutes(value, v) for _, v in self._deferred_decisions):
+            return True
+        if any(not commutes(value, m.message_content) for m, _, _ in self._blocked_accepts):
+            return True
+        if any(not commutes(value, m.message_content) for m, _, _ in self._lock_waiters.values()):
+            return True
+        return bool(self.accepted_value) and self.highest_accepted_id > self.decided_watermark \
+            and not commutes(value, self.accepted_value)
+
+    def _drain_ordered(self) -> None:
+        """
+        Wykonuje zatwierdzone szybkie operacje i decyzje Paxosa na ich miejscach w kolejności kanonicznej.
+        Decyzja kolidująca z szybką operacją, na którą ten węzeł głosował, a której wynik jeszcze nie dotarł,
+        czeka na FAST_COMMIT/FAST_ABORT - tylko po to, żeby nie przebudowywać stanu, gdy operacja stanie przed nią.
+        """
+        ready: List[Tuple[OrderKey, RoundId, str]] = []
+        for op_id, entry in list(self.fast_pending.items()):
+            if entry.after is None: continue
+            del self.fast_pending[op_id]
+            ready.append(((entry.after, 1, op_id), op_id, entry.value))
+        waiting = []
+        for round_id, value in self._deferred_decisions:
+            if any(not commutes(value, e.value) for e in self.fast_pending.values()):
+                waiting.append((round_id, value))
+            else:
+                ready.append(((round_id, 0, (0, 0)), round_id, value))
+        self._deferred_decisions = waiting
+        if ready:
+            self._apply_in_order(sorted(ready))
+
+    def _replay_blocked_accepts(self, message_pool: List[PaxosMessage]) -> None:
+        blocked, self._blocked_accepts = self._blocked_accepts, []
+        for message, quorum, nodes_ips in blocked:
+            self.receive_message(message, message_pool, quorum, nodes_ips)
+
     def send_message(self, message_pool: List[PaxosMessage], target_ip: Iterable[str], message: str, message_type: PaxosMessageType, round_identifier: str) -> None:
         if message_type == PaxosMessageType.PREPARE:
             try:
                 parts = str(round_identifier).split('.')
                 self.proposer_round_id = (int(parts[0]), int(parts[1]))
                 self.promises_received.clear() 
+                self.accept_rejects.clear()
                 self.accept_sent = False
             except ValueError: pass
 
@@ -165,22 +550,18 @@ class Node:
             rid = getattr(message, "round_identyfier", None)
         if rid is None: 
             rid = "0.0"
+        return self._round_id_from_str(rid)
+
+    @staticmethod
+    def _round_id_from_str(rid: Any) -> Tuple[int, int]:
         try:
             return tuple(int(x) for x in str(rid).split("."))
         except:
             return (0, 0)
 
-    def _find_id_by_value(self, value_to_find: str) -> Optional[int]:
-        for id_, accepted_value_obj in self.accepted_phase_values.items():
-            if accepted_value_obj.value == value_to_find:
-                return id_
-        return None
-
-    def schedule_retry(self, transaction_data: str, message_pool: List[PaxosMessage], nodes_ips: Iterable[str], delay_range=(0.1,0.5)):
-        delay = random.uniform(*delay_range)
-        self.log_event(f"Retrying transaction in {delay:.2f}s", "WARNING")
-        time.sleep(delay)
-        round_num = self.proposer_round_id[0] + 1
+    def schedule_retry(self, transaction_data: str, message_pool: List[PaxosMessage], nodes_ips: Iterable[str]):
+        self.log_event(f"Retrying transaction {transaction_data}", "WARNING")
+        round_num = max(self.proposer_round_id[0], self.highest_promised_id[0]) + 1
         new_round_id = (round_num, self.ID)
         self.set_new_proposal(transaction_data, new_round_id)
         self.send_message(message_pool, nodes_ips, transaction_data, PaxosMessageType.PREPARE, f"{new_round_id[0]}.{new_round_id[1]}")
@@ -199,7 +580,6 @@ class Node:
                 return_message = f"{self.highest_accepted_id[0]}.{self.highest_accepted_id[1]};{self.accepted_value}" \
                     if self.highest_accepted_id != (0,0) and self.accepted_value else f"0.0;{tx_data}"
                 self.send_message(message_pool, [message.from_ip], return_message, PaxosMessageType.PROMISE, f"{round_id[0]}.{round_id[1]}")
-                if self.locked_accounts: self.locked_accounts.clear()
             else:
                 self.log_event(f"Rejected PREPARE {round_id} (promised {self.highest_promised_id})", "REJECT")
             return
@@ -207,19 +587,24 @@ class Node:
         if mtype == PaxosMessageType.PROMISE:
             if round_id > self.proposer_round_id:
                 self.proposer_round_id = round_id
-                self.promises_received.clear()
                 self.accept_sent = False
             if round_id != tuple(self.proposer_round_id): return
+            self._observe_latency(message.from_ip, PaxosMessageType.PREPARE, round_id)
             
-            self.promises_received[message.from_ip] = message.message_content
+            for old_round in [r for r in self.promises_received if r < round_id]:
+                del self.promises_received[old_round]
+            promises = self.promises_received.setdefault(round_id, {})
+            promises[message.from_ip] = message.message_content
 
-            if len(self.promises_received) >= quorum and not self.accept_sent:
+            if len(promises) >= self.phase_quorum(mtype, quorum) and not self.accept_sent:
                 accepted_val = self.message_content
                 highest_id = (-1, -1)
-                for content in self.promises_received.values():
+                for content in promises.values():
                     try:
                         id_part, val_part = content.split(";", 1)
                         pid = tuple(int(x) for x in id_part.split("."))
+                        # Wartość z rundy już rozstrzygniętej należy do poprzedniej decyzji, nie do tej propozycji.
+                        if pid <= self.decided_watermark: continue
                         if pid > highest_id:
                             highest_id = pid
                             if val_part and pid > (0,0): accepted_val = val_part
@@ -227,43 +612,280 @@ class Node:
                 self.accept_sent = True
                 
                 self.log_event(f"Quorum reached. Sending ACCEPT val: {accepted_val}", "ACCEPT")
-                self.send_message(message_pool, nodes_ips, accepted_val, PaxosMessageType.ACCEPT, f"{round_id[0]}.{round_id[1]}")
+                self.broadcast_phase(message_pool, nodes_ips, quorum, accepted_val, PaxosMessageType.ACCEPT,
+                                     f"{round_id[0]}.{round_id[1]}", preferred=promises)
             return
 
         if mtype == PaxosMessageType.ACCEPT:
+            # Spóźniony ACCEPT rundy już rozstrzygniętej nie może przenieść wartości do kolejnej propozycji.
+            if round_id <= self.decided_watermark: return
             tx_data = message.message_content
+            if round_id >= self.highest_promised_id and any(not commutes(tx_data, e.value) for e in self.fast_pending.values()):
+                # Kolidująca szybka operacja jest w toku - ACCEPT wraca po jej FAST_COMMIT/FAST_ABORT.
+                self.log_event(f"ACCEPT {round_id} waits for a conflicting fast operation", "INFO")
+                self._blocked_accepts.append((message, quorum, list(nodes_ips)))
+                return
             tx_id = self._extract_tx_id(tx_data)
             required = self._get_required_accounts(tx_data)
-            if tx_id: self.unlock_all(tx_id)
-            else: self.locked_accounts.clear()
     
             if round_id >= self.highest_promised_id:
-                if tx_id and required and not self.try_lock_all(tx_id, required):
-                    self.log_event(f"Deadlock detected on ACCEPT {round_id}", "REJECT")
-                    self.schedule_retry(tx_data, message_pool, nodes_ips)
-                    return 
+                outcome = self.locks.acquire(tx_id, required) if tx_id and required else LockOutcome.GRANTED
+                if outcome is LockOutcome.WAIT:
+                    # Starsza transakcja czeka w kolejce kont; ACCEPT wraca, gdy dostanie blokady.
+                    self.log_event(f"ACCEPT {round_id} of {tx_id} queued for account locks", "INFO")
+                    self._lock_waiters[tx_id] = (message, quorum, list(nodes_ips))
+                    return
+                if outcome is LockOutcome.DIE:
+                    # Młodsza ginie (wait-die); ponawia ją tylko propozytor, gdy runda przepadnie.
+                    self.log_event(f"Lock conflict on ACCEPT {round_id}, {tx_id} aborted", "REJECT")
+                    rejection = {"value": tx_data, "blockers": sorted(self.locks.rivals(tx_id, required))}
+                    self.send_message(message_pool, [message.from_ip], rejection, PaxosMessageType.ACCEPT_REJECT,
+                                      f"{round_id[0]}.{round_id[1]}")
+                    return
                 
                 self.highest_accepted_id = round_id
                 self.accepted_value = tx_data
 
                 self.log_event(f"Accepted proposal {round_id}", "ACCEPTED")
-                self.send_message(message_pool, nodes_ips, self.accepted_value, PaxosMessageType.ACCEPTED, f"{round_id[0]}.{round_id[1]}")
+                learners = [message.from_ip] if self.distinguished_learner else nodes_ips
+                self.send_message(message_pool, learners, self.accepted_value, PaxosMessageType.ACCEPTED, f"{round_id[0]}.{round_id[1]}")
             else:
                  self.log_event(f"Rejected ACCEPT {round_id} < {self.highest_promised_id}", "REJECT")
             return
 
+        if mtype == PaxosMessageType.ACCEPT_REJECT:
+            if round_id != tuple(self.proposer_round_id) or self._is_decided(round_id): return
+            self.accept_rejects.add(message.from_ip)
+            nodes_ips = list(nodes_ips)
+            if len(self.accept_rejects) <= len(nodes_ips) - self.phase_quorum(PaxosMessageType.ACCEPT, quorum): return
+            # Kworum fazy 2 już się nie zbierze - runda przepadła, transakcja wraca z tym samym TX_ID.
+            tx_data = message.message_content["value"]
+            tx_id = self._extract_tx_id(tx_data)
+            self.log_event(f"Round {round_id} of {tx_id} rejected by {len(self.accept_rejects)} acceptors", "REJECT")
+            self.reset_paxos_state()
+            if tx_id:
+                retry = self._lock_retries.setdefault(tx_id, LockRetry(tx_data, nodes_ips, set(), 0.0))
+                retry.blockers.update(message.message_content["blockers"])
+                retry.deadline = self._now() + self.locks.ttl
+            self._resume_after_unlock(message_pool)
+            return
+
         if mtype == PaxosMessageType.ACCEPTED:
+            if self._is_decided(round_id): return
+            if round_id < self.decided_watermark:
+                # Głos rundy, której decyzji ten węzeł nie zna, choć zna późniejsze - możliwa luka.
+                # Głos i tak się liczy: kworum tej rundy może domknąć się dopiero teraz.
+                self.request_catchup(message_pool, nodes_ips, self._decided_before(round_id))
+            tx_data = message.message_content
+            key = (round_id, value_digest(tx_data))
+            self.accepted_phase_values.setdefault(key, tx_data)
+            self._observe_latency(message.from_ip, PaxosMessageType.ACCEPT, round_id)
+            reached = self.accepted_votes.add(key, message.from_ip, self.phase_quorum(mtype, quorum))
+            if reached:
+                self._decide(round_id, tx_data)
+                if self.distinguished_learner:
+                    others = [ip for ip in nodes_ips if ip != self.ip_addr]
+                    self.send_message(message_pool, others, tx_data, PaxosMessageType.DECIDED, f"{round_id[0]}.{round_id[1]}")
+                self._resume_after_unlock(message_pool)
+            return
+
+        if mtype == PaxosMessageType.DECIDED:
+            if self._is_decided(round_id): return
+            self._decide(round_id, message.message_content)
+            self._resume_after_unlock(message_pool)
+            return
+
+        if mtype == PaxosMessageType.CATCHUP_REQUEST:
+            start = bisect_right(self.decided_rounds, round_id)
+            later = self.decided_rounds[start:start + self.catchup_batch]
+            batch = [[r[0], r[1], self.decided_values[r]] for r in later]
+            reply = {"decisions": batch, "more": start + len(later) < len(self.decided_rounds)}
+            if round_id < self.decided_floor:
+                # Decyzje do decided_floor są już zwinięte w stan bazowy - peer dostaje go zamiast nich.
+                base = self._base
+                reply["base"] = {"key": base.key, "accounts": base.accounts, "tx_ids": list(base.tx_ids)}
+            self.send_message(message_pool, [message.from_ip], reply, PaxosMessageType.CATCHUP_REPLY,
+                              message.round_identifier)
+            return
+
+        if mtype == PaxosMessageType.CATCHUP_REPLY:
+            catchup = self.catchup
+            if catchup is None or message.from_ip != catchup.peers[0] or round_id != catchup.after: return
+            decisions = message.message_content["decisions"]
+            if "base" in message.message_content:
+                self._install_base(message.message_content["base"])
+                catchup.after = max(catchup.after, self.decided_floor)
+            for r, n, value in decisions:
+                if not self._is_decided((r, n)):
+                    self._decide((r, n), value, drain=False)
+                    catchup.learned += 1
+            # Cała paczka trafia na swoje miejsca w kolejności naraz - najwyżej jedna przebudowa stanu.
+            self._drain_ordered()
+            if decisions:
+                catchup.after = (decisions[-1][0], decisions[-1][1])
+            if message.message_content["more"] and decisions:
+                self._send_catchup_request(message_pool)
+            else:
+                if catchup.from_synced:
+                    self.synced_through = max(self.synced_through, catchup.after)
+                    self._next_sync = self._now() + self.catchup_interval
+                if catchup.learned:
+                    self.log_event(f"Caught up {catchup.learned} decisions from {message.from_ip}", "INFO")
+                self.catchup = None
+            self._resume_after_unlock(message_pool)
+            return
+
+        if mtype == PaxosMessageType.FAST_ACCEPT:
             tx_data = message.message_content
-            vid = self._find_id_by_value(tx_data)
-            if vid is None:
-                self.accepted_phase_values_id += 1
-                vid = self.accepted_phase_values_id
-                self.accepted_phase_values[vid] = AcceptedValue(tx_data, 0)
-            self.accepted_phase_values[vid].count += 1
-            if self.accepted_phase_values[vid].count == quorum:
-                self.log_event(f"Global Consensus Reached: {tx_data}", "CONSENSUS")
-                self.execute_transaction(tx_data)
-                tx_id = self._extract_tx_id(tx_data)
-                if tx_id: self.unlock_all(tx_id)
-                self.log.append(round_id, tx_data, datetime.now())
-                self.reset_paxos_state()
\ No newline at end of file
+            ok = round_id in self.fast_pending or not self._conflicts_in_flight(tx_data)
+            if ok and round_id not in self.fast_pending:
+                self.fast_pending[round_id] = FastEntry(tx_data, self._now() + self.fast_pending_ttl)
+            # Watermark akceptora mówi koordynatorowi, po których decyzjach Paxosa wykonać operację.
+            watermark = self.decided_watermark
+            self.send_message(message_pool, [message.from_ip], f"{int(ok)};{watermark[0]}.{watermark[1]}",
+                              PaxosMessageType.FAST_ACCEPTED, message.round_identifier)
+            return
+
+        if mtype == PaxosMessageType.FAST_ACCEPTED:
+            proposal = self.fast_proposals.get(round_id)
+            if proposal is None: return
+            flag, _, watermark = str(message.message_content).partition(";")
+            if flag == "1":
+                proposal.oks.add(message.from_ip)
+                proposal.after = max(proposal.after, self._round_id_from_str(watermark))
+            else:
+                proposal.rejects.add(message.from_ip)
+            needed = self.fast_quorum_size(proposal.targets, quorum)
+            if len(proposal.oks) >= needed:
+                self._finish_fast(message_pool, round_id, True)
+            elif len(proposal.rejects) > len(proposal.targets) - needed:
+                self._finish_fast(message_pool, round_id, False)
+            return
+
+        if mtype == PaxosMessageType.FAST_COMMIT:
+            after, _, tx_data = str(message.message_content).partition(";")
+            entry = self.fast_pending.get(round_id)
+            if entry is None:
+                # Węzeł nie głosował na operację, ale kworum ją zatwierdziło - wykonuje ją jak pozostali.
+                entry = self.fast_pending[round_id] = FastEntry(tx_data, self._now() + self.fast_pending_ttl)
+            entry.after = self._round_id_from_str(after)
+            if not self._is_decided(entry.after):
+                # Kworum szybkiej ścieżki zna decyzję, której ten węzeł nie ma - luka.
+                self.request_catchup(message_pool, nodes_ips, self._decided_before(entry.after))
+            self._drain_ordered()
+            self._replay_blocked_accepts(message_pool)
+            return
+
+        if mtype == PaxosMessageType.FAST_ABORT:
+            entry = self.fast_pending.get(round_id)
+            if entry is not None and entry.after is None:
+                del self.fast_pending[round_id]
+                self._drain_ordered()
+                self._replay_blocked_accepts(message_pool)
+
+    def _decide(self, round_id: RoundId, tx_data: str, drain: bool = True) -> None:
+        self.log_event(f"Global Consensus Reached: {tx_data}", "CONSENSUS")
+        if self.pending_phase is not None and self._round_id_from_str(self.pending_phase.round_identifier) <= round_id:
+            self.pending_phase = None
+        tx_id = self._extract_tx_id(tx_data)
+        if tx_id:
+            self.unlock_all(tx_id)
+            self._lock_retries.pop(tx_id, None)
+            for retry in self._lock_retries.values():
+                retry.blockers.discard(tx_id)
+        if tuple(self.proposer_round_id) > round_id:
+            # Własna, nowsza propozycja jest w toku - czyścimy tylko stan akceptora tej decyzji.
+            if self.highest_accepted_id <= round_id: self.accepted_value = ""
+        else:
+            self.reset_paxos_state()
+        self.decided_values[round_id] = tx_data
+        insort(self.decided_rounds, round_id)
+        self._collect_decided(round_id)
+        self._deferred_decisions.append((round_id, tx_data))
+        if drain:
+            self._drain_ordered()
+
+    def _apply_in_order(self, entries: List[Tuple[OrderKey, RoundId, str]]) -> None:
+        """
+        Wykonuje posortowane wpisy na ich miejscach w kolejności kanonicznej (rundy rosnąco). Wpis spóźniony
+        względem wykonanych już późniejszych rund, który z którąś z nich koliduje, przebudowuje stan od początku
+        (raz na całą paczkę) - repliki dochodzą do tego samego stanu niezależnie od kolejności, w jakiej dostały decyzje.
+        """
+        applied_at = datetime.now()
+        rebuild = False
+        for key, request_number, tx_data in entries:
+            position = bisect_left(self._applied, (key,))
+            later = range(position, len(self._applied))
+            if rebuild or any(not commutes(tx_data, self._applied[i][2]) for i in later):
+                if not rebuild:
+                    self.log_event(f"Entry {request_number} ordered before {len(later)} applied entries, rebuilding state", "WARNING")
+                rebuild = True
+                self._applied.insert(position, (key, request_number, tx_data, applied_at, False))
+                continue
+            logged = self._apply_decided(request_number, tx_data, applied_at)
+            self._applied.insert(position, (key, request_number, tx_data, applied_at, logged))
+        if rebuild:
+            self._rebuild_state()
+        self._compact_applied()
+
+    def _rebuild_state(self) -> None:
+        """Stan, log i indeks historii od _base z wpisów w kolejności kanonicznej (z ich pierwotnym czasem)."""
+        base = self._base
+        self.accounts.clear()
+        self.accounts.update(base.accounts)
+        self.log.truncate(base.log_length)
+        self.history.truncate(base.log_length)
+        self.applied_tx_ids = dict(base.tx_ids)
+        self._applied = [(key, request_number, tx_data, applied_at, self._apply_decided(request_number, tx_data, applied_at))
+                         for key, request_number, tx_data, applied_at, _ in self._applied]
+
+    def _compact_applied(self) -> None:
+        """Starsza połowa _applied przechodzi do _base: saldo z indeksu historii, bez ponownego wykonywania."""
+        if len(self._applied) < 2 * self.applied_window: return
+        folded, self._applied = self._applied[:self.applied_window], self._applied[self.applied_window:]
+        base = self._base
+        base.key = folded[-1][0]
+        base.log_length += sum(1 for entry in folded if entry[4])
+        base.accounts = self.history.balances_at(base.log_length - 1)
+        for entry in folded:
+            self._remember_tx_id(base.tx_ids, self._extract_tx_id(entry[2]))
+        self._prune_decided()
+
+    def _prune_decided(self) -> None:
+        cut = bisect_right(self.decided_rounds, self.decided_floor)
+        for round_id in self.decided_rounds[:cut]:
+            del self.decided_values[round_id]
+        del self.decided_rounds[:cut]
+
+    def _install_base(self, snapshot: Dict[str, Any]) -> None:
+        """Stan bazowy od peera, który zwinął już potrzebne decyzje; wcześniejszych wpisów log tego węzła nie będzie miał."""
+        (r, n), kind, (op, op_node) = snapshot["key"]
+        key = ((r, n), kind, (op, op_node))
+        if key <= self._base.key: return
+        self.log_event(f"Installing peer state after round {key[0]}, earlier log entries are not available", "WARNING")
+        self._applied = [entry for entry in self._applied if entry[0] > key]
+        self._deferred_decisions = [decision for decision in self._deferred_decisions if decision[0] > key[0]]
+        self._base = AppliedBase(key, dict(snapshot["accounts"]), dict.fromkeys(snapshot["tx_ids"]))
+        self.log.clear()
+        self.history = HistoryIndex(self._base.accounts, self.history.checkpoint_interval)
+        self._prune_decided()
+        self.decided_watermark = max(self.decided_watermark, key[0])
+        self._rebuild_state()
+
+    def _remember_tx_id(self, tx_ids: Dict[str, None], tx_id: Optional[str]) -> None:
+        if not tx_id or tx_id in tx_ids: return
+        tx_ids[tx_id] = None
+        if len(tx_ids) > self.tx_dedup_window:
+            del tx_ids[next(iter(tx_ids))]
+
+    def _apply_decided(self, request_number: RoundId, tx_data: str, applied_at: Optional[datetime] = None) -> bool:
+        """Wykonuje wpis i dopisuje go do logu; False - transakcja o tym TX_ID została już wykonana."""
+        applied_at = applied_at or datetime.now()
+        tx_id = self._extract_tx_id(tx_data)
+        # Ta sama transakcja zdecydowana w dwóch rundach (np. wartość przeniesiona z PROMISE) wykonuje się raz.
+        if tx_id and tx_id in self.applied_tx_ids: return False
+        self._remember_tx_id(self.applied_tx_ids, tx_id)
+        self.execute_transaction(tx_data)
+        self.log.append(request_number, tx_data, applied_at)
+        self.history.record(len(self.log) - 1, tx_data, self.accounts, applied_at.timestamp())
+        return True
@@ -7,6 +7,9 @@ class RaftMessageType(Enum):
     VOTE = 2
     APPEND_ENTRIES = 3
     APPEND_RESPONSE = 4
+    TIMEOUT_NOW = 5
+    DIGEST_REQUEST = 6
+    DIGEST_REPLY = 7
 
 
 class RaftMessage:
@@ -1,27 +1,144 @@
+import json
+import os
+import sys
 import time
 import random
-from dataclasses import dataclass
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from functools import lru_cache
 from typing import Any, Callable, Dict, List, Set, Tuple, Optional
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from account_state import AccountStore
+from history import HistoryIndex
+from log_view import LogEntriesView
+from quorum import MatchIndexTracker
 from raft_messages import RaftMessage, RaftMessageType
 
-@dataclass
+# Wpis konfiguracji klastra: "CONFIG;" + JSON z listą członków ({"ip", "tcp_port", "role"}).
+CONFIG_PREFIX = "CONFIG;"
+_CONFIG_PREFIX_BYTES = CONFIG_PREFIX.encode("utf-8")
+
+def _timestamp_to_micros(timestamp: Any) -> int:
+    if isinstance(timestamp, datetime):
+        return round(timestamp.timestamp() * 1_000_000)
+    if isinstance(timestamp, (int, float)):
+        return round(timestamp * 1_000_000)
+    try:
+        return round(datetime.fromisoformat(str(timestamp)).timestamp() * 1_000_000)
+    except ValueError:
+        return round(float(timestamp) * 1_000_000)
+
+@lru_cache(maxsize=4096)
+def _second_to_str(second: int) -> str:
+    return str(datetime.fromtimestamp(second))
+
+def _micros_to_str(micros: int) -> str:
+    """Ten sam format co str(datetime); prefiks sekundowy jest cache'owany, bo wpisy z jednej sekundy go dzielą."""
+    second, micro = divmod(micros, 1_000_000)
+    if micro:
+        return f"{_second_to_str(second)}.{micro:06d}"
+    return _second_to_str(second)
+
 class Log:
+    """
+    Kolumnowy log Rafta: term, indeks i timestamp (w mikrosekundach) w array('q'),
+    a treści operacji w jednym buforze bajtów z tablicą offsetów.
+    Wpis i zajmuje arena[offsets[i]:offsets[i + 1]].
+    """
+
     def __init__(self) -> None:
-        self.entries: List[Dict[str, Any]] = []
+        self._terms = array("q")
+        self._indices = array("q")
+        self._timestamps = array("q")
+        self._offsets = array("q", [0])
+        self._arena = bytearray()
+        self._config_positions: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    @property
+    def entries(self) -> LogEntriesView:
+        return LogEntriesView(self)
 
     def append(self, request_number: Any, timestamp: Any, message: Any = None) -> None:
         if message is None:
             message = request_number
             request_number = (0, 0)
 
-        self.entries.append(
-            {
-                "request_number": request_number,
-                "timestamp": str(timestamp),
-                "message": message,
-            }
-        )
+        self._terms.append(request_number[0])
+        self._indices.append(request_number[1])
+        self._timestamps.append(_timestamp_to_micros(timestamp))
+        payload = str(message).encode("utf-8")
+        if payload.startswith(_CONFIG_PREFIX_BYTES):
+            self._config_positions.append(len(self._terms) - 1)
+        self._arena += payload
+        self._offsets.append(len(self._arena))
+
+    def append_entry(self, entry: Dict[str, Any]) -> None:
+        """Dokleja wpis w formacie słownikowym (tak jak przychodzi w APPEND_ENTRIES)."""
+        self.append(tuple(entry["request_number"]), entry["timestamp"], entry["message"])
+
+    def extend(self, entries: List[Dict[str, Any]]) -> None:
+        """Dokleja paczkę wpisów słownikowych: jedna operacja extend na kolumnę."""
+        if not entries:
+            return
+        payloads = [str(e["message"]).encode("utf-8") for e in entries]
+        offsets = array("q")
+        end = len(self._arena)
+        for i, payload in enumerate(payloads, len(self)):
+            end += len(payload)
+            offsets.append(end)
+            if payload.startswith(_CONFIG_PREFIX_BYTES):
+                self._config_positions.append(i)
+
+        self._terms.extend(e["request_number"][0] for e in entries)
+        self._indices.extend(e["request_number"][1] for e in entries)
+        self._timestamps.extend(_timestamp_to_micros(e["timestamp"]) for e in entries)
+        self._arena += b"".join(payloads)
+        self._offsets.extend(offsets)
+
+    def term_at(self, i: int) -> int:
+        return self._terms[i]
+
+    def last_term(self) -> int:
+        return self._terms[-1] if self._terms else 0
+
+    def request_number_at(self, i: int) -> Tuple[int, int]:
+        return (self._terms[i], self._indices[i])
+
+    def message_at(self, i: int) -> str:
+        return self._arena[self._offsets[i]:self._offsets[i + 1]].decode("utf-8")
+
+    def entry(self, i: int) -> Dict[str, Any]:
+        return {
+            "request_number": (self._terms[i], self._indices[i]),
+            "timestamp": _micros_to_str(self._timestamps[i]),
+            "message": self.message_at(i),
+        }
+
+    def slice(self, start: int, stop: Optional[int] = None) -> List[Dict[str, Any]]:
+        if stop is None or stop > len(self):
+            stop = len(self)
+        return [self.entry(i) for i in range(start, stop)]
+
+    def truncate(self, length: int) -> None:
+        """Usuwa wpisy od pozycji `length` w miejscu (bez kopiowania prefiksu)."""
+        if length >= len(self):
+            return
+        del self._terms[length:]
+        del self._indices[length:]
+        del self._timestamps[length:]
+        del self._arena[self._offsets[length]:]
+        del self._offsets[length + 1:]
+        del self._config_positions[bisect_left(self._config_positions, length):]
+
+    def last_config_index(self) -> int:
+        """Indeks ostatniego wpisu CONFIG w logu (zatwierdzonego lub nie), -1 gdy brak."""
+        return self._config_positions[-1] if self._config_positions else -1
 
 class Node:
     def __init__(self, ip_addr: str, up_to_date: bool, ID: int, logger: Optional[Callable[[str, str], None]] = None) -> None:
@@ -29,27 +146,58 @@ class Node:
         self.ip_addr: str = ip_addr
         self.logger = logger
 
-        self.accounts: dict[str, float] = {'KONTO_A': 10000.00, 'KONTO_B': 5000.00}
+        self.accounts: AccountStore = AccountStore({'KONTO_A': 10000.00, 'KONTO_B': 5000.00})
+        # Skrót stanu lidera przychodzi z heartbeatem; przy różnicy follower schodzi po drzewie
+        # (DIGEST_REQUEST/DIGEST_REPLY) i pobiera tylko różniące się kubełki.
+        self.digest_repair_until: float = 0.0
+        self.divergences: int = 0
+        self.repaired_buckets: int = 0
         
         self.current_term: int = 0
         self.voted_for: Optional[str] = None
         self.log: Log = Log()
+        # Konto -> indeksy wpisów logu, które je dotknęły (/accounts/{id}/history), checkpointy i delty stanu (/accounts?at_index=).
+        self.history: HistoryIndex = HistoryIndex(self.accounts)
 
         self.commit_index: int = -1
         self.last_applied: int = -1
+        # Gdy ustawione, przesunięcie commit_index tylko powiadamia zewnętrzny pipeline
+        # aplikowania (np. zadanie w serwerze) zamiast wykonywać transakcje w obsłudze wiadomości.
+        self.on_commit: Optional[Callable[[], None]] = None
 
         self.next_index: Dict[str, int] = {}
-        self.match_index: Dict[str, int] = {}
+        # match_index voterów i learnerów; zbiór węzłów zmienia się tylko w set_membership / become_leader.
+        self.match_tracker = MatchIndexTracker()
+        self.max_append_entries: int = 1024
+        # Tryb oszczędny: nowe wpisy od razu tylko do najszybszego kworum, reszta dostaje je z heartbeatem.
+        self.thrifty: bool = False
 
         self.role: str = "follower" 
+        # Learner replikuje i aplikuje log, ale nie głosuje i nie wchodzi do kworum zatwierdzania.
+        self.learner: bool = False
+        self.learners: Set[str] = set()
         self.votes_received: Set[str] = set()
         self.leader_id: Optional[str] = None
 
+        # Przekazanie przywództwa: lider wstrzymuje nowe propozycje, dogania cel i wysyła mu TIMEOUT_NOW.
+        self.transfer_target: Optional[str] = None
+        self.transfer_deadline: float = 0.0
+
         self._now = time.monotonic
 
         self.election_base: float = 2.0 
         self.election_jitter: float = 1.0 
         
+        # Czasy dobierane z mierzonego RTT (leader) lub ogłaszane przez lidera (follower),
+        # zawsze w granicach [*_min, *_max]. Dopóki nie ma pomiarów, obowiązują wartości ostrożne.
+        self.heartbeat_min: float = 0.05
+        self.heartbeat_max: float = 0.3
+        self.election_min: float = 0.5
+        self.election_max: float = 5.0
+        self.heartbeat_interval: float = self.heartbeat_max
+        self.srtt: Dict[str, float] = {}
+        self.rttvar: Dict[str, float] = {}
+        
         self.last_heartbeat: float = self._now()
         self.election_deadline: float = 0.0
         self._reset_election_deadline()
@@ -69,10 +217,55 @@ class Node:
     def reset_election_timer(self) -> None:
         self._reset_election_deadline()
 
+    def configure_timing(self, heartbeat_min: Optional[float] = None, heartbeat_max: Optional[float] = None,
+                         election_min: Optional[float] = None, election_max: Optional[float] = None) -> None:
+        if heartbeat_min is not None: self.heartbeat_min = heartbeat_min
+        if heartbeat_max is not None: self.heartbeat_max = heartbeat_max
+        if election_min is not None: self.election_min = election_min
+        if election_max is not None: self.election_max = election_max
+        self.heartbeat_interval = min(max(self.heartbeat_interval, self.heartbeat_min), self.heartbeat_max)
+        self._set_election_base(self.election_base)
+
+    def _set_election_base(self, base: float) -> None:
+        self.election_base = min(max(base, self.election_min), self.election_max)
+        self.election_jitter = self.election_base / 2
+
+    def _observe_rtt(self, peer: str, sample: float) -> None:
+        """Estymator jak w TCP (RFC 6298): wygładzone RTT i jego zmienność."""
+        if sample < 0: return
+        srtt = self.srtt.get(peer)
+        if srtt is None:
+            self.srtt[peer] = sample
+            self.rttvar[peer] = sample / 2
+        else:
+            self.rttvar[peer] = 0.75 * self.rttvar[peer] + 0.25 * abs(srtt - sample)
+            self.srtt[peer] = 0.875 * srtt + 0.125 * sample
+
+    def _retune_timing(self) -> None:
+        """Heartbeat = 2 * najgorsze RTO wśród peerów, timeout wyborów = 10 heartbeatów."""
+        if not self.srtt: return
+        rto = max(self.srtt[p] + 4 * self.rttvar[p] for p in self.srtt)
+        self.heartbeat_interval = min(max(2 * rto, self.heartbeat_min), self.heartbeat_max)
+        self._set_election_base(10 * self.heartbeat_interval)
+
+    def _adopt_leader_timing(self, timing: Dict[str, float]) -> None:
+        if "heartbeat_interval" in timing:
+            self.heartbeat_interval = min(max(timing["heartbeat_interval"], self.heartbeat_min), self.heartbeat_max)
+        if "election_base" in timing:
+            self._set_election_base(timing["election_base"])
+
+    def timing(self) -> Dict[str, Any]:
+        return {
+            "heartbeat_interval": self.heartbeat_interval,
+            "election_base": self.election_base,
+            "election_jitter": self.election_jitter,
+            "rtt_ms": {peer: round(rtt * 1000, 3) for peer, rtt in self.srtt.items()},
+        }
+
     def on_election_failed(self) -> None:
         self.votes_received.clear()
         self.voted_for = None
-        self.election_base = min(self.election_base * 1.2, 5.0)
+        self.election_base = min(self.election_base * 1.2, self.election_max)
         self._reset_election_deadline()
 
     def begin_election(self) -> Tuple[int, int]:
@@ -84,13 +277,22 @@ class Node:
         self._reset_election_deadline()
         return self.get_last_log_index(), self.get_last_log_term()
 
+    def config_at(self, i: int) -> List[Dict[str, Any]]:
+        return json.loads(self.log.message_at(i)[len(CONFIG_PREFIX):])
+
+    def voters(self, nodes_ips: List[str]) -> List[str]:
+        return [ip for ip in nodes_ips if ip not in self.learners]
+
+    def set_membership(self, nodes_ips: List[str], learners: Set[str]) -> None:
+        """Nowa konfiguracja klastra - jedyne (poza objęciem przywództwa) miejsce zmiany zbioru w match_tracker."""
+        self.learners = set(learners)
+        self.match_tracker.sync(self.voters(nodes_ips), learners=[ip for ip in nodes_ips if ip in self.learners])
+
     def get_last_log_index(self) -> int:
-        return len(self.log.entries) - 1
+        return len(self.log) - 1
 
     def get_last_log_term(self) -> int:
-        if not self.log.entries:
-            return 0
-        return self.log.entries[-1]["request_number"][0]
+        return self.log.last_term()
 
     def _candidate_log_up_to_date(self, cand_last_idx: int, cand_last_term: int) -> bool:
         my_idx = self.get_last_log_index()
@@ -99,25 +301,36 @@ class Node:
         if cand_last_term < my_term: return False
         return cand_last_idx >= my_idx
 
-    def apply_committed_entries(self):
-        """Aplikuje wpisy tylko raz: identyfikator wpisu = (term, index)."""
-        while self.last_applied < self.commit_index:
+    def apply_lag(self) -> int:
+        return max(0, self.commit_index - self.last_applied)
+
+    def _commit_advanced(self) -> None:
+        if self.on_commit is not None:
+            self.on_commit()
+        else:
+            self.apply_committed_entries()
+
+    def apply_committed_entries(self, limit: Optional[int] = None) -> int:
+        """Aplikuje wpisy tylko raz: identyfikator wpisu = (term, index). Zwraca liczbę przetworzonych indeksów."""
+        target = self.commit_index if limit is None else min(self.commit_index, self.last_applied + limit)
+        start = self.last_applied
+        while self.last_applied < target:
             self.last_applied += 1
-            if self.last_applied >= len(self.log.entries):
+            if self.last_applied >= len(self.log):
                 break
 
-            entry = self.log.entries[self.last_applied]
-            entry_id = Tuple(entry["request_number"]) 
-
+            entry_id = self.log.request_number_at(self.last_applied)
 
             if entry_id in self._applied_entries:
                 continue
 
-            operation = entry["message"]
+            operation = self.log.message_at(self.last_applied)
             self._applied_entries.add(entry_id)
 
             self.log_event(f"Committing index {self.last_applied}: {operation}", "COMMIT")
             self.execute_transaction(operation)
+            self.history.record(self.last_applied, operation, self.accounts)
+        return self.last_applied - start
 
 
     def execute_transaction(self, transaction_data: str):
@@ -169,6 +382,7 @@ class Node:
             self.voted_for = None
             self.leader_id = None
             self.votes_received.clear()
+            self.transfer_target = None
             
             self._reset_election_deadline()
 
@@ -194,12 +408,19 @@ class Node:
             self._handle_append_entries(message, message_pool)
         elif message.message_type == RaftMessageType.APPEND_RESPONSE:
             self._handle_append_response(message, quorum, nodes_ips, message_pool)
+        elif message.message_type == RaftMessageType.TIMEOUT_NOW:
+            self._handle_timeout_now(message, nodes_ips, message_pool)
+        elif message.message_type == RaftMessageType.DIGEST_REQUEST:
+            reply = {"applied": self.last_applied, **self.accounts.answer(message.message_content)}
+            self.send_message(message_pool, [message.from_ip], RaftMessageType.DIGEST_REPLY, self.current_term, reply)
+        elif message.message_type == RaftMessageType.DIGEST_REPLY:
+            self._handle_digest_reply(message, message_pool)
 
     def _handle_request_vote(self, message: RaftMessage, message_pool: List[RaftMessage]) -> None:
         content = message.message_content
         candidate_id = content.get("candidate_id", message.from_ip) if isinstance(content, dict) else message.from_ip
         
-        can_vote = (self.voted_for is None) or (self.voted_for == candidate_id)
+        can_vote = not self.learner and ((self.voted_for is None) or (self.voted_for == candidate_id))
         
         log_is_ok = True
         if isinstance(content, dict):
@@ -217,6 +438,7 @@ class Node:
 
     def _handle_vote_response(self, message: RaftMessage, quorum: int, nodes_ips: List[str], message_pool: List[RaftMessage]) -> None:
         if self.role != "candidate": return
+        if message.from_ip in self.learners: return
         if isinstance(message.message_content, dict) and message.message_content.get("granted"):
             self.votes_received.add(message.from_ip)
             
@@ -229,22 +451,22 @@ class Node:
         prev_log_term = content.get("prev_log_term", 0)
         entries = content.get("entries", [])
         leader_commit = content.get("leader_commit", -1)
+        if "timing" in content:
+            self._adopt_leader_timing(content["timing"])
 
         if prev_log_index > self.get_last_log_index():
-            self.send_message(message_pool, [message.from_ip], RaftMessageType.APPEND_RESPONSE, 
-                              self.current_term, {"success": False, "index": self.get_last_log_index()})
+            self._send_append_response(message, message_pool, False, self.get_last_log_index())
             return
 
         if prev_log_index >= 0:
-            my_term_at_index = self.log.entries[prev_log_index]["request_number"][0]
+            my_term_at_index = self.log.term_at(prev_log_index)
             if my_term_at_index != prev_log_term:
                 self.log_event(
                     f"[CATCH-UP] Log mismatch at idx={prev_log_index} (my_term={prev_log_term}, leader_term={prev_log_term}) -> truncating",
                     "CATCHUP",
                 )
-                self.log.entries = self.log.entries[:prev_log_index]
-                self.send_message(message_pool, [message.from_ip], RaftMessageType.APPEND_RESPONSE, 
-                                  self.current_term, {"success": False, "index": self.get_last_log_index()})
+                self.log.truncate(prev_log_index)
+                self._send_append_response(message, message_pool, False, self.get_last_log_index())
                 return
 
         if entries:
@@ -253,26 +475,70 @@ class Node:
                 "CATCHUP",
             )
             
-        for i, entry in enumerate(entries):
-            idx = prev_log_index + 1 + i
-            if idx < len(self.log.entries):
-                if self.log.entries[idx]["request_number"] == entry["request_number"]:
-                    pass
-                else:
-                    self.log.entries = self.log.entries[:idx]
-                    self.log.entries.append(entry)
-            else:
-                self.log.entries.append(entry)
+        # Jeden przebieg do pierwszego konfliktu termów, potem obcięcie w miejscu i dołożenie reszty paczką.
+        start = prev_log_index + 1
+        overlap = min(len(entries), len(self.log) - start)
+        matched = 0
+        while matched < overlap and self.log.term_at(start + matched) == entries[matched]["request_number"][0]:
+            matched += 1
+        if matched < len(entries):
+            self.log.truncate(start + matched)
+            self.log.extend(entries[matched:])
       
+        # Spóźniona (krótsza) paczka nie może cofnąć commit_index.
         if leader_commit > self.commit_index:
-            self.commit_index = min(leader_commit, self.get_last_log_index())
-            self.apply_committed_entries() 
+            self.commit_index = max(self.commit_index, min(leader_commit, prev_log_index + len(entries)))
+
+        # Odpowiedź idzie przed aplikowaniem, żeby koszt maszyny stanów nie opóźniał zatwierdzania u lidera.
+        self._send_append_response(message, message_pool, True, prev_log_index + len(entries))
+
+        if self.last_applied < self.commit_index:
+            self._commit_advanced()
+        if "digest" in content:
+            self._check_digest(content["digest"], message, message_pool)
+
+    def _check_digest(self, digest: Dict[str, Any], message: RaftMessage, message_pool: List[RaftMessage]) -> None:
+        # Porównujemy tylko ten sam indeks zastosowanych wpisów; naprawa w toku nie jest zaczynana od nowa.
+        if digest["applied"] != self.last_applied or digest["root"] == self.accounts.root(): return
+        if self._now() < self.digest_repair_until: return
+        self.divergences += 1
+        self.log_event(f"State diverged from leader at applied index {self.last_applied}", "WARNING")
+        self._request_digest(message.from_ip, message_pool, {"level": 1, "indices": self.accounts.children([0])})
 
-        self.send_message(message_pool, [message.from_ip], RaftMessageType.APPEND_RESPONSE, 
-                          self.current_term, {"success": True, "index": self.get_last_log_index()})
+    def _request_digest(self, leader: str, message_pool: List[RaftMessage], request: Dict[str, Any]) -> None:
+        self.digest_repair_until = self._now() + self.election_base
+        self.send_message(message_pool, [leader], RaftMessageType.DIGEST_REQUEST, self.current_term, request)
 
-        self.apply_committed_entries()
+    def _handle_digest_reply(self, message: RaftMessage, message_pool: List[RaftMessage]) -> None:
+        content = message.message_content
+        if self.digest_repair_until == 0.0: return
+        if content["applied"] != self.last_applied:
+            # Któraś strona zastosowała kolejne wpisy - porównanie zostanie powtórzone z następnym heartbeatem.
+            self.digest_repair_until = 0.0
+            return
+        if "buckets" in content:
+            for bucket, accounts in content["buckets"].items():
+                self.accounts.replace_bucket(int(bucket), accounts)
+            self.repaired_buckets += len(content["buckets"])
+            self.log_event(f"Repaired {len(content['buckets'])} bucket(s) from {message.from_ip}", "WARNING")
+            self.digest_repair_until = 0.0
+            return
+        level = content["level"]
+        differing = self.accounts.mismatched(level, content["indices"], content["hashes"])
+        if not differing:
+            self.digest_repair_until = 0.0
+        elif level == self.accounts.depth:
+            self._request_digest(message.from_ip, message_pool, {"buckets": differing})
+        else:
+            self._request_digest(message.from_ip, message_pool, {"level": level + 1, "indices": self.accounts.children(differing)})
         
+    def _send_append_response(self, message: RaftMessage, message_pool: List[RaftMessage], success: bool, index: int) -> None:
+        response = {"success": success, "index": index}
+        # Echo znacznika czasu lidera - lider liczy z niego RTT bez synchronizacji zegarów.
+        if "sent_at" in message.message_content:
+            response["sent_at"] = message.message_content["sent_at"]
+        self.send_message(message_pool, [message.from_ip], RaftMessageType.APPEND_RESPONSE, self.current_term, response)
+
     def _handle_append_response(self, message: RaftMessage, quorum: int, nodes_ips: List[str], message_pool: List[RaftMessage]) -> None:
         if self.role != "leader": return
 
@@ -280,60 +546,110 @@ class Node:
         success = content.get("success", False)
         follower_index = content.get("index", 0)
         peer = message.from_ip
+        if "sent_at" in content:
+            self._observe_rtt(peer, self._now() - content["sent_at"])
 
         if success:
-            self.match_index[peer] = follower_index
             self.next_index[peer] = follower_index + 1
+
+            self.match_tracker.update(peer, follower_index)
+            self.match_tracker.update(self.ip_addr, self.get_last_log_index())
+            majority_index = self.match_tracker.quorum_index(quorum)
             
-            sorted_matches = sorted([self.match_index.get(p, -1) for p in nodes_ips if p != self.ip_addr] + [self.get_last_log_index()])
-            majority_index = sorted_matches[len(sorted_matches) - quorum]
-            
+            if peer == self.transfer_target and follower_index >= self.get_last_log_index():
+                self._send_timeout_now(message_pool)
+
             if majority_index > self.commit_index:
-                if self.log.entries[majority_index]["request_number"][0] == self.current_term:
+                if self.log.term_at(majority_index) == self.current_term:
                     old = self.commit_index
                     self.commit_index = majority_index
                     print(f"[Leader] Committed index {self.commit_index}")
                     
-                    self.broadcast_append_entries(message_pool, nodes_ips)
+                    if not self.thrifty:
+                        self.broadcast_append_entries(message_pool, nodes_ips)
                     
-                    self.apply_committed_entries() 
+                    self._commit_advanced()
                     
         else:
-            self.next_index[peer] = max(0, self.next_index[peer] - 1)
+            self.next_index[peer] = max(0, self.next_index.get(peer, 0) - 1)
+
+    def transfer_in_progress(self) -> bool:
+        if self.transfer_target is not None and self._now() >= self.transfer_deadline:
+            self.log_event(f"Leadership transfer to {self.transfer_target} timed out", "TRANSFER")
+            self.transfer_target = None
+        return self.transfer_target is not None
+
+    def start_leadership_transfer(self, target: str, message_pool: List[RaftMessage], nodes_ips: List[str]) -> None:
+        """Cel dostaje brakujące wpisy; TIMEOUT_NOW idzie, gdy jego match_index dojdzie do końca logu."""
+        self.transfer_target = target
+        # Po jednym timeoucie wyborów lider wraca do przyjmowania propozycji.
+        self.transfer_deadline = self._now() + self.election_base
+        self.log_event(f"Transferring leadership to {target}", "TRANSFER")
+        if self.match_tracker.get(target) >= self.get_last_log_index():
+            self._send_timeout_now(message_pool)
+        else:
+            self.broadcast_append_entries(message_pool, [target])
+
+    def _send_timeout_now(self, message_pool: List[RaftMessage]) -> None:
+        self.send_message(message_pool, [self.transfer_target], RaftMessageType.TIMEOUT_NOW, self.current_term, {})
+
+    def _handle_timeout_now(self, message: RaftMessage, nodes_ips: List[str], message_pool: List[RaftMessage]) -> None:
+        if self.learner or self.role == "leader": return
+        last_idx, last_term = self.begin_election()
+        self.log_event(f"TIMEOUT_NOW from {message.from_ip} - starting election (Term {self.current_term})", "ELECTION")
+        content = {"candidate_id": self.ip_addr, "last_log_index": last_idx, "last_log_term": last_term}
+        voters = [ip for ip in self.voters(nodes_ips) if ip != self.ip_addr]
+        self.send_message(message_pool, voters, RaftMessageType.REQUEST_VOTE, self.current_term, content)
 
     def become_leader(self, nodes_ips: List[str], message_pool: List[RaftMessage]) -> None:
         if self.role == "leader": return
         self.role = "leader"
         self.leader_id = self.ip_addr
+        self.transfer_target = None
         self.log_event(f"Became LEADER (Term {self.current_term})", "LEADER")
         
         last_idx = self.get_last_log_index()
         for ip in nodes_ips:
             if ip == self.ip_addr: continue
             self.next_index[ip] = last_idx + 1
-            self.match_index[ip] = -1
+        self.match_tracker.reset(self.voters(nodes_ips), learners=[ip for ip in nodes_ips if ip in self.learners])
+        self.match_tracker.update(self.ip_addr, last_idx)
             
         self.broadcast_append_entries(message_pool, nodes_ips)
 
+    def replicate(self, message_pool: List[RaftMessage], nodes_ips: List[str], quorum: int) -> None:
+        """Wysyła nowe wpisy: do wszystkich albo (thrifty) do quorum - 1 voterów o najmniejszym RTT."""
+        if self.thrifty:
+            peers = [ip for ip in self.voters(nodes_ips) if ip != self.ip_addr]
+            nodes_ips = sorted(peers, key=lambda ip: self.srtt.get(ip, 0.0))[:quorum - 1]
+        self.broadcast_append_entries(message_pool, nodes_ips)
+
     def broadcast_append_entries(self, message_pool: List[RaftMessage], nodes_ips: List[str]) -> None:
+        self._retune_timing()
+        timing = {"heartbeat_interval": self.heartbeat_interval, "election_base": self.election_base}
+        sent_at = self._now()
+        digest = {"applied": self.last_applied, "root": self.accounts.root()}
         for ip in nodes_ips:
             if ip == self.ip_addr: continue
             
             prev_idx = self.next_index.get(ip, 0) - 1
             prev_term = 0
-            if prev_idx >= 0 and prev_idx < len(self.log.entries):
-                prev_term = self.log.entries[prev_idx]["request_number"][0]
+            if prev_idx >= 0 and prev_idx < len(self.log):
+                prev_term = self.log.term_at(prev_idx)
             
             entries_to_send = []
-            if (prev_idx + 1) < len(self.log.entries):
-                entries_to_send = self.log.entries[prev_idx + 1:]
+            if (prev_idx + 1) < len(self.log):
+                entries_to_send = self.log.slice(prev_idx + 1, prev_idx + 1 + self.max_append_entries)
                 
             content = {
                 "prev_log_index": prev_idx,
                 "prev_log_term": prev_term,
                 "entries": entries_to_send,
                 "leader_commit": self.commit_index,
-                "leader_id": self.ip_addr
+                "leader_id": self.ip_addr,
+                "sent_at": sent_at,
+                "timing": timing,
+                "digest": digest,
             }
             
             self.send_message(message_pool, [ip], RaftMessageType.APPEND_ENTRIES, self.current_term, content)
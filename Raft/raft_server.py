@@ -220,7 +220,7 @@ class RaftServer:
                 return json.dumps({"success": True, "operation": operation, "term": self.node.current_term})
 
             if path == "/log" and method == "GET":
-                return json.dumps({"node_id": self.node_id, "log": self.node.log.entries})
+                return json.dumps({"node_id": self.node_id, "log": list(self.node.log.entries)})
 
             if path == "/start_election" and method == "POST":
                 await self.start_election()
@@ -0,0 +1,131 @@
+"""
+Stan kont maszyny stanów ze skrótem Merkle'a - wspólny dla wszystkich algorytmów.
+
+Konta są rozrzucone po `buckets` kubełkach (wg skrótu nazwy); liście drzewa to skróty kubełków,
+węzły wewnętrzne - skróty `fanout` dzieci. Zmiana salda oznacza tylko swój kubełek, a root() przelicza
+kubełki oznaczone i ich ścieżki do korzenia. Dwie repliki z tym samym indeksem zastosowanych wpisów
+porównują korzenie, a przy różnicy schodzą po poziomach tylko tam, gdzie skróty się różnią - do
+naprawy przesyłane są wyłącznie różniące się kubełki.
+"""
+import hashlib
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+
+@lru_cache(maxsize=4096)
+def _account_hash(account: str) -> int:
+    return int.from_bytes(hashlib.sha256(account.encode("utf-8")).digest()[:4], "big")
+
+
+class AccountStore(dict):
+    """Słownik sald (konto -> saldo) z przyrostowo aktualizowanym drzewem Merkle'a nad kubełkami kont."""
+
+    def __init__(self, initial: Optional[Dict[str, float]] = None, buckets: int = 64, fanout: int = 4) -> None:
+        super().__init__()
+        self.depth = 0
+        while fanout ** self.depth < buckets:
+            self.depth += 1
+        if fanout < 2 or fanout ** self.depth != buckets:
+            raise ValueError(f"buckets must be a power of fanout, got buckets={buckets} fanout={fanout}")
+        self.buckets = buckets
+        self.fanout = fanout
+        # levels[0] = [korzeń], levels[depth] = skróty kubełków
+        self._levels: List[List[bytes]] = [[b""] * fanout ** level for level in range(self.depth + 1)]
+        self._members: List[Set[str]] = [set() for _ in range(buckets)]
+        self._dirty: Set[int] = set(range(buckets))
+        if initial:
+            self.update(initial)
+
+    def bucket_of(self, account: str) -> int:
+        return _account_hash(account) % self.buckets
+
+    def __setitem__(self, account: str, balance: float) -> None:
+        super().__setitem__(account, balance)
+        bucket = self.bucket_of(account)
+        self._members[bucket].add(account)
+        self._dirty.add(bucket)
+
+    def __delitem__(self, account: str) -> None:
+        super().__delitem__(account)
+        bucket = self.bucket_of(account)
+        self._members[bucket].discard(account)
+        self._dirty.add(bucket)
+
+    def update(self, *args, **kwargs) -> None:
+        for account, balance in dict(*args, **kwargs).items():
+            self[account] = balance
+
+    def setdefault(self, account: str, default: float = 0.0) -> float:
+        if account not in self:
+            self[account] = default
+        return self[account]
+
+    def pop(self, account: str, *default):
+        if account not in self and default:
+            return default[0]
+        balance = self[account]
+        del self[account]
+        return balance
+
+    def popitem(self):
+        account, balance = super().popitem()
+        bucket = self.bucket_of(account)
+        self._members[bucket].discard(account)
+        self._dirty.add(bucket)
+        return account, balance
+
+    def clear(self) -> None:
+        super().clear()
+        for members in self._members:
+            members.clear()
+        self._dirty.update(range(self.buckets))
+
+    def _refresh(self) -> None:
+        if not self._dirty: return
+        leaves = self._levels[self.depth]
+        for bucket in self._dirty:
+            digest = hashlib.sha256()
+            for account in sorted(self._members[bucket]):
+                digest.update(f"{account}={dict.__getitem__(self, account)!r};".encode("utf-8"))
+            leaves[bucket] = digest.digest()
+        changed = self._dirty
+        for level in range(self.depth - 1, -1, -1):
+            changed = {index // self.fanout for index in changed}
+            children = self._levels[level + 1]
+            for index in changed:
+                start = index * self.fanout
+                self._levels[level][index] = hashlib.sha256(b"".join(children[start:start + self.fanout])).digest()
+        self._dirty = set()
+
+    def root(self) -> str:
+        self._refresh()
+        return self._levels[0][0].hex()
+
+    def hashes(self, level: int, indices: Iterable[int]) -> List[str]:
+        """Skróty węzłów drzewa na poziomie `level` (0 = korzeń, depth = kubełki)."""
+        self._refresh()
+        return [self._levels[level][index].hex() for index in indices]
+
+    def children(self, indices: Iterable[int]) -> List[int]:
+        return [index * self.fanout + child for index in indices for child in range(self.fanout)]
+
+    def mismatched(self, level: int, indices: List[int], hashes: List[str]) -> List[int]:
+        """Indeksy węzłów poziomu `level`, których skrót różni się od skrótów repliki wzorcowej."""
+        return [index for index, mine, theirs in zip(indices, self.hashes(level, indices), hashes) if mine != theirs]
+
+    def bucket(self, bucket: int) -> Dict[str, float]:
+        return {account: dict.__getitem__(self, account) for account in sorted(self._members[bucket])}
+
+    def answer(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """{"level": k, "indices": [...]} -> skróty tych węzłów; {"buckets": [...]} -> zawartość kubełków."""
+        if "buckets" in request:
+            return {"buckets": {str(b): self.bucket(b) for b in request["buckets"]}}
+        level, indices = request.get("level", 0), request.get("indices", [0])
+        return {"level": level, "indices": indices, "hashes": self.hashes(level, indices)}
+
+    def replace_bucket(self, bucket: int, accounts: Dict[str, float]) -> None:
+        """Naprawa: zawartość kubełka zastępowana zawartością z repliki wzorcowej."""
+        for account in [a for a in self._members[bucket] if a not in accounts]:
+            del self[account]
+        for account, balance in accounts.items():
+            self[account] = balance
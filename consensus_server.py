@@ -1,13 +1,40 @@
 import asyncio
+import heapq
+import itertools
 import json
 import os
 import sys
-import struct
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "Raft"))
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "Paxos"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "EPaxos"))
+
+from framing import FrameProtocol, LaneQueue, encode_frame
+from quorum import flexible_quorums
+
+# Pasy ruchu między węzłami: sterowanie (głosy, puste heartbeaty, odpowiedzi, PREPARE/PROMISE)
+# ma własne połączenie i jest przetwarzane przed replikacją danych (AppendEntries z wpisami, ACCEPT).
+CONTROL_LANE = 0
+BULK_LANE = 1
+CONTROL_MESSAGE_TYPES = {"REQUEST_VOTE", "VOTE", "APPEND_RESPONSE", "TIMEOUT_NOW", "PREPARE", "PROMISE"}
+
+
+def message_lane(message_type: str, content: Any) -> int:
+    if message_type in CONTROL_MESSAGE_TYPES:
+        return CONTROL_LANE
+    if message_type == "APPEND_ENTRIES" and isinstance(content, dict) and not content.get("entries"):
+        return CONTROL_LANE
+    return BULK_LANE
+
+
+def frame_lane(frame: Dict[str, Any]) -> int:
+    """Koperta z _flush_outbox zawiera wiadomości jednego pasa, więc wystarczy pierwsza."""
+    first = frame["messages"][0] if frame.get("messages") else frame
+    return message_lane(first.get("message_type"), first.get("message_content"))
+
 
 class ConsensusServer:
     def __init__(
@@ -17,15 +44,40 @@ class ConsensusServer:
         tcp_port: int,
         peers: List[Dict[str, Any]],
         algorithm: str = "raft",
+        role: str = "voter",
     ):
         self.node_id = node_id
         self.http_port = http_port
         self.tcp_port = tcp_port
         self.peers = peers
+        self.peers_by_ip: Dict[str, Dict[str, Any]] = {p["ip"]: p for p in peers}
+        self.role = role
+        # Konfiguracja startowa (z PEERS); obowiązuje, dopóki w logu Rafta nie ma wpisu CONFIG.
+        self._initial_members = [dict(p, role=p.get("role", "voter")) for p in peers] + [{"ip": self.get_own_ip(), "tcp_port": tcp_port, "role": role}]
+        self._config_index = -1
+        # (term, indeks) zastosowanego wpisu CONFIG; w Rafcie para jednoznacznie wyznacza wpis.
+        self._config_entry: Tuple[int, int] = (0, -1)
+        self._pending_promotions: set = set()
         self.algorithm = algorithm.lower()
         self.ip_addr = self.get_own_ip()
         self.paxos_round_counter = 0
         self.consensus_logs: List[Dict[str, Any]] = []
+        self._inbound = LaneQueue(frame_lane)
+        self._outbox: Dict[Tuple[int, str], List[Any]] = {}
+        self._links: Dict[Tuple[str, int], asyncio.StreamWriter] = {}
+        self._link_locks: Dict[Tuple[str, int], asyncio.Lock] = {}
+        self._flush_scheduled = False
+        # Aplikowanie zatwierdzonych wpisów Rafta poza obsługą wiadomości, paczkami po apply_batch_size.
+        self.apply_batch_size = 64
+        self._apply_task: Optional[asyncio.Task] = None
+        self._apply_waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._apply_waiter_seq = itertools.count()
+        # Szybka ścieżka Paxosa (PAXOS_FAST_PATH=1): wynik każdej szybkiej operacji po jej id.
+        self.fast_path = False
+        self._fast_waiters: Dict[Tuple[int, int], asyncio.Future] = {}
+        self._epaxos_waiters: Dict[Tuple[int, int], asyncio.Future] = {}
+        # Subskrybenci /subscribe czekający na kolejne zastosowane wpisy.
+        self._subscribers: List[asyncio.Future] = []
         
         self.node = None
         self.MessageType = None
@@ -38,12 +90,21 @@ class ConsensusServer:
     def get_own_ip(self) -> str:
         return os.getenv("NODE_IP", "127.0.0.1")
 
-    def _initialize_node(self):
+    def _initialize_node(self, fallback: bool = True):
+        # Błędne PAXOS_Q1/PAXOS_Q2 przerywają start Paxosa (przed fallbackiem do Rafta), zamiast po cichu spaść do większości.
+        paxos_quorums = self._paxos_quorums_from_env() if self.algorithm == "paxos" else None
         try:
             if self.algorithm == "raft":
                 from raft_messages import RaftMessage, RaftMessageType
                 from raft_nodes import Node as RaftNode
                 self.node = RaftNode(self.ip_addr, True, self.node_id, logger=self.add_log)
+                self.node.on_commit = self._schedule_apply
+                self.node.configure_timing(**self._timing_bounds_from_env())
+                self.node.thrifty = os.getenv("THRIFTY", "0") == "1"
+                self._config_index = -1
+                self._config_entry = (0, -1)
+                self._pending_promotions.clear()
+                self._set_members(self._initial_members)
                 self.MessageType = RaftMessageType
                 self.Message = RaftMessage
             elif self.algorithm == "paxos":
@@ -51,18 +112,173 @@ class ConsensusServer:
                 from paxos_nodes import Node as PaxosNode
                 # ZMIANA: Przekazujemy self.add_log jako logger
                 self.node = PaxosNode(self.ip_addr, True, self.node_id, logger=self.add_log)
+                self.node.thrifty = os.getenv("THRIFTY", "0") == "1"
+                self.node.distinguished_learner = os.getenv("PAXOS_DISTINGUISHED_LEARNER", "0") == "1"
+                if paxos_quorums:
+                    self.node.phase1_quorum, self.node.phase2_quorum = paxos_quorums
+                self.fast_path = os.getenv("PAXOS_FAST_PATH", "0") == "1"
+                self.node.on_fast_outcome = self._fast_outcome
                 self.MessageType = PaxosMessageType
                 self.Message = PaxosMessage
+            elif self.algorithm == "epaxos":
+                from epaxos_messages import EPaxosMessage, EPaxosMessageType
+                from epaxos_nodes import Node as EPaxosNode
+                self.node = EPaxosNode(self.ip_addr, True, self.node_id, logger=self.add_log)
+                self.node.on_executed = self._epaxos_executed
+                self.MessageType = EPaxosMessageType
+                self.Message = EPaxosMessage
             else:
                 raise ValueError(f"Unknown algorithm: {self.algorithm}")
         except Exception as e:
             print(f"[CRITICAL ERROR] Failed to initialize {self.algorithm}: {e}")
+            if not fallback:
+                raise
 
             if self.algorithm != "raft":
                 print("[System] Falling back to RAFT due to error.")
                 self.algorithm = "raft"
                 self._initialize_node()
 
+    def all_ips(self) -> List[str]:
+        return [p["ip"] for p in self.peers] + [self.ip_addr]
+
+    def voter_ips(self) -> List[str]:
+        """Węzły liczone do kworum. Learnerzy dotyczą tylko Rafta - w Paxosie każdy węzeł jest akceptorem."""
+        if self.algorithm != "raft":
+            return self.all_ips()
+        voters = [p["ip"] for p in self.peers if p.get("role", "voter") == "voter"]
+        if self.role == "voter":
+            voters.append(self.ip_addr)
+        return voters
+
+    def quorum(self) -> int:
+        return len(self.voter_ips()) // 2 + 1
+
+    # MEMBERSHIP - RAFT
+    def members(self) -> List[Dict[str, Any]]:
+        return [dict(p) for p in self.peers] + [{"ip": self.ip_addr, "tcp_port": self.tcp_port, "role": self.role}]
+
+    def _set_members(self, members: List[Dict[str, Any]]) -> None:
+        self.peers = [dict(m) for m in members if m["ip"] != self.ip_addr]
+        self.peers_by_ip = {p["ip"]: p for p in self.peers}
+        own = next((m for m in members if m["ip"] == self.ip_addr), None)
+        # Węzeł usunięty z konfiguracji zachowuje się jak learner: nie kandyduje i nie głosuje.
+        self.role = own.get("role", "voter") if own else "learner"
+        if hasattr(self.node, 'set_membership'):
+            self.node.learner = self.role == "learner"
+            self.node.set_membership(self.all_ips(), {p["ip"] for p in self.peers if p.get("role") == "learner"})
+
+    def _sync_membership(self) -> None:
+        """
+        Raft stosuje najnowszy wpis CONFIG z logu od razu, także niezatwierdzony; obcięcie logu go cofa.
+        Wołane po każdej wiadomości Rafta, więc obejmuje też obcięcia w APPEND_ENTRIES. Sam indeks nie
+        wystarcza: nowy lider może po obcięciu wstawić inny CONFIG na tę samą pozycję, dlatego porównujemy term i indeks.
+        """
+        if not hasattr(self.node, 'config_at'): return
+        index = self.node.log.last_config_index()
+        entry = (self.node.log.term_at(index), index) if index >= 0 else (0, -1)
+        if entry == self._config_entry: return
+        self._config_entry = entry
+        self._config_index = index
+        self._set_members(self._initial_members if index < 0 else self.node.config_at(index))
+        # Połączenia do usuniętych peerów nie są już potrzebne.
+        for ip, lane in [key for key in self._links if key[0] not in self.peers_by_ip]:
+            self._drop_link(ip, lane)
+        self.add_log(f"Membership: {[(m['ip'], m['role']) for m in self.members()]} (index {index})", "MEMBERSHIP")
+
+    def change_membership(self, action: str, ip: str, tcp_port: Optional[int] = None, voter: bool = True) -> dict:
+        """Zmiana pojedynczego serwera: add (jako learner), promote (learner -> voter), remove."""
+        if self.algorithm != "raft":
+            return {"success": False, "error": "Membership changes are supported only in Raft"}
+        if self.node.role != "leader":
+            return {"success": False, "error": "Not the leader", "leader": self.node.leader_id}
+        if self.node.log.last_config_index() > self.node.commit_index:
+            return {"success": False, "error": "Membership change already in progress"}
+
+        members = self.members()
+        current = next((m for m in members if m["ip"] == ip), None)
+        if action == "add":
+            if current is not None:
+                return {"success": False, "error": f"{ip} is already a member"}
+            if tcp_port is None:
+                return {"success": False, "error": "tcp_port is required"}
+            members.append({"ip": ip, "tcp_port": int(tcp_port), "role": "learner"})
+            if voter:
+                self._pending_promotions.add(ip)
+        elif action == "promote":
+            if current is None or current["role"] != "learner":
+                return {"success": False, "error": f"{ip} is not a learner"}
+            if self.node.match_tracker.get(ip) < self.node.commit_index:
+                return {"success": False, "error": f"{ip} has not caught up yet"}
+            current["role"] = "voter"
+            self._pending_promotions.discard(ip)
+        elif action == "remove":
+            if current is None:
+                return {"success": False, "error": f"{ip} is not a member"}
+            if ip == self.ip_addr:
+                return {"success": False, "error": "Leader cannot remove itself"}
+            members.remove(current)
+            self._pending_promotions.discard(ip)
+        else:
+            return {"success": False, "error": f"Unknown action: {action}"}
+
+        from raft_nodes import CONFIG_PREFIX
+        index = self.node.get_last_log_index() + 1
+        self.node.log.append((self.node.current_term, index), datetime.now(), CONFIG_PREFIX + json.dumps(members))
+        self._sync_membership()
+
+        msg_pool = []
+        self.node.broadcast_append_entries(msg_pool, self.all_ips())
+        for msg in msg_pool:
+            self._enqueue_outgoing(msg)
+        return {"success": True, "index": index, "members": members}
+
+    async def transfer_leadership(self, target: str, timeout: float = 1.0) -> dict:
+        if self.algorithm != "raft":
+            return {"success": False, "error": "Leadership transfer is supported only in Raft"}
+        if self.node.role != "leader":
+            return {"success": False, "error": "Not the leader", "leader": self.node.leader_id}
+        peer = self.peers_by_ip.get(target)
+        if peer is None or peer.get("role") != "voter":
+            return {"success": False, "error": f"{target} is not a voting member"}
+
+        msg_pool = []
+        self.node.start_leadership_transfer(target, msg_pool, self.all_ips())
+        for msg in msg_pool:
+            self._enqueue_outgoing(msg)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (self.node.role == "leader" or self.node.leader_id is None) and loop.time() < deadline:
+            await asyncio.sleep(0.01)
+        completed = self.node.role != "leader"
+        return {"success": completed, "target": target, "term": self.node.current_term, "leader": self.node.leader_id}
+
+    def _promote_caught_up_learners(self) -> None:
+        for ip in list(self._pending_promotions):
+            if ip not in self.peers_by_ip:
+                self._pending_promotions.discard(ip)
+            elif self.node.match_tracker.get(ip) >= self.node.commit_index:
+                self.change_membership("promote", ip)
+                return
+
+    @staticmethod
+    def _timing_bounds_from_env() -> Dict[str, float]:
+        """RAFT_HEARTBEAT_MIN/MAX i RAFT_ELECTION_MIN/MAX (sekundy) - granice adaptacyjnych czasów Rafta."""
+        bounds = {}
+        for name in ("heartbeat_min", "heartbeat_max", "election_min", "election_max"):
+            value = os.getenv(f"RAFT_{name.upper()}")
+            if value:
+                bounds[name] = float(value)
+        return bounds
+
+    def _paxos_quorums_from_env(self) -> Optional[Tuple[int, int]]:
+        """PAXOS_Q1/PAXOS_Q2 - rozmiary kworów faz Paxosa; wymagane Q1 + Q2 > N (ValueError w przeciwnym razie)."""
+        q1, q2 = os.getenv("PAXOS_Q1"), os.getenv("PAXOS_Q2")
+        if not q1 and not q2:
+            return None
+        return flexible_quorums(len(self.all_ips()), int(q1) if q1 else None, int(q2) if q2 else None)
+
     def add_log(self, message: str, level: str = "INFO"):
         print(f"[{level}] {message}")
         log_entry = {
@@ -78,7 +294,10 @@ class ConsensusServer:
 
     async def reinitialize_node(self):
         print(f"[Node {self.node_id}] Switching to {self.algorithm.upper()}")
-        self._initialize_node()
+        self._initialize_node(fallback=False)
+        # Szybkie operacje starego węzła nie zostaną już rozstrzygnięte.
+        for future in self._fast_waiters.values():
+            if not future.done(): future.set_result(False)
 
     async def _raft_election_loop(self):
         while True:
@@ -87,6 +306,7 @@ class ConsensusServer:
             if not hasattr(self.node, 'role'): continue
             
             if self.node.role == "leader": continue
+            if getattr(self.node, 'learner', False): continue
             
             now = self.node._now()
             if now >= self.node.election_deadline:
@@ -95,21 +315,21 @@ class ConsensusServer:
 
     async def _raft_heartbeat_loop(self):
         while True:
-            await asyncio.sleep(0.3)
+            await asyncio.sleep(getattr(self.node, 'heartbeat_interval', 0.3))
             if self.algorithm != "raft": continue
             if not hasattr(self.node, 'role'): continue
             
             if self.node.role == "leader":
+                if self._pending_promotions:
+                    self._promote_caught_up_learners()
                 msg_pool = []
-                all_ips = [p["ip"] for p in self.peers] + [self.ip_addr]
+                all_ips = self.all_ips()
                 
                 if hasattr(self.node, 'broadcast_append_entries'):
                     self.node.broadcast_append_entries(msg_pool, all_ips)
                 
                 for msg in msg_pool:
-                    peer = next((p for p in self.peers if p["ip"] == msg.to_ip), None)
-                    if peer:
-                        asyncio.create_task(self.send_tcp_message(peer["ip"], peer["tcp_port"], msg))
+                    self._enqueue_outgoing(msg)
 
     async def start_election_raft(self):
         if not hasattr(self.node, 'current_term'): return
@@ -132,8 +352,9 @@ class ConsensusServer:
         }
         
         for peer in self.peers:
+            if peer.get("role") == "learner": continue
             msg = self.Message(self.ip_addr, peer["ip"], self.MessageType.REQUEST_VOTE, self.node.current_term, content)
-            asyncio.create_task(self.send_tcp_message(peer["ip"], peer["tcp_port"], msg))
+            self._enqueue_outgoing(msg)
 
     # HTTP SERVER
     async def handle_http_request(self, reader, writer):
@@ -168,6 +389,13 @@ class ConsensusServer:
                 body_bytes = await reader.readexactly(content_length)
                 body_str = body_bytes.decode('utf-8')
 
+            if method == "GET" and path.partition("?")[0] == "/log/stream":
+                await self.stream_log(writer, path.partition("?")[2])
+                return
+            if method == "GET" and path.partition("?")[0] == "/subscribe":
+                await self.subscribe(reader, writer, path.partition("?")[2])
+                return
+
             response_data = await self.route_http_request(method, path, body_str)
             await self.send_json_response(writer, response_data)
 
@@ -205,8 +433,101 @@ class ConsensusServer:
         writer.write(body_bytes)
         await writer.drain()
 
+    @staticmethod
+    def _start_from(query: str) -> int:
+        params = {key: values[-1] for key, values in parse_qs(query).items()}
+        try:
+            return max(0, int(params.get("from", 0)))
+        except ValueError:
+            return 0
+
+    @staticmethod
+    def _write_ndjson_header(writer) -> None:
+        writer.write((
+            "HTTP/1.1 200 OK\r\n"
+            "Content-Type: application/x-ndjson; charset=utf-8\r\n"
+            "Transfer-Encoding: chunked\r\n"
+            "Access-Control-Allow-Origin: *\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode('utf-8'))
+
+    async def _write_entries(self, writer, start: int, end: int, batch: int) -> None:
+        """Wpisy [start, end) jako chunki NDJSON po `batch`; drain() po każdym chunku."""
+        log = self.node.log
+        for offset in range(start, end, batch):
+            lines = [json.dumps({"index": i, **log.entry(i)}) for i in range(offset, min(offset + batch, end))]
+            chunk = ("\n".join(lines) + "\n").encode('utf-8')
+            writer.write(f"{len(chunk):x}\r\n".encode('ascii') + chunk + b"\r\n")
+            await writer.drain()
+
+    async def stream_log(self, writer, query: str = "", batch: int = 256) -> None:
+        """
+        Eksport logu jako NDJSON w kodowaniu chunked: paczka `batch` wpisów na chunk, a drain() po każdym
+        wstrzymuje eksport, gdy klient nie nadąża. Eksport kończy się na długości logu z chwili startu.
+        """
+        start = self._start_from(query)
+        self._write_ndjson_header(writer)
+        await self._write_entries(writer, start, len(self.node.log), batch)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def subscribe(self, reader, writer, query: str = "", batch: int = 256, idle: float = 1.0) -> None:
+        """
+        Strumień CDC: zastosowane wpisy od `from` w kolejności logu, potem kolejne w miarę aplikowania.
+        Każda linia niesie "index", więc po rozłączeniu klient wznawia od from=<ostatni + 1>.
+        Wpisy czytane są z logu w pamięci do applied_index() - niezatwierdzony ogon Rafta nie wychodzi.
+        Połączenie trwa do rozłączenia klienta; bez nowych wpisów strumień budzi się co `idle` sekund.
+        """
+        next_index = self._start_from(query)
+        self._write_ndjson_header(writer)
+        await writer.drain()
+        loop = asyncio.get_running_loop()
+        try:
+            while not reader.at_eof() and not writer.is_closing():
+                applied = self.applied_index()
+                if next_index <= applied:
+                    await self._write_entries(writer, next_index, applied + 1, batch)
+                    next_index = applied + 1
+                    continue
+                waiter = loop.create_future()
+                self._subscribers.append(waiter)
+                try:
+                    await asyncio.wait_for(waiter, idle)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    if waiter in self._subscribers: self._subscribers.remove(waiter)
+        except ConnectionError:
+            return
+        if not writer.is_closing():
+            writer.write(b"0\r\n\r\n")
+
+    def _notify_subscribers(self) -> None:
+        """Budzi strumienie /subscribe; wołane po każdej porcji pracy, która mogła zastosować wpisy."""
+        if not self._subscribers: return
+        subscribers, self._subscribers = self._subscribers, []
+        for waiter in subscribers:
+            if not waiter.done():
+                waiter.set_result(True)
+
+    def log_page(self, start: int = 0, limit: int = 1000) -> dict:
+        """Strona logu [start, start + limit); `next` - początek kolejnej strony albo None na końcu."""
+        log = self.node.log
+        total = len(log)
+        stop = min(start + limit, total)
+        return {
+            "node_id": self.node_id,
+            "algorithm": self.algorithm,
+            "from": start,
+            "total": total,
+            "next": stop if stop < total else None,
+            "log": [log.entry(i) for i in range(start, stop)],
+        }
+
     async def route_http_request(self, method, path, body) -> dict:
         data = json.loads(body) if body else {}
+        path, _, query = path.partition("?")
+        params = {key: values[-1] for key, values in parse_qs(query).items()}
 
         if path == "/status" and method == "GET":
             if self.algorithm == "raft":
@@ -214,10 +535,24 @@ class ConsensusServer:
                     "node_id": self.node_id,
                     "algorithm": "raft",
                     "role": getattr(self.node, 'role', 'unknown'),
+                    "learner": getattr(self.node, 'learner', False),
                     "term": getattr(self.node, 'current_term', 0),
                     "leader": getattr(self.node, 'leader_id', None),
                     "log_size": len(self.node.log.entries),
-                    "commit_index": getattr(self.node, 'commit_index', -1)
+                    "commit_index": getattr(self.node, 'commit_index', -1),
+                    "last_applied": getattr(self.node, 'last_applied', -1),
+                    "apply_lag": self.node.apply_lag(),
+                    "timing": self.node.timing(),
+                }
+            elif self.algorithm == "epaxos":
+                return {
+                    "node_id": self.node_id,
+                    "algorithm": "epaxos",
+                    "instances": len(self.node.instances),
+                    "in_flight": len(self.node.leading),
+                    "fast_commits": self.node.fast_commits,
+                    "slow_commits": self.node.slow_commits,
+                    "log_size": len(self.node.log),
                 }
             else:
                 promised = getattr(self.node, 'highest_promised_id', (0,0))
@@ -225,60 +560,105 @@ class ConsensusServer:
                     "node_id": self.node_id,
                     "algorithm": "paxos",
                     "promised_id": f"{promised[0]}.{promised[1]}",
+                    "thrifty": getattr(self.node, 'thrifty', False),
+                    "distinguished_learner": getattr(self.node, 'distinguished_learner', False),
+                    "quorums": {"q1": self.node.phase_quorum(self.MessageType.PREPARE, self.quorum()),
+                                "q2": self.node.phase_quorum(self.MessageType.ACCEPT, self.quorum()),
+                                "fast": self.node.fast_quorum_size(self.all_ips(), self.quorum())},
+                    "fast_path": self.fast_path,
                     "log_size": len(self.node.log.entries),
                 }
 
         elif path == "/switch_algorithm" and method == "POST":
             new_algo = data.get("algorithm", "").lower()
-            if new_algo not in ["raft", "paxos"]:
+            if new_algo not in ["raft", "paxos", "epaxos"]:
                 return {"success": False, "error": "Invalid algorithm"}
             
+            if new_algo == self.algorithm:
+                return {"success": True, "algorithm": self.algorithm}
+            # Konfiguracja sprawdzana przed jakąkolwiek zmianą stanu; nieudana inicjalizacja przywraca poprzedni węzeł.
+            previous = (self.algorithm, self.node, self.MessageType, self.Message, self.fast_path)
             try:
-                if new_algo != self.algorithm:
-                    self.add_log(f"SWITCHING ALGORITHM TO {new_algo.upper()}", "SYSTEM")
-                    self.algorithm = new_algo
-                    await self.reinitialize_node()
+                if new_algo == "paxos":
+                    self._paxos_quorums_from_env()
+                self.add_log(f"SWITCHING ALGORITHM TO {new_algo.upper()}", "SYSTEM")
+                self.algorithm = new_algo
+                await self.reinitialize_node()
                 return {"success": True, "algorithm": self.algorithm}
             except Exception as e:
-                return {"success": False, "error": str(e)}
+                self.algorithm, self.node, self.MessageType, self.Message, self.fast_path = previous
+                return {"success": False, "error": str(e), "algorithm": self.algorithm}
 
         elif path == "/propose" and method == "POST":
             operation = data.get("operation", "")
             if self.algorithm == "raft":
                 if self.node.role != "leader":
                     return {"success": False, "error": "Not the leader", "leader": self.node.leader_id}
+                if self.node.transfer_in_progress():
+                    return {"success": False, "error": "Leadership transfer in progress", "leader": self.node.transfer_target}
                 
-                self.node.log.append((self.node.current_term, self.node.get_last_log_index() + 1), datetime.now(), operation)
+                index = self.node.get_last_log_index() + 1
+                self.node.log.append((self.node.current_term, index), datetime.now(), operation)
                 
                 msg_pool = []
-                all_ips = [p["ip"] for p in self.peers] + [self.ip_addr]
-                if hasattr(self.node, 'broadcast_append_entries'):
-                    self.node.broadcast_append_entries(msg_pool, all_ips)
-                    
+                self.node.replicate(msg_pool, self.all_ips(), self.quorum())
                 for msg in msg_pool:
-                     peer = next((p for p in self.peers if p["ip"] == msg.to_ip), None)
-                     if peer: asyncio.create_task(self.send_tcp_message(peer["ip"], peer["tcp_port"], msg))
+                    self._enqueue_outgoing(msg)
                 
-                await asyncio.sleep(1.0)
+                applied = await self.wait_applied(index, timeout=1.0)
                 current_accounts = getattr(self.node, 'accounts', {})
                 return {
                     "success": True, 
                     "operation": operation, 
                     "term": self.node.current_term,
+                    "applied": applied,
                     "new_state": current_accounts 
                 }
+            elif self.algorithm == "epaxos":
+                return await self.propose_operation_epaxos(operation)
             else:
                 # PAXOS
+                if data.get("transaction"):
+                    # Transakcja z blokadami kont: TX_ID uporządkowany czasem zgłoszenia (wait-die porównuje wiek).
+                    from paxos_locks import with_tx_id
+                    operation = with_tx_id(operation, self.node_id)
                 try:
+                    if self.fast_path and await self.propose_operation_fast(operation):
+                        current_accounts = getattr(self.node, 'accounts', {})
+                        return {"success": True, "algorithm": "paxos", "fast_path": True, "operation": operation,
+                                "new_state": current_accounts}
                     await self.propose_operation_paxos(operation)
                     await asyncio.sleep(2.0)
                     current_accounts = getattr(self.node, 'accounts', {})
-                    return {"success": True, "algorithm": "paxos", "new_state": current_accounts}
+                    return {"success": True, "algorithm": "paxos", "operation": operation, "new_state": current_accounts}
                 except Exception as e:
                     return {"success": False, "error": str(e)}
 
+        elif path == "/membership" and method == "GET":
+            return {
+                "node_id": self.node_id,
+                "members": self.members(),
+                "config_index": self._config_index,
+                "committed": self._config_index <= getattr(self.node, 'commit_index', -1),
+                "pending_promotions": sorted(self._pending_promotions),
+            }
+
+        elif path == "/membership" and method == "POST":
+            return self.change_membership(
+                data.get("action", ""), data.get("ip", ""), data.get("tcp_port"), data.get("voter", True)
+            )
+
+        elif path == "/transfer_leadership" and method == "POST":
+            return await self.transfer_leadership(data.get("target", ""))
+
         elif path == "/log" and method == "GET":
-            return {"node_id": self.node_id, "algorithm": self.algorithm, "log": self.node.log.entries}
+            try:
+                start, limit = int(params.get("from", 0)), int(params.get("limit", 1000))
+            except ValueError:
+                return {"error": "from and limit must be integers"}
+            if start < 0 or not 1 <= limit <= 10000:
+                return {"error": "from must be >= 0 and limit between 1 and 10000"}
+            return self.log_page(start, limit)
         
         elif path == "/consensus_logs" and method == "GET":
              return {"node_id": self.node_id, "logs": self.consensus_logs}
@@ -288,59 +668,124 @@ class ConsensusServer:
             await self.reinitialize_node()
             return {"success": True}
         
+        elif path == "/digest" and method == "GET":
+            accounts = self.node.accounts
+            digest = {
+                "node_id": self.node_id,
+                "algorithm": self.algorithm,
+                "applied": self.applied_index(),
+                "root": accounts.root(),
+                "buckets": accounts.buckets,
+                "fanout": accounts.fanout,
+            }
+            if self.algorithm == "raft":
+                digest.update(divergences=self.node.divergences, repaired_buckets=self.node.repaired_buckets)
+            return digest
+
+        elif path == "/digest" and method == "POST":
+            # Zejście po drzewie z zewnątrz: skróty wskazanych węzłów albo zawartość kubełków.
+            return {"applied": self.applied_index(), **self.node.accounts.answer(data)}
+
+        elif path.startswith("/accounts/") and path.endswith("/history") and method == "GET":
+            account = unquote(path[len("/accounts/"):-len("/history")])
+            try:
+                offset, limit = int(params.get("offset", 0)), int(params.get("limit", 50))
+            except ValueError:
+                return {"error": "offset and limit must be integers"}
+            return self.account_history(account, offset, limit)
+
         elif path == "/accounts" and method == "GET":
+            if "at_index" in params or "at_time" in params:
+                return self.accounts_at(params.get("at_index"), params.get("at_time"))
             # Zwracamy aktualny stan kont z pamięci węzła
             return getattr(self.node, 'accounts', {})
 
         return {"error": "Not found"}
 
     # TCP SERVER
-    async def handle_tcp_message(self, reader, writer):
-        try:
-            while True:
+    async def _tcp_inbound_loop(self):
+        while True:
+            frame = await self._inbound.get()
+            # Ramka to pojedyncza wiadomość albo koperta {"messages": [...]} z _flush_outbox
+            for message_dict in frame.get("messages", [frame]):
                 try:
-                    length_bytes = await reader.readexactly(4)
-                except asyncio.IncompleteReadError: break 
-                
-                length = struct.unpack('>I', length_bytes)[0]
-                data = await reader.readexactly(length)
-                message_dict = json.loads(data.decode("utf-8"))
-                await self.process_consensus_message(message_dict)
-        except Exception: pass
-        finally:
-            writer.close()
-            await writer.wait_closed()
+                    await self.process_consensus_message(message_dict)
+                except Exception as e:
+                    print(f"[TCP Error] {e}")
+
+    def _message_to_dict(self, message: Any) -> dict:
+        msg_dict = {
+            "from_ip": message.from_ip,
+            "to_ip": message.to_ip,
+            "message_type": message.message_type.name,
+            "message_content": message.message_content,
+        }
+        if self.algorithm == "raft":
+            msg_dict["term"] = message.term
+        elif self.algorithm == "epaxos":
+            msg_dict["instance"] = message.instance
+        else:
+            rid = getattr(message, "round_identyfier", getattr(message, "round_identifier", "0.0"))
+            msg_dict["round_identifier"] = rid
+        return msg_dict
 
     async def send_tcp_message(self, ip: str, port: int, message: Any):
-        try:
-            reader, writer = await asyncio.open_connection(ip, port)
-            
-            msg_dict = {
-                "from_ip": message.from_ip,
-                "to_ip": message.to_ip,
-                "message_type": message.message_type.name,
-                "message_content": message.message_content,
-            }
-            if self.algorithm == "raft":
-                msg_dict["term"] = message.term
-            else:
-                rid = getattr(message, "round_identyfier", getattr(message, "round_identifier", "0.0"))
-                msg_dict["round_identifier"] = rid
+        await self.send_tcp_messages(ip, port, [message])
 
-            json_data = json.dumps(msg_dict).encode("utf-8")
-            writer.write(struct.pack('>I', len(json_data)))
-            writer.write(json_data)
+    async def send_tcp_messages(self, ip: str, port: int, messages: List[Any]):
+        """Wysyła paczkę wiadomości jednego pasa trwałym połączeniem tego pasa do peera."""
+        if len(messages) == 1:
+            frame = self._message_to_dict(messages[0])
+        else:
+            frame = {"messages": [self._message_to_dict(m) for m in messages]}
+        lane = self._lane_of(messages[0])
+        try:
+            writer = await self._get_link(ip, port, lane)
+            writer.writelines(encode_frame(frame))
             await writer.drain()
+        except Exception:
+            self._drop_link(ip, lane)
+
+    @staticmethod
+    def _lane_of(message: Any) -> int:
+        return message_lane(message.message_type.name, message.message_content)
+
+    async def _get_link(self, ip: str, port: int, lane: int) -> asyncio.StreamWriter:
+        key = (ip, lane)
+        writer = self._links.get(key)
+        if writer is not None and not writer.is_closing():
+            return writer
+        async with self._link_locks.setdefault(key, asyncio.Lock()):
+            writer = self._links.get(key)
+            if writer is None or writer.is_closing():
+                reader, writer = await asyncio.open_connection(ip, port)
+                self._links[key] = writer
+                asyncio.create_task(self._watch_link(key, reader, writer))
+        return writer
+
+    async def _watch_link(self, key: Tuple[str, int], reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # Peer nic nie odsyła tym połączeniem - EOF lub błąd oznacza, że trzeba połączyć się na nowo.
+        try:
+            await reader.read()
+        except Exception:
+            pass
+        if self._links.get(key) is writer:
+            self._drop_link(*key)
+
+    def _drop_link(self, ip: str, lane: int) -> None:
+        writer = self._links.pop((ip, lane), None)
+        if writer is not None:
             writer.close()
-            await writer.wait_closed()
-        except Exception: pass
 
     async def process_consensus_message(self, message_dict):
         msg_type_str = message_dict["message_type"]
-        is_raft_msg = msg_type_str in ["REQUEST_VOTE", "VOTE", "APPEND_ENTRIES", "APPEND_RESPONSE"]
+        is_raft_msg = msg_type_str in ["REQUEST_VOTE", "VOTE", "APPEND_ENTRIES", "APPEND_RESPONSE", "TIMEOUT_NOW",
+                                       "DIGEST_REQUEST", "DIGEST_REPLY"]
         
         if self.algorithm == "raft" and not is_raft_msg: return
         if self.algorithm == "paxos" and is_raft_msg: return
+        # Wiadomości innego algorytmu (np. w trakcie /switch_algorithm na części węzłów) są pomijane.
+        if msg_type_str not in self.MessageType.__members__: return
 
         if self.algorithm == "raft":
             message = self.Message(
@@ -350,6 +795,14 @@ class ConsensusServer:
                 term=message_dict["term"],
                 message_content=message_dict.get("message_content"),
             )
+        elif self.algorithm == "epaxos":
+            message = self.Message(
+                from_ip=message_dict["from_ip"],
+                to_ip=message_dict["to_ip"],
+                message_type=self.MessageType[msg_type_str],
+                instance=message_dict["instance"],
+                message_content=message_dict.get("message_content"),
+            )
         else:
             rid = message_dict.get("round_identifier", message_dict.get("round_identyfier"))
             message = self.Message(
@@ -360,17 +813,23 @@ class ConsensusServer:
                 message_content=message_dict.get("message_content"),
             )
 
+        # Węzeł usunięty z klastra nie może wybijać lidera swoimi wyborami.
+        if msg_type_str == "REQUEST_VOTE" and message.from_ip not in self.peers_by_ip: return
+
         response_pool = []
-        all_peer_ips = [p["ip"] for p in self.peers] + [self.ip_addr]
-        quorum = len(all_peer_ips) // 2 + 1
+        all_peer_ips = self.all_ips()
+        quorum = self.quorum()
 
         if hasattr(self.node, 'receive_message'):
             self.node.receive_message(message, response_pool, quorum, all_peer_ips)
         else:
             self.node.recieve_message(message, response_pool, quorum, all_peer_ips)
+        if self.algorithm == "raft":
+            self._sync_membership()
 
         for response in response_pool:
             await self._deliver_outgoing(response, all_peer_ips, quorum)
+        self._notify_subscribers()
 
     async def _deliver_outgoing(self, message, all_peer_ips, quorum):
         if message.to_ip == self.ip_addr:
@@ -378,25 +837,81 @@ class ConsensusServer:
             self.node.receive_message(message, local_response_pool, quorum, all_peer_ips)
             for r in local_response_pool:
                 await self._deliver_outgoing(r, all_peer_ips, quorum)
+            self._notify_subscribers()
+            return
+
+        self._enqueue_outgoing(message)
+
+    def _enqueue_outgoing(self, message: Any) -> None:
+        """Odkłada wiadomość do kolejki peera; wszystkie kolejki są wysyłane raz na iterację pętli."""
+        if message.to_ip not in self.peers_by_ip:
             return
+        self._outbox.setdefault((self._lane_of(message), message.to_ip), []).append(message)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush_outbox)
 
-        peer = next((p for p in self.peers if p["ip"] == message.to_ip), None)
-        if peer:
-            asyncio.create_task(self.send_tcp_message(peer["ip"], peer["tcp_port"], message))
+    def _flush_outbox(self) -> None:
+        self._flush_scheduled = False
+        outbox, self._outbox = self._outbox, {}
+        # Pas sterujący startuje pierwszy; każdy pas ma osobne połączenie, więc duża paczka nie blokuje heartbeatu.
+        for (_, ip), messages in sorted(outbox.items(), key=lambda item: item[0][0]):
+            peer = self.peers_by_ip.get(ip)
+            if peer:
+                asyncio.create_task(self.send_tcp_messages(ip, peer["tcp_port"], messages))
     
+    # APPLY PIPELINE - RAFT
+    def _schedule_apply(self) -> None:
+        """Wywoływane przez węzeł przy przesunięciu commit_index; uruchamia zadanie aplikowania, jeśli nie działa."""
+        if self._apply_task is None or self._apply_task.done():
+            self._apply_task = asyncio.get_running_loop().create_task(self._raft_apply_loop())
+
+    async def _raft_apply_loop(self):
+        node = self.node
+        while node is self.node and node.last_applied < node.commit_index:
+            try:
+                node.apply_committed_entries(limit=self.apply_batch_size)
+            except Exception as e:
+                print(f"[Apply Error] {e}")
+            self._release_apply_waiters(node.last_applied)
+            self._notify_subscribers()
+            # Oddaje pętlę, żeby wiadomości konsensusu nie czekały na całe zaległości maszyny stanów.
+            await asyncio.sleep(0)
+
+    def _release_apply_waiters(self, last_applied: int) -> None:
+        while self._apply_waiters and self._apply_waiters[0][0] <= last_applied:
+            _, _, future = heapq.heappop(self._apply_waiters)
+            if not future.done():
+                future.set_result(True)
+
+    async def wait_applied(self, index: int, timeout: float) -> bool:
+        """Czeka, aż wpis `index` zostanie zaaplikowany lokalnie; False po przekroczeniu czasu."""
+        if self.node.last_applied >= index:
+            return True
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._apply_waiters, (index, next(self._apply_waiter_seq), future))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return False
+
     # LOGIC - PAXOS
     async def propose_operation_paxos(self, operation: str):
-        self.paxos_round_counter += 1
-        round_id = f"{self.node_id}.{self.paxos_round_counter}"
+        # Runda (licznik, id_węzła): musi przebić najwyższą obiecaną, a id węzła rozstrzyga remisy.
+        self.paxos_round_counter = max(self.paxos_round_counter, self.node.highest_promised_id[0]) + 1
+        round_id = f"{self.paxos_round_counter}.{self.node_id}"
         self.add_log(f"Proposing: {operation} (round {round_id})", "PROPOSE")
         self.node.message_content = operation
 
-        all_peer_ips = [p["ip"] for p in self.peers] + [self.ip_addr]
-        quorum = len(all_peer_ips) // 2 + 1
+        all_peer_ips = self.all_ips()
+        quorum = self.quorum()
 
+        # PREPARE do wszystkich albo (THRIFTY) tylko do najszybszego kworum.
+        targets = set(self.node.plan_phase(all_peer_ips, quorum, operation, self.MessageType.PREPARE, round_id))
         for peer in self.peers:
+            if peer["ip"] not in targets: continue
             msg = self.Message(self.ip_addr, peer["ip"], self.MessageType.PREPARE, round_id, operation)
-            asyncio.create_task(self.send_tcp_message(peer["ip"], peer["tcp_port"], msg))
+            self._enqueue_outgoing(msg)
 
         local_msg = self.Message(self.ip_addr, self.ip_addr, self.MessageType.PREPARE, round_id, operation)
         local_response_pool = []
@@ -404,32 +919,178 @@ class ConsensusServer:
         for r in local_response_pool:
             await self._deliver_outgoing(r, all_peer_ips, quorum)
 
+    async def propose_operation_fast(self, operation: str) -> bool:
+        """Szybka ścieżka: True, gdy kworum szybkie przyjęło operację; False - trzeba użyć zwykłego Paxosa."""
+        all_peer_ips = self.all_ips()
+        quorum = self.quorum()
+        pool = []
+        op_id = self.node.start_fast_proposal(pool, all_peer_ips, operation)
+        if op_id is None:
+            return False
+        # Wynik ustala węzeł (kworum, konflikt albo deadline w _paxos_phase_loop), więc czekamy bez własnego timeoutu.
+        future = asyncio.get_running_loop().create_future()
+        self._fast_waiters[op_id] = future
+        try:
+            for msg in pool:
+                await self._deliver_outgoing(msg, all_peer_ips, quorum)
+            return await future
+        finally:
+            self._fast_waiters.pop(op_id, None)
+
+    def _fast_outcome(self, op_id: Tuple[int, int], committed: bool) -> None:
+        future = self._fast_waiters.get(op_id)
+        if future is not None and not future.done():
+            future.set_result(committed)
+
+    async def _paxos_phase_loop(self):
+        """Dosyła fazy trybu oszczędnego, rozstrzyga przeterminowane szybkie operacje, wygasłe blokady kont i synchronizację."""
+        while True:
+            await asyncio.sleep(0.05)
+            if self.algorithm != "paxos": continue
+            pool = []
+            if getattr(self.node, 'pending_phase', None) is not None:
+                self.node.expire_pending_phase(pool)
+            self.node.expire_fast(pool)
+            self.node.expire_locks(pool)
+            self.node.expire_catchup(pool)
+            all_peer_ips = self.all_ips()
+            self.node.sync_decisions(pool, all_peer_ips)
+            for msg in pool:
+                await self._deliver_outgoing(msg, all_peer_ips, self.quorum())
+
+    async def paxos_catch_up(self):
+        """Węzeł po starcie nie zna decyzji podjętych, gdy nie działał - pobiera je od peerów."""
+        pool = []
+        self.node.request_catchup(pool, self.all_ips())
+        for msg in pool:
+            await self._deliver_outgoing(msg, self.all_ips(), self.quorum())
+
+    def account_history(self, account: str, offset: int = 0, limit: int = 50) -> dict:
+        """Strona historii konta z indeksu węzła - koszt zależy od liczby zwróconych wpisów, nie od długości logu."""
+        if offset < 0 or not 1 <= limit <= 500:
+            return {"error": "offset must be >= 0 and limit between 1 and 500"}
+        history = self.node.history
+        entries = [{"index": index, **self.node.log.entry(index)} for index in history.page(account, offset, limit)]
+        return {
+            "node_id": self.node_id,
+            "account": account,
+            "total": history.count(account),
+            "offset": offset,
+            "limit": limit,
+            "entries": entries,
+        }
+
+    def accounts_at(self, at_index: Optional[str] = None, at_time: Optional[str] = None) -> dict:
+        """Stan kont po wpisie `at_index` albo po ostatnim wpisie zastosowanym do chwili `at_time` (epoka lub ISO)."""
+        history = self.node.history
+        try:
+            if at_index is not None:
+                index = history.last_index_at(int(at_index))
+            else:
+                try:
+                    timestamp = float(at_time)
+                except ValueError:
+                    timestamp = datetime.fromisoformat(at_time).timestamp()
+                index = history.index_at_time(timestamp)
+        except ValueError:
+            return {"error": "at_index must be an integer and at_time epoch seconds or ISO 8601"}
+        return {"node_id": self.node_id, "at_index": index, "applied": self.applied_index(),
+                "accounts": history.balances_at(index)}
+
+    def applied_index(self) -> int:
+        """Indeks ostatniego wpisu zastosowanego do kont - skróty stanu porównuje się tylko przy tym samym."""
+        if self.algorithm == "raft":
+            return self.node.last_applied
+        return len(self.node.log) - 1
+
+    # LOGIC - EPAXOS
+    async def propose_operation_epaxos(self, operation: str, timeout: float = 1.0) -> dict:
+        """Każdy węzeł jest liderem własnych instancji; odpowiedź po wykonaniu instancji lokalnie (max `timeout`)."""
+        all_peer_ips = self.all_ips()
+        quorum = self.quorum()
+        pool = []
+        instance = self.node.propose(pool, all_peer_ips, operation)
+        future = asyncio.get_running_loop().create_future()
+        if self.node.is_executed(instance):
+            future.set_result(True)
+        self._epaxos_waiters[instance] = future
+        try:
+            for msg in pool:
+                await self._deliver_outgoing(msg, all_peer_ips, quorum)
+            executed = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            executed = False
+        finally:
+            self._epaxos_waiters.pop(instance, None)
+        result = {
+            "success": executed,
+            "algorithm": "epaxos",
+            "instance": f"{instance[0]}.{instance[1]}",
+            "executed": executed,
+            "new_state": self.node.accounts,
+        }
+        if not executed:
+            # Instancja może jeszcze zostać wykonana, ale klient nie dostaje potwierdzenia.
+            result["error"] = f"Instance not executed within {timeout} s"
+        return result
+
+    def _epaxos_executed(self, instance: Tuple[int, int]) -> None:
+        future = self._epaxos_waiters.get(instance)
+        if future is not None and not future.done():
+            future.set_result(True)
+
+    async def _epaxos_timeout_loop(self):
+        """Instancje bez kworum szybkiego po slow_timeout przechodzą na ścieżkę wolną."""
+        while True:
+            await asyncio.sleep(0.05)
+            if self.algorithm != "epaxos" or not self.node.leading: continue
+            pool = []
+            self.node.expire(pool, self.quorum())
+            all_peer_ips = self.all_ips()
+            for msg in pool:
+                await self._deliver_outgoing(msg, all_peer_ips, self.quorum())
+
     async def run(self):
         http_server = await asyncio.start_server(self.handle_http_request, "0.0.0.0", self.http_port)
-        tcp_server = await asyncio.start_server(self.handle_tcp_message, "0.0.0.0", self.tcp_port)
+        loop = asyncio.get_running_loop()
+        tcp_server = await loop.create_server(lambda: FrameProtocol(self._inbound.put_nowait), "0.0.0.0", self.tcp_port)
         
+        asyncio.create_task(self._tcp_inbound_loop())
         asyncio.create_task(self._raft_election_loop())
         asyncio.create_task(self._raft_heartbeat_loop())
+        asyncio.create_task(self._paxos_phase_loop())
+        asyncio.create_task(self._epaxos_timeout_loop())
+        if self.algorithm == "paxos":
+            asyncio.create_task(self.paxos_catch_up())
         
         await asyncio.gather(
             http_server.serve_forever(),
             tcp_server.serve_forever()
         )
 
+def parse_peers(spec: str) -> List[Dict[str, Any]]:
+    """PEERS = "ip:port;ip:port:learner" - opcjonalny trzeci element to rola (voter domyślnie)."""
+    peers = []
+    for p in spec.split(";"):
+        parts = p.strip().split(":")
+        if len(parts) < 2:
+            continue
+        role = parts[2].lower() if len(parts) > 2 else "voter"
+        if role not in ("voter", "learner"):
+            raise ValueError(f"Unknown peer role: {role}")
+        peers.append({"ip": parts[0], "tcp_port": int(parts[1]), "role": role})
+    return peers
+
 async def main():
     node_id = int(os.getenv("NODE_ID", "1"))
     http_port = int(os.getenv("HTTP_PORT", "8000"))
     tcp_port = int(os.getenv("TCP_PORT", "5000"))
     algorithm = os.getenv("ALGORITHM", "raft")
     
-    peers = []
-    if os.getenv("PEERS"):
-        for p in os.getenv("PEERS").split(";"):
-            if ":" in p:
-                ip, port = p.split(":")
-                peers.append({"ip": ip, "tcp_port": int(port)})
+    role = os.getenv("NODE_ROLE", "voter").lower()
+    peers = parse_peers(os.getenv("PEERS", ""))
 
-    server = ConsensusServer(node_id, http_port, tcp_port, peers, algorithm)
+    server = ConsensusServer(node_id, http_port, tcp_port, peers, algorithm, role)
     await server.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+"""
+Warstwa ramek dla komunikacji TCP między węzłami.
+
+Ramka = 4 bajty długości (big-endian, unsigned) + payload JSON w UTF-8.
+
+Odbiór oparty jest na asyncio.BufferedProtocol: transport czyta bezpośrednio
+(recv_into) do rosnącego bufora bytearray, a parser przechodzi po nim
+offsetami i wyciąga wszystkie kompletne ramki z jednego odczytu. Wysyłka
+składa nagłówek i payload w jedno wywołanie writelines.
+
+LaneQueue porządkuje odebrane ramki według pasa (np. sterowanie przed
+replikacją danych), zachowując kolejność FIFO w obrębie pasa. Sterowanie
+wyprzedza także wcześniejsze dane tego samego nadawcy - Raft i Paxos znoszą
+zmianę kolejności wiadomości, a heartbeat ani głos nie czeka za paczką wpisów.
+"""
+import asyncio
+import itertools
+import json
+import struct
+from typing import Any, Callable, List, Optional
+
+HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+MIN_READ_SIZE = 64 * 1024
+
+
+def encode_frame(payload: Any) -> List[bytes]:
+    """Zwraca [nagłówek, payload] gotowe do transport.writelines / writer.writelines."""
+    body = json.dumps(payload).encode("utf-8")
+    return [HEADER.pack(len(body)), body]
+
+
+class FrameProtocol(asyncio.BufferedProtocol):
+    """Dekoduje ramki z połączenia i przekazuje każdy zdekodowany obiekt do `on_frame`."""
+
+    def __init__(self, on_frame: Callable[[Any], None], initial_size: int = MIN_READ_SIZE) -> None:
+        self.on_frame = on_frame
+        self.transport: Optional[asyncio.BaseTransport] = None
+        self._buffer = bytearray(initial_size)
+        self._start = 0
+        self._end = 0
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        wanted = max(sizehint, MIN_READ_SIZE)
+        if len(self._buffer) - self._end < wanted:
+            self._make_room(wanted)
+        return memoryview(self._buffer)[self._end:]
+
+    def _make_room(self, wanted: int) -> None:
+        pending = self._end - self._start
+        if self._start and len(self._buffer) - pending >= wanted:
+            # Przesunięcie niedokończonej ramki na początek bufora zamiast realokacji.
+            self._buffer[:pending] = self._buffer[self._start:self._end]
+        else:
+            size = len(self._buffer)
+            while size - pending < wanted:
+                size *= 2
+            grown = bytearray(size)
+            grown[:pending] = self._buffer[self._start:self._end]
+            self._buffer = grown
+        self._start, self._end = 0, pending
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self._end += nbytes
+        buf = self._buffer
+        pos, end = self._start, self._end
+
+        while end - pos >= HEADER.size:
+            (length,) = HEADER.unpack_from(buf, pos)
+            if length > MAX_FRAME_SIZE:
+                self.transport.close()
+                return
+            frame_end = pos + HEADER.size + length
+            if frame_end > end:
+                break
+            # Dekodowanie UTF-8 prosto z widoku na bufor, bez pośredniej kopii do bytes.
+            with memoryview(buf)[pos + HEADER.size:frame_end] as payload:
+                frame = json.loads(str(payload, "utf-8"))
+            pos = frame_end
+            self.on_frame(frame)
+
+        if pos == end:
+            self._start = self._end = 0
+        else:
+            self._start = pos
+
+    def eof_received(self) -> bool:
+        return False
+
+
+class LaneQueue:
+    """Kolejka ramek z priorytetem pasa: `classify(frame)` zwraca numer pasa, mniejszy = pilniejszy."""
+
+    def __init__(self, classify: Callable[[Any], int]) -> None:
+        self.classify = classify
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+
+    def put_nowait(self, frame: Any) -> None:
+        self._queue.put_nowait((self.classify(frame), next(self._seq), frame))
+
+    async def get(self) -> Any:
+        return (await self._queue.get())[2]
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
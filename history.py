@@ -0,0 +1,78 @@
+"""
+Indeks historii kont: konto -> indeksy wpisów logu, które je obciążyły lub uznały, oraz stan z przeszłości.
+
+Węzeł dopisuje indeks przy aplikowaniu wpisu (indeksy rosną), więc zapytanie o stronę historii
+jednego konta kosztuje O(k) w liczbie zwróconych wpisów, a nie O(całego logu).
+
+Przy każdym wpisie zapamiętywane są salda kont, które zmienił (delta), a co `checkpoint_interval`
+wpisów - pełna kopia stanu. Stan na indeks N to najbliższy checkpoint <= N plus najwyżej
+`checkpoint_interval - 1` delt, bez ponownego wykonywania transakcji.
+"""
+import time
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Mapping, Optional
+
+from operations import operation_effects
+
+
+class HistoryIndex:
+    def __init__(self, initial: Optional[Mapping[str, float]] = None, checkpoint_interval: int = 256) -> None:
+        self.checkpoint_interval = checkpoint_interval
+        self._by_account: Dict[str, List[int]] = {}
+        # Pozycja p opisuje p-ty zaindeksowany wpis: indeks w logu, czas aplikowania, salda zmienionych kont.
+        self._indices: List[int] = []
+        self._times: List[float] = []
+        self._changes: List[Dict[str, float]] = []
+        # _checkpoints[k] = stan po pozycji k * checkpoint_interval - 1 (k = 0: stan początkowy).
+        self._checkpoints: List[Dict[str, float]] = [dict(initial or {})]
+
+    def record(self, index: int, operation: str, accounts: Mapping[str, float], at: Optional[float] = None) -> None:
+        """Wywoływane po wykonaniu wpisu `index`; `accounts` to stan po nim, `at` - czas wykonania (domyślnie teraz)."""
+        effects = operation_effects(operation)
+        if effects is None: return
+        debit, credit = effects
+        touched = debit | credit
+        for account in touched:
+            self._by_account.setdefault(account, []).append(index)
+        self._indices.append(index)
+        self._times.append(time.time() if at is None else at)
+        self._changes.append({account: accounts.get(account, 0.0) for account in touched})
+        if len(self._indices) % self.checkpoint_interval == 0:
+            self._checkpoints.append(dict(accounts))
+
+    def truncate(self, index: int) -> None:
+        """Usuwa wpisy o indeksach >= index (np. przed ponownym wykonaniem końcówki logu w innej kolejności)."""
+        position = bisect_left(self._indices, index)
+        for changes in self._changes[position:]:
+            for account in changes:
+                indices = self._by_account[account]
+                while indices and indices[-1] >= index:
+                    indices.pop()
+        del self._indices[position:], self._times[position:], self._changes[position:]
+        del self._checkpoints[position // self.checkpoint_interval + 1:]
+
+    def count(self, account: str) -> int:
+        return len(self._by_account.get(account, ()))
+
+    def page(self, account: str, offset: int = 0, limit: int = 50) -> List[int]:
+        """Indeksy wpisów konta w kolejności aplikowania, od `offset`, najwyżej `limit`."""
+        return self._by_account.get(account, [])[offset:offset + limit]
+
+    def last_index_at(self, index: int) -> int:
+        """Ostatni zaindeksowany wpis <= index (-1: żaden)."""
+        position = bisect_right(self._indices, index) - 1
+        return self._indices[position] if position >= 0 else -1
+
+    def index_at_time(self, timestamp: float) -> int:
+        """Ostatni wpis zastosowany nie później niż `timestamp` (sekundy epoki); -1, gdy żaden."""
+        position = bisect_right(self._times, timestamp) - 1
+        return self._indices[position] if position >= 0 else -1
+
+    def balances_at(self, index: int) -> Dict[str, float]:
+        """Stan kont po wpisie `index`: checkpoint i delty od niego, bez wykonywania transakcji."""
+        position = bisect_right(self._indices, index) - 1
+        checkpoint = (position + 1) // self.checkpoint_interval
+        state = dict(self._checkpoints[checkpoint])
+        for changes in self._changes[checkpoint * self.checkpoint_interval:position + 1]:
+            state.update(changes)
+        return state
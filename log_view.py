@@ -0,0 +1,26 @@
+"""
+Widok wpisów logu wspólny dla Rafta i Paxosa: log przechowuje wpisy w zwartej postaci
+(kolumny albo krotki), a dict na wpis powstaje dopiero przy odczycie przez `entries`.
+"""
+from collections.abc import Sequence
+from typing import Any
+
+
+class LogEntriesView(Sequence):
+    """Widok tylko do odczytu: wpisy logu materializowane jako dict dopiero przy dostępie."""
+
+    def __init__(self, log: Any) -> None:
+        # Log musi mieć __len__ i entry(i) -> dict.
+        self._log = log
+
+    def __len__(self) -> int:
+        return len(self._log)
+
+    def __getitem__(self, i) -> Any:
+        if isinstance(i, slice):
+            return [self._log.entry(j) for j in range(*i.indices(len(self._log)))]
+        if i < 0:
+            i += len(self._log)
+        if not 0 <= i < len(self._log):
+            raise IndexError("log index out of range")
+        return self._log.entry(i)
@@ -0,0 +1,34 @@
+"""
+Operacje bankowe maszyny stanów widziane przez algorytmy konsensusu.
+
+operation_effects - konta obciążane i uznawane przez operację,
+commutes - czy dwie operacje dają ten sam stan niezależnie od kolejności wykonania
+    (szybka ścieżka Paxosa, zależności w EPaxosie).
+"""
+from typing import FrozenSet, Optional, Tuple
+
+
+def operation_effects(tx_data: str) -> Optional[Tuple[FrozenSet[str], FrozenSet[str]]]:
+    """(konta obciążane, konta uznawane); None dla operacji nieznanej maszynie stanów."""
+    parts = [p.strip() for p in tx_data.split(';')]
+    tx_type = parts[0].upper()
+    if tx_type == "DEPOSIT" and len(parts) >= 3:
+        return frozenset(), frozenset([parts[1]])
+    if tx_type == "WITHDRAW" and len(parts) >= 3:
+        return frozenset([parts[1]]), frozenset()
+    if tx_type == "TRANSFER" and len(parts) >= 4:
+        return frozenset([parts[1]]), frozenset([parts[2]])
+    return None
+
+
+def commutes(a: str, b: str) -> bool:
+    """
+    Uznania są przemienne, ale wynik obciążenia zależy od salda - obciążenie koliduje
+    z każdą inną zmianą tego konta. DEPOSIT-y zawsze komutują, TRANSFER-y na rozłącznych kontach też.
+    """
+    effects_a, effects_b = operation_effects(a), operation_effects(b)
+    if effects_a is None or effects_b is None:
+        return False
+    debit_a, credit_a = effects_a
+    debit_b, credit_b = effects_b
+    return not (debit_a & (debit_b | credit_b) or debit_b & (debit_a | credit_a))
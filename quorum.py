@@ -0,0 +1,130 @@
+"""
+Liczenie kworum współdzielone przez Raft i Paxos.
+
+MatchIndexTracker - statystyki pozycyjne match_index na liderze Rafta:
+    posortowana lista indeksów aktualizowana bisect-em, więc indeks zatwierdzony
+    przez kworum odczytuje się w O(1), a aktualizacja kosztuje O(log n) porównań.
+QuorumCounter - głosy zbierane per klucz (np. runda, (runda, skrót wartości)),
+    każdy głosujący liczy się raz, a osiągnięcie kworum jest zgłaszane dokładnie raz.
+flexible_quorums - rozmiary kworów faz 1 i 2 Paxosa (Flexible Paxos): wystarczy,
+    że każde kworum fazy 1 przecina każde kworum fazy 2, czyli |Q1| + |Q2| > N.
+fast_quorum - kworum szybkiej ścieżki Paxosa: przecina inne kworum szybkie i każde kworum fazy 2.
+epaxos_fast_quorum - ile replik (z liderem) musi zwrócić te same atrybuty, by EPaxos zatwierdził po jednym RTT.
+"""
+from bisect import bisect_left, insort
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+
+class MatchIndexTracker:
+    def __init__(self) -> None:
+        # match_index każdego śledzonego węzła (voterzy i learnerzy); do kworum liczą się tylko voterzy.
+        self._by_peer: Dict[str, int] = {}
+        self._voters: Set[str] = set()
+        self._sorted: List[int] = []
+
+    def reset(self, voters: Iterable[str], initial: int = -1, learners: Iterable[str] = ()) -> None:
+        self._voters = set(voters)
+        self._by_peer = {peer: initial for peer in self._voters.union(learners)}
+        self._sorted = [initial] * len(self._voters)
+
+    def sync(self, voters: Iterable[str], initial: int = -1, learners: Iterable[str] = ()) -> None:
+        """Dopasowuje zbiory voterów i learnerów, zachowując indeksy tych, którzy zostają."""
+        voters = set(voters)
+        peers = voters.union(learners)
+        if voters == self._voters and peers == self._by_peer.keys():
+            return
+        self._by_peer = {peer: self._by_peer.get(peer, initial) for peer in peers}
+        self._voters = voters
+        self._sorted = sorted(self._by_peer[voter] for voter in voters)
+
+    def __contains__(self, peer: str) -> bool:
+        return peer in self._by_peer
+
+    def __len__(self) -> int:
+        return len(self._voters)
+
+    def get(self, peer: str, default: int = -1) -> int:
+        return self._by_peer.get(peer, default)
+
+    def update(self, peer: str, index: int) -> None:
+        """Ustawia match_index węzła; węzły spoza obu zbiorów są ignorowane."""
+        old = self._by_peer.get(peer)
+        if old is None or old == index:
+            return
+        if peer in self._voters:
+            del self._sorted[bisect_left(self._sorted, old)]
+            insort(self._sorted, index)
+        self._by_peer[peer] = index
+
+    def quorum_index(self, quorum: int) -> int:
+        """Największy indeks, który ma co najmniej `quorum` głosujących (-1 gdy brak)."""
+        if quorum <= 0 or quorum > len(self._sorted):
+            return -1
+        return self._sorted[len(self._sorted) - quorum]
+
+
+class QuorumCounter:
+    def __init__(self) -> None:
+        self._votes: Dict[Hashable, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._votes)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._votes
+
+    def keys(self) -> List[Hashable]:
+        return list(self._votes)
+
+    def count(self, key: Hashable) -> int:
+        return len(self._votes.get(key, ()))
+
+    def add(self, key: Hashable, voter: str, quorum: int) -> bool:
+        """Dodaje głos; zwraca True tylko dla głosu, który dobił licznik do kworum."""
+        votes = self._votes.setdefault(key, set())
+        if voter in votes:
+            return False
+        votes.add(voter)
+        return len(votes) == quorum
+
+    def discard(self, key: Hashable) -> None:
+        self._votes.pop(key, None)
+
+    def prune(self, predicate: Callable[[Hashable], bool]) -> None:
+        for key in [k for k in self._votes if predicate(k)]:
+            del self._votes[key]
+
+    def clear(self) -> None:
+        self._votes.clear()
+
+
+def flexible_quorums(n: int, phase1: Optional[int] = None, phase2: Optional[int] = None) -> Tuple[int, int]:
+    """Zwraca (|Q1|, |Q2|) dla N węzłów; brakujący rozmiar to najmniejszy bezpieczny, bez obu - większość."""
+    if n <= 0:
+        raise ValueError(f"Cluster size must be positive, got {n}")
+    if phase1 is None and phase2 is None:
+        return n // 2 + 1, n // 2 + 1
+    if phase1 is None:
+        phase1 = n - phase2 + 1
+    if phase2 is None:
+        phase2 = n - phase1 + 1
+    for name, size in (("Q1", phase1), ("Q2", phase2)):
+        if not 1 <= size <= n:
+            raise ValueError(f"{name}={size} out of range 1..{n}")
+    if phase1 + phase2 <= n:
+        raise ValueError(f"Q1={phase1} and Q2={phase2} may not intersect: Q1 + Q2 must exceed {n}")
+    return phase1, phase2
+
+
+def fast_quorum(n: int, phase2: Optional[int] = None) -> int:
+    """
+    Szybką operację zatwierdza jej koordynator, więc nie trzeba 3N/4 z Fast Paxos:
+    wystarczy, że dwie kolidujące operacje (szybka-szybka, szybka-Paxos) mają wspólnego akceptora.
+    """
+    phase2 = phase2 or n // 2 + 1
+    return max(n // 2 + 1, n - phase2 + 1)
+
+
+def epaxos_fast_quorum(n: int) -> int:
+    """Kworum szybkiej ścieżki EPaxosa bez optymalizacji odzyskiwania: 2F przy N = 2F + 1, co najmniej większość."""
+    return max(2 * ((n - 1) // 2), n // 2 + 1)
@@ -0,0 +1,93 @@
+"""
+Mikro-benchmark: follower przyjmuje paczki APPEND_ENTRIES po 10k wpisów.
+
+Scenariusze:
+    append    - paczka dokładana na końcu logu,
+    duplicate - ta sama paczka dostarczona ponownie (wszystko pasuje, nic nie jest kopiowane),
+    conflict  - follower ma 10k wpisów ze starego termu, lider nadpisuje je od połowy.
+
+Uruchomienie:
+    python -m tests.bench_follower_append --batch 10000 --repeat 20
+"""
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "Raft"))
+
+from raft_messages import RaftMessage, RaftMessageType
+from raft_nodes import Node
+
+
+def make_entries(term: int, start: int, count: int) -> List[Dict[str, Any]]:
+    stamp = str(datetime.now())
+    return [
+        {"request_number": (term, i), "timestamp": stamp, "message": f"DEPOSIT;KONTO_A;{i % 100}"}
+        for i in range(start, start + count)
+    ]
+
+
+def append_entries(term: int, prev_index: int, prev_term: int, entries: List[Dict[str, Any]]) -> RaftMessage:
+    return RaftMessage("leader", "follower", RaftMessageType.APPEND_ENTRIES, term, {
+        "prev_log_index": prev_index,
+        "prev_log_term": prev_term,
+        "entries": entries,
+        "leader_commit": -1,
+    })
+
+
+def follower_with(entries: List[Dict[str, Any]]) -> Node:
+    node = Node("follower", True, 2, logger=lambda message, level="INFO": None)
+    node.log.extend(entries)
+    return node
+
+
+def measure(setup, message: RaftMessage, repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        node = setup()
+        start = time.perf_counter()
+        node.receive_message(message, [], 2, ["leader", "follower"])
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "mean_ms": round(statistics.mean(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def run(batch: int, repeat: int) -> Dict[str, Any]:
+    old = make_entries(1, 0, batch)
+    new = make_entries(2, batch, batch)
+    half = batch // 2
+    overwrite = make_entries(2, half, batch)
+
+    results = {
+        "append": measure(lambda: follower_with(old), append_entries(2, batch - 1, 1, new), repeat),
+        "duplicate": measure(lambda: follower_with(old), append_entries(1, -1, 0, old), repeat),
+        "conflict": measure(lambda: follower_with(old), append_entries(2, half - 1, 1, overwrite), repeat),
+    }
+    for name, result in results.items():
+        result["entries_per_s"] = round(batch / (result["mean_ms"] / 1000)) if result["mean_ms"] else None
+    return {"batch": batch, "repeat": repeat, "results": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Follower AppendEntries micro-benchmark")
+    parser.add_argument("--batch", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        report = run(args.batch, args.repeat)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,563 @@
+"""
+Powtarzalny benchmark obciążeniowy dla Raft i Paxos.
+
+W odróżnieniu od comparsion.py operacje napływają w otwartej pętli (proces
+Poissona o zadanej intensywności), niezależnie od tego, czy poprzednie się
+zakończyły. Latencja liczona jest od chwili przybycia operacji do jej
+zatwierdzenia (łącznie z czasem oczekiwania w kolejce), bez sztucznych sleepów.
+
+Tryby:
+    mock - klaster węzłów w jednym procesie, wiadomości dostarczane przez
+           InProcessNetwork z losowym (seedowanym) opóźnieniem,
+    http - prawdziwe węzły (np. z docker-compose), operacje przez POST /propose.
+
+Przykład:
+    python -m tests.benchmark --algorithm raft --rates 100,200,400 --duration 5 \\
+        --nodes 4 --concurrency 64 --mix deposit=0.7,withdraw=0.2,transfer=0.1 \\
+        --output bench_raft.json
+"""
+import argparse
+import asyncio
+import contextlib
+import heapq
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "Raft"))
+sys.path.insert(0, os.path.join(ROOT, "Paxos"))
+sys.path.insert(0, os.path.join(ROOT, "EPaxos"))
+sys.path.insert(0, ROOT)
+
+from quorum import flexible_quorums
+
+DEFAULT_MIX = "deposit=0.6,withdraw=0.2,transfer=0.2"
+
+
+@dataclass
+class BenchmarkConfig:
+    algorithm: str = "raft"
+    mode: str = "mock"
+    nodes: int = 4
+    rates: List[float] = field(default_factory=lambda: [100.0])
+    duration: float = 5.0
+    concurrency: int = 64
+    mix: Dict[str, float] = field(default_factory=lambda: parse_mix(DEFAULT_MIX))
+    accounts: List[str] = field(default_factory=lambda: ["KONTO_A", "KONTO_B"])
+    network_delay: Tuple[float, float] = (0.001, 0.005)
+    op_timeout: float = 5.0
+    seed: int = 42
+    endpoints: List[str] = field(default_factory=list)
+    thrifty: bool = False
+    distinguished_learner: bool = False
+    paxos_q1: Optional[int] = None
+    paxos_q2: Optional[int] = None
+    fast_path: bool = False
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """'deposit=0.7,withdraw=0.3' -> znormalizowane wagi typów operacji."""
+    mix: Dict[str, float] = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip().lower()
+        if name not in ("deposit", "withdraw", "transfer"):
+            raise ValueError(f"Unknown operation type in mix: {name}")
+        mix[name] = float(weight or 1.0)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("Operation mix must have a positive total weight")
+    return {k: v / total for k, v in mix.items()}
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """Percentyl metodą najbliższej rangi (p w zakresie 0-100)."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(round(p * len(sorted_values) / 100.0, 9)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class OperationFactory:
+    """Generuje operacje bankowe wg zadanego miksu. Każda dostaje unikalny znacznik REQ."""
+
+    def __init__(self, mix: Dict[str, float], accounts: List[str], rng: random.Random) -> None:
+        self.kinds = list(mix.keys())
+        self.weights = [mix[k] for k in self.kinds]
+        self.accounts = accounts
+        self.rng = rng
+        self.counter = 0
+
+    def next(self) -> str:
+        self.counter += 1
+        kind = self.rng.choices(self.kinds, self.weights)[0]
+        amount = self.rng.randint(1, 100)
+        account = self.rng.choice(self.accounts)
+        if kind == "transfer" and len(self.accounts) > 1:
+            dest = self.rng.choice([a for a in self.accounts if a != account])
+            return f"TRANSFER;{account};{dest};{amount};REQ:{self.counter}"
+        if kind == "withdraw":
+            return f"WITHDRAW;{account};{amount};REQ:{self.counter}"
+        return f"DEPOSIT;{account};{amount};REQ:{self.counter}"
+
+
+class InProcessNetwork:
+    """
+    Sieć w pamięci: każda wiadomość jest dostarczana przez loop.call_later
+    z opóźnieniem z seedowanego generatora. Liczy wszystkie wysłane wiadomości.
+    """
+
+    def __init__(self, delay: Tuple[float, float], rng: random.Random) -> None:
+        self.delay = delay
+        self.rng = rng
+        self.nodes: Dict[str, Any] = {}
+        self.message_count = 0
+        self.on_delivered = None
+        self.stopped = False
+
+    def register(self, node: Any) -> None:
+        self.nodes[node.ip_addr] = node
+
+    @property
+    def all_ips(self) -> List[str]:
+        return list(self.nodes.keys())
+
+    @property
+    def quorum(self) -> int:
+        return len(self.nodes) // 2 + 1
+
+    def send_all(self, messages: List[Any]) -> None:
+        if self.stopped:
+            return
+        loop = asyncio.get_running_loop()
+        for msg in messages:
+            self.message_count += 1
+            loop.call_later(self.rng.uniform(*self.delay), self._deliver, msg)
+
+    def stop(self) -> None:
+        """Wiadomości jeszcze w drodze (call_later) nie są już dostarczane."""
+        self.stopped = True
+
+    def _deliver(self, message: Any) -> None:
+        target = self.nodes.get(message.to_ip)
+        if target is None or self.stopped:
+            return
+        pool: List[Any] = []
+        target.receive_message(message, pool, self.quorum, self.all_ips)
+        if self.on_delivered:
+            self.on_delivered(target)
+        self.send_all(pool)
+
+
+class InProcessCluster:
+    """Klaster węzłów Raft/Paxos w jednym procesie, sterowany przez InProcessNetwork."""
+
+    def __init__(self, config: BenchmarkConfig, rng: random.Random) -> None:
+        self.config = config
+        self.network = InProcessNetwork(config.network_delay, rng)
+        self.network.on_delivered = self._on_delivered
+        self.nodes: List[Any] = []
+        self.leader = None
+
+        self._raft_waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._paxos_waiters: Dict[str, asyncio.Future] = {}
+        self._paxos_seen: Dict[str, int] = {}
+        self._paxos_rounds: Dict[str, int] = {}
+        self._paxos_locks: Dict[str, asyncio.Lock] = {}
+        self._fast_waiters: Dict[Tuple[int, int], asyncio.Future] = {}
+        self._epaxos_waiters: Dict[Tuple[str, Tuple[int, int]], asyncio.Future] = {}
+        self._next_proposer = 0
+        self._seq = 0
+        # Runda Paxosa bez decyzji po tym czasie przepadła (sieć niczego nie gubi, opóźnienie <= network_delay[1]).
+        self._paxos_retry = max(0.02, 10 * config.network_delay[1])
+        self.paxos_retries = 0
+
+        quiet = lambda message, level="INFO": None
+        for i in range(config.nodes):
+            ip = f"10.0.0.{i + 1}"
+            if config.algorithm == "raft":
+                from raft_nodes import Node
+            elif config.algorithm == "epaxos":
+                from epaxos_nodes import Node
+            else:
+                from paxos_nodes import Node
+            node = Node(ip, True, i + 1, logger=quiet)
+            node.thrifty = config.thrifty
+            if config.algorithm == "epaxos":
+                node.on_executed = lambda instance, node=node: self._on_epaxos_executed(node, instance)
+            if config.algorithm == "paxos":
+                node.distinguished_learner = config.distinguished_learner
+                if config.paxos_q1 or config.paxos_q2:
+                    node.phase1_quorum, node.phase2_quorum = flexible_quorums(config.nodes, config.paxos_q1, config.paxos_q2)
+                node.on_fast_outcome = self._on_fast_outcome
+            self.network.register(node)
+            self.nodes.append(node)
+            self._paxos_seen[ip] = 0
+            self._paxos_rounds[ip] = 0
+            self._paxos_locks[ip] = asyncio.Lock()
+
+    @property
+    def message_count(self) -> int:
+        return self.network.message_count
+
+    def stop(self) -> None:
+        self.network.stop()
+
+    async def start(self) -> None:
+        if self.config.algorithm != "raft":
+            return
+        from raft_messages import RaftMessage, RaftMessageType
+
+        candidate = self.nodes[0]
+        candidate.begin_election()
+        self.network.send_all([
+            RaftMessage(candidate.ip_addr, ip, RaftMessageType.REQUEST_VOTE, candidate.current_term, {
+                "candidate_id": candidate.ip_addr,
+                "last_log_index": candidate.get_last_log_index(),
+                "last_log_term": candidate.get_last_log_term(),
+            })
+            for ip in self.network.all_ips if ip != candidate.ip_addr
+        ])
+        for _ in range(200):
+            if candidate.role == "leader":
+                self.leader = candidate
+                return
+            await asyncio.sleep(0.01)
+        raise RuntimeError("Leader election did not finish")
+
+    async def submit(self, operation: str) -> None:
+        if self.config.algorithm == "raft":
+            await self._submit_raft(operation)
+        elif self.config.algorithm == "epaxos":
+            await self._submit_epaxos(operation)
+        else:
+            await self._submit_paxos(operation)
+
+    async def _submit_raft(self, operation: str) -> None:
+        leader = self.leader
+        index = leader.get_last_log_index() + 1
+        leader.log.append((leader.current_term, index), datetime.now(), operation)
+        future = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        heapq.heappush(self._raft_waiters, (index, self._seq, future))
+
+        pool: List[Any] = []
+        leader.replicate(pool, self.network.all_ips, self.network.quorum)
+        self.network.send_all(pool)
+        await future
+
+    async def _submit_paxos(self, operation: str) -> None:
+        from paxos_messages import PaxosMessageType
+
+        proposer = self.nodes[self._next_proposer % len(self.nodes)]
+        self._next_proposer += 1
+        if self.config.fast_path and await self._submit_fast(proposer, operation):
+            return
+        # Węzeł Paxos ma jeden slot propozycji, więc na propozytora przypada jedna operacja naraz.
+        async with self._paxos_locks[proposer.ip_addr]:
+            future = asyncio.get_running_loop().create_future()
+            self._paxos_waiters[operation] = future
+            try:
+                while True:
+                    # Jak serwer: runda musi przebić najwyższą obiecaną. Runda przebita przez innego propozytora
+                    # (albo jego wartość przejęta z PROMISE) nie zdecyduje tej operacji - ponawiamy z losowym odstępem.
+                    rounds = max(self._paxos_rounds[proposer.ip_addr], proposer.highest_promised_id[0]) + 1
+                    self._paxos_rounds[proposer.ip_addr] = rounds
+                    proposer.message_content = operation
+                    pool: List[Any] = []
+                    proposer.broadcast_phase(pool, self.network.all_ips, self.network.quorum, operation,
+                                             PaxosMessageType.PREPARE, f"{rounds}.{proposer.ID}")
+                    self.network.send_all(pool)
+                    retry_after = self._paxos_retry * (1 + self.network.rng.random())
+                    try:
+                        await asyncio.wait_for(asyncio.shield(future), retry_after)
+                        return
+                    except asyncio.TimeoutError:
+                        self.paxos_retries += 1
+            finally:
+                self._paxos_waiters.pop(operation, None)
+
+    async def _submit_epaxos(self, operation: str) -> None:
+        # Bez lidera i bez slotu propozycji: każdy węzeł koordynuje własne instancje równolegle.
+        proposer = self.nodes[self._next_proposer % len(self.nodes)]
+        self._next_proposer += 1
+        pool: List[Any] = []
+        instance = proposer.propose(pool, self.network.all_ips, operation)
+        if proposer.is_executed(instance):
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._epaxos_waiters[(proposer.ip_addr, instance)] = future
+        self.network.send_all(pool)
+        try:
+            await future
+        finally:
+            self._epaxos_waiters.pop((proposer.ip_addr, instance), None)
+
+    def _on_epaxos_executed(self, node: Any, instance: Tuple[int, int]) -> None:
+        future = self._epaxos_waiters.get((node.ip_addr, instance))
+        if future is not None and not future.done():
+            future.set_result(True)
+
+    async def _submit_fast(self, proposer: Any, operation: str) -> bool:
+        """Szybka ścieżka: operacja gotowa, gdy koordynator zbierze kworum FAST_ACCEPTED; False - konflikt."""
+        pool: List[Any] = []
+        op_id = proposer.start_fast_proposal(pool, self.network.all_ips, operation)
+        if op_id is None:
+            return False
+        future = asyncio.get_running_loop().create_future()
+        self._fast_waiters[op_id] = future
+        self.network.send_all(pool)
+        try:
+            return await future
+        finally:
+            self._fast_waiters.pop(op_id, None)
+
+    def _on_fast_outcome(self, op_id: Tuple[int, int], committed: bool) -> None:
+        future = self._fast_waiters.get(op_id)
+        if future is not None and not future.done():
+            future.set_result(committed)
+
+    def _on_delivered(self, node: Any) -> None:
+        if self.config.algorithm == "epaxos":
+            return
+        if self.config.algorithm == "raft":
+            if node is not self.leader:
+                return
+            while self._raft_waiters and self._raft_waiters[0][0] <= node.commit_index:
+                _, _, future = heapq.heappop(self._raft_waiters)
+                if not future.done():
+                    future.set_result(True)
+            return
+
+        seen = self._paxos_seen[node.ip_addr]
+        entries = node.log.entries
+        for entry in entries[seen:]:
+            future = self._paxos_waiters.get(entry["message"])
+            if future is not None and not future.done():
+                future.set_result(True)
+        self._paxos_seen[node.ip_addr] = len(entries)
+
+
+class HttpCluster:
+    """Prawdziwe węzły wystawione przez HTTP (np. docker-compose: 127.0.0.1:8001-8004)."""
+
+    def __init__(self, config: BenchmarkConfig) -> None:
+        self.config = config
+        self.endpoints = [(e.split(":")[0], int(e.split(":")[1])) for e in config.endpoints]
+        self.target = self.endpoints[0]
+        self.message_count = None
+
+    async def start(self) -> None:
+        if self.config.algorithm == "raft":
+            await self._find_leader()
+
+    def stop(self) -> None:
+        pass
+
+    async def _find_leader(self) -> None:
+        for host, port in self.endpoints:
+            status = await http_request(host, port, "GET", "/status")
+            if status.get("role") == "leader":
+                self.target = (host, port)
+                return
+        raise RuntimeError("No Raft leader among endpoints")
+
+    async def submit(self, operation: str) -> None:
+        host, port = self.target
+        result = await http_request(host, port, "POST", "/propose", {"operation": operation})
+        if not result.get("success"):
+            if self.config.algorithm == "raft":
+                await self._find_leader()
+            raise RuntimeError(result.get("error", "proposal failed"))
+
+
+async def http_request(host: str, port: int, method: str, path: str, payload: Any = None) -> Dict[str, Any]:
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    head = (
+        f"{method} {path} HTTP/1.1\r\n"
+        f"Host: {host}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: close\r\n\r\n"
+    )
+    writer.write(head.encode("utf-8") + body)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    _, _, response_body = raw.partition(b"\r\n\r\n")
+    return json.loads(response_body) if response_body else {}
+
+
+async def run_load(cluster: Any, config: BenchmarkConfig, rate: float, rng: random.Random) -> Dict[str, Any]:
+    """Jeden punkt krzywej: otwarta pętla o intensywności `rate` ops/s przez `duration` sekund."""
+    loop = asyncio.get_running_loop()
+    factory = OperationFactory(config.mix, config.accounts, rng)
+    semaphore = asyncio.Semaphore(config.concurrency)
+    latencies: List[float] = []
+    failed = 0
+    last_done = loop.time()
+
+    async def one(arrival: float, operation: str) -> None:
+        nonlocal failed, last_done
+        async with semaphore:
+            try:
+                await asyncio.wait_for(cluster.submit(operation), config.op_timeout)
+            except (asyncio.TimeoutError, RuntimeError, OSError):
+                failed += 1
+                return
+        now = loop.time()
+        latencies.append((now - arrival) * 1000)
+        last_done = max(last_done, now)
+
+    messages_before = cluster.message_count
+    start = loop.time()
+    offset = 0.0
+    tasks = []
+    while True:
+        offset += rng.expovariate(rate)
+        if offset >= config.duration:
+            break
+        delay = start + offset - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(start + offset, factory.next())))
+    await asyncio.gather(*tasks)
+
+    elapsed = max(last_done - start, 1e-9)
+    latencies.sort()
+    completed = len(latencies)
+    messages = None
+    if messages_before is not None:
+        messages = cluster.message_count - messages_before
+
+    return {
+        "offered_rate": rate,
+        "ops_submitted": len(tasks),
+        "ops_completed": completed,
+        "ops_failed": failed,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_ops_s": round(completed / elapsed, 2),
+        "latency_ms": {
+            "mean": round(sum(latencies) / completed, 3) if completed else None,
+            "p50": percentile(latencies, 50),
+            "p99": percentile(latencies, 99),
+            "p999": percentile(latencies, 99.9),
+            "max": latencies[-1] if latencies else None,
+        },
+        "messages": messages,
+        "messages_per_op": round(messages / completed, 2) if messages is not None and completed else None,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_benchmark(config: BenchmarkConfig) -> Dict[str, Any]:
+    """Uruchamia wszystkie punkty krzywej (po jednym świeżym klastrze na intensywność)."""
+    results = []
+    for i, rate in enumerate(config.rates):
+        seed = config.seed + i
+        random.seed(seed)
+        rng = random.Random(seed)
+        if config.mode == "http":
+            cluster: Any = HttpCluster(config)
+        else:
+            cluster = InProcessCluster(config, random.Random(seed + 1))
+        # Węzły drukują każdą zastosowaną operację - w benchmarku to tylko szum i koszt. Przekierowanie trwa
+        # do zatrzymania klastra, żeby wiadomości jeszcze w drodze nie dopisały nic do JSON-a na stdout.
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            await cluster.start()
+            try:
+                result = await run_load(cluster, config, rate, rng)
+            finally:
+                cluster.stop()
+            if config.algorithm == "paxos" and config.mode == "mock":
+                result["paxos_retries"] = cluster.paxos_retries
+            results.append(result)
+
+    return {
+        "benchmark": "consensus_load",
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "config": asdict(config),
+        "results": results,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> Tuple[BenchmarkConfig, Optional[str]]:
+    parser = argparse.ArgumentParser(description="Open-loop load benchmark for Raft/Paxos")
+    parser.add_argument("--algorithm", choices=["raft", "paxos", "epaxos"], default="raft")
+    parser.add_argument("--mode", choices=["mock", "http"], default="mock")
+    parser.add_argument("--nodes", type=int, default=4, help="cluster size (mock mode)")
+    parser.add_argument("--rates", default="100", help="comma separated arrival rates in ops/s")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of arrivals per rate")
+    parser.add_argument("--concurrency", type=int, default=64, help="max operations in flight")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation mix, e.g. deposit=0.7,withdraw=0.3")
+    parser.add_argument("--accounts", default="KONTO_A,KONTO_B")
+    parser.add_argument("--delay-ms", default="1,5", help="min,max one-way network delay (mock mode)")
+    parser.add_argument("--op-timeout", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--endpoints", default="127.0.0.1:8001,127.0.0.1:8002,127.0.0.1:8003,127.0.0.1:8004",
+                        help="HTTP endpoints of real nodes (http mode)")
+    parser.add_argument("--thrifty", action="store_true", help="send phase messages only to the fastest quorum")
+    parser.add_argument("--distinguished-learner", action="store_true",
+                        help="Paxos: ACCEPTED goes only to the proposer, which broadcasts DECIDED")
+    parser.add_argument("--q1", type=int, help="Paxos phase 1 quorum size (Q1 + Q2 must exceed --nodes)")
+    parser.add_argument("--q2", type=int, help="Paxos phase 2 quorum size")
+    parser.add_argument("--fast-path", action="store_true",
+                        help="Paxos: commit commutative operations in one round trip, falling back on conflict")
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    delay_min, delay_max = (float(x) / 1000.0 for x in args.delay_ms.split(","))
+    config = BenchmarkConfig(
+        algorithm=args.algorithm,
+        mode=args.mode,
+        nodes=args.nodes,
+        rates=[float(r) for r in args.rates.split(",") if r.strip()],
+        duration=args.duration,
+        concurrency=args.concurrency,
+        mix=parse_mix(args.mix),
+        accounts=[a.strip() for a in args.accounts.split(",") if a.strip()],
+        network_delay=(delay_min, delay_max),
+        op_timeout=args.op_timeout,
+        seed=args.seed,
+        endpoints=[e.strip() for e in args.endpoints.split(",") if e.strip()],
+        thrifty=args.thrifty,
+        distinguished_learner=args.distinguished_learner,
+        paxos_q1=args.q1,
+        paxos_q2=args.q2,
+        fast_path=args.fast_path,
+    )
+    return config, args.output
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    config, output = parse_args(argv)
+    report = asyncio.run(run_benchmark(config))
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,8 @@ NUM_NODES = 4
 NUM_OPERATIONS = 20      
 NUM_TRIALS = 3
 NETWORK_DELAY = (0.005, 0.02) # Nieco większe opóźnienie, by wykresy były czytelne
+ALGORITHMS = ["raft", "paxos", "epaxos"]
+ALGORITHM_LABELS = {"raft": "Raft", "paxos": "Paxos", "epaxos": "EPaxos"}
 
 # KLASA SYMULUJĄCA SIEĆ (MOCK)
 class MockNetwork:
@@ -88,7 +90,8 @@ async def external_paxos_proposal(server: ConsensusServer, operation: str, netwo
     
     # W paxos_nodes.py metoda send_message dodaje do poola
     # Wywołujemy ją dla każdego peera
-    server.node.send_message(msg_pool, all_ips, operation, PaxosMessageType.PREPARE, round_str)
+    quorum = (len(all_ips) // 2) + 1
+    server.node.broadcast_phase(msg_pool, all_ips, quorum, operation, PaxosMessageType.PREPARE, round_str)
     
     # c) Wysyłka z oczekiwaniem (AWAIT) - to jest klucz do ujednolicenia!
     tasks = []
@@ -110,8 +113,18 @@ async def external_raft_proposal(server: ConsensusServer, operation: str, networ
 
     msg_pool = []
     all_ips = list(network.nodes.keys())
-    if hasattr(server.node, 'broadcast_append_entries'):
-        server.node.broadcast_append_entries(msg_pool, all_ips)
+    if hasattr(server.node, 'replicate'):
+        server.node.replicate(msg_pool, all_ips, (len(all_ips) // 2) + 1)
+
+    tasks = [network.send(msg.from_ip, msg.to_ip, msg) for msg in msg_pool]
+    if tasks: await asyncio.gather(*tasks)
+    return True
+
+async def external_epaxos_proposal(server: ConsensusServer, operation: str, network: MockNetwork):
+    """EPaxos: każdy węzeł jest koordynatorem własnych instancji - bez lidera i bez rund."""
+    msg_pool = []
+    all_ips = list(network.nodes.keys())
+    server.node.propose(msg_pool, all_ips, operation)
 
     tasks = [network.send(msg.from_ip, msg.to_ip, msg) for msg in msg_pool]
     if tasks: await asyncio.gather(*tasks)
@@ -127,9 +140,10 @@ async def setup_cluster(algorithm: str, network: MockNetwork):
         server.node.ip_addr = ips[i] 
         server.node.ID = i + 1
         
-        async def mock_send_wrapper(ip, port, message, _self_ip=server.ip_addr): 
-            await network.send(_self_ip, ip, message)
-        server.send_tcp_message = mock_send_wrapper
+        async def mock_send_wrapper(ip, port, messages, _self_ip=server.ip_addr):
+            for message in messages:
+                await network.send(_self_ip, ip, message)
+        server.send_tcp_messages = mock_send_wrapper
         network.register_node(server)
         nodes.append(server)
     return nodes
@@ -162,7 +176,12 @@ async def run_benchmark(algorithm: str):
         op_data = f"TX_{i};ACC_A;10"
         start = time.perf_counter()
         
-        if algorithm == "raft":
+        if algorithm == "epaxos":
+            # Wszystkie cztery węzły przyjmują zapisy na zmianę
+            await external_epaxos_proposal(nodes[i % len(nodes)], op_data, network)
+            # PreAccept -> PreAcceptOK -> Commit: jedna runda jak w Rafcie
+            await asyncio.sleep(0.05)
+        elif algorithm == "raft":
             success = await external_raft_proposal(proposer, op_data, network)
             if not success:
                 proposer = next((n for n in nodes if n.node.role == "leader"), proposer)
@@ -187,25 +206,22 @@ def generate_plots(raw_data):
     print("\nGenerowanie podstawowych wykresów...")
     
     # Pobranie danych
-    raft_lats = raw_data["raft"]["lats"]
-    paxos_lats = raw_data["paxos"]["lats"]
-    
-    raft_msgs = raw_data["raft"]["msgs"]
-    paxos_msgs = raw_data["paxos"]["msgs"]
+    algos = [algo for algo in ALGORITHMS if raw_data[algo]["lats"]]
+    lats = [raw_data[algo]["lats"] for algo in algos]
 
     # Obliczenia
     # 1. Średnia latencja
-    avg_lat = [statistics.mean(raft_lats), statistics.mean(paxos_lats)]
+    avg_lat = [statistics.mean(algo_lats) for algo_lats in lats]
     
     # 2. Średnia liczba wiadomości na jedną operację
     # (suma wszystkich wiadomości w próbach / (liczba prób * liczba operacji))
-    total_ops_performed = len(raft_lats) # liczba wszystkich zmierzonych operacji
-    avg_msgs = [sum(raft_msgs) / total_ops_performed, sum(paxos_msgs) / total_ops_performed]
+    avg_msgs = [sum(raw_data[algo]["msgs"]) / len(raw_data[algo]["lats"]) for algo in algos]
 
     # Konfiguracja: 3 wykresy obok siebie
     fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(16, 5))
-    colors = ['#4CAF50', '#FF9800'] # Zielony (Raft), Pomarańczowy (Paxos)
-    labels = ['Raft', 'Paxos']
+    palette = {"raft": '#4CAF50', "paxos": '#FF9800', "epaxos": '#2196F3'} # Zielony, Pomarańczowy, Niebieski
+    colors = [palette[algo] for algo in algos]
+    labels = [ALGORITHM_LABELS[algo] for algo in algos]
 
     # --- WYKRES 1: Średnia Latencja (Słupkowy) ---
     # Najprostszy sposób pokazania "kto jest szybszy"
@@ -218,7 +234,7 @@ def generate_plots(raw_data):
     # --- WYKRES 2: Rozkład Latencji (Pudełkowy / Box Plot) ---
     # Zastępuje Violin Plot. Pudełko = typowy zakres, Wąsy = odchylenia.
     # Małe pudełko = stabilnie. Duże pudełko = niestabilnie.
-    bplot = ax2.boxplot([raft_lats, paxos_lats], labels=labels, patch_artist=True, widths=0.5)
+    bplot = ax2.boxplot(lats, labels=labels, patch_artist=True, widths=0.5)
     ax2.set_title('Stabilność (Rozkład wyników)', fontsize=12, fontweight='bold')
     ax2.set_ylabel('Czas (ms)')
     ax2.grid(axis='y', linestyle='--', alpha=0.5)
@@ -237,7 +253,7 @@ def generate_plots(raw_data):
     ax3.bar_label(bars2, fmt='%.1f', padding=3)
 
     # Zapis do pliku
-    plt.suptitle(f'Porównanie wydajności: Raft vs Paxos', fontsize=16)
+    plt.suptitle(f'Porównanie wydajności: {" vs ".join(labels)}', fontsize=16)
     plt.tight_layout(rect=[0, 0.03, 1, 0.95])
     plt.savefig('comparison_plots_basic.png')
     print("Wykresy zapisano w pliku: comparison_plots_basic.png")
@@ -248,14 +264,11 @@ def generate_plots(raw_data):
 
 async def main():
     # Struktura do przechowywania surowych danych dla wykresów
-    raw_data = {
-        "raft": {"lats": [], "msgs": []},
-        "paxos": {"lats": [], "msgs": []}
-    }
+    raw_data = {algo: {"lats": [], "msgs": []} for algo in ALGORITHMS}
     
     results_summary = []
 
-    for algo in ["raft", "paxos"]:
+    for algo in ALGORITHMS:
         algo_lats = []
         algo_msgs = []
         
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Moduły węzłów importowane są po nazwie (jak w consensus_server.py), więc testy potrzebują ich katalogów na sys.path.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, *(os.path.join(ROOT, name) for name in ("Raft", "Paxos", "EPaxos"))):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,369 @@
+"""
+Deterministyczny symulator zdarzeń dyskretnych dla klastrów Raft i Paxos.
+
+Czas jest wirtualny: zdarzenia (dostarczenia wiadomości, tyknięcia timerów,
+operacje klientów) siedzą w kopcu posortowanym po czasie i są wykonywane
+natychmiast, bez asyncio.sleep. Węzły (raft_nodes.Node, paxos_nodes.Node)
+są sterowane bezpośrednio przez receive_message, a ich zegary (_now, a w
+Paxosie także zegar LockTable) są podpięte pod zegar symulacji. Ten sam
+seed daje zawsze ten sam przebieg.
+
+Model sieci: opóźnienie (min/max), przepustowość łącza (kolejkowanie na
+łączu skierowanym), losowa utrata pakietów oraz partycje.
+
+Przykład:
+    python -m tests.simulator --algorithm raft --nodes 20 --ops 100000 --rate 5000 \\
+        --latency-ms 1,5 --loss 0.01 --partition-at 5 --heal-at 8 --seed 1
+"""
+import argparse
+import contextlib
+import heapq
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "Raft"))
+sys.path.insert(0, os.path.join(ROOT, "Paxos"))
+
+from tests.benchmark import percentile
+
+
+class Simulator:
+    """Kolejka zdarzeń z wirtualnym zegarem."""
+
+    def __init__(self, seed: int = 0) -> None:
+        self.now = 0.0
+        self.rng = random.Random(seed)
+        self._queue: List[Tuple[float, int, Callable, tuple]] = []
+        self._seq = 0
+        self.events_processed = 0
+
+    def schedule(self, delay: float, callback: Callable, *args: Any) -> None:
+        self._seq += 1
+        heapq.heappush(self._queue, (self.now + delay, self._seq, callback, args))
+
+    def run(self, until: Optional[float] = None, max_events: Optional[int] = None) -> None:
+        queue = self._queue
+        while queue:
+            if until is not None and queue[0][0] > until:
+                self.now = until
+                return
+            if max_events is not None and self.events_processed >= max_events:
+                return
+            self.now, _, callback, args = heapq.heappop(queue)
+            self.events_processed += 1
+            callback(*args)
+
+
+class SimNetwork:
+    """
+    Sieć symulowana: opóźnienie propagacji + czas nadawania (rozmiar / przepustowość)
+    z kolejką na każdym łączu skierowanym, utrata pakietów i partycje.
+    """
+
+    def __init__(
+        self,
+        sim: Simulator,
+        latency: Tuple[float, float] = (0.001, 0.005),
+        bandwidth: Optional[float] = None,
+        loss: float = 0.0,
+    ) -> None:
+        self.sim = sim
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.loss = loss
+        self.nodes: Dict[str, Any] = {}
+        self.quorum = 1
+        self.all_ips: List[str] = []
+        self.on_delivered: Optional[Callable[[Any], None]] = None
+
+        self._link_busy_until: Dict[Tuple[str, str], float] = {}
+        self._groups: Dict[str, int] = {}
+
+        self.sent = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+
+    def register(self, node: Any) -> None:
+        self.nodes[node.ip_addr] = node
+        self.all_ips = list(self.nodes.keys())
+        self.quorum = len(self.all_ips) // 2 + 1
+
+    def partition(self, groups: List[List[str]]) -> None:
+        """Węzły z różnych grup przestają się widzieć (węzły spoza grup - izolowane)."""
+        self._groups = {ip: i for i, group in enumerate(groups) for ip in group}
+
+    def heal(self) -> None:
+        self._groups = {}
+
+    def _reachable(self, src: str, dst: str) -> bool:
+        if not self._groups:
+            return True
+        return self._groups.get(src, -1) == self._groups.get(dst, -2)
+
+    def send_all(self, messages: List[Any]) -> None:
+        sim = self.sim
+        for msg in messages:
+            self.sent += 1
+            if msg.to_ip == msg.from_ip:
+                sim.schedule(0.0, self._deliver, msg)
+                continue
+            if not self._reachable(msg.from_ip, msg.to_ip) or (self.loss and sim.rng.random() < self.loss):
+                self.dropped += 1
+                continue
+
+            delay = sim.rng.uniform(*self.latency)
+            if self.bandwidth:
+                size = len(json.dumps(msg.to_dict(), default=str))
+                self.bytes_sent += size
+                link = (msg.from_ip, msg.to_ip)
+                start = max(sim.now, self._link_busy_until.get(link, 0.0))
+                finish = start + size / self.bandwidth
+                self._link_busy_until[link] = finish
+                delay += finish - sim.now
+            sim.schedule(delay, self._deliver, msg)
+
+    def _deliver(self, message: Any) -> None:
+        target = self.nodes.get(message.to_ip)
+        if target is None:
+            return
+        self.delivered += 1
+        pool: List[Any] = []
+        target.receive_message(message, pool, self.quorum, self.all_ips)
+        if self.on_delivered:
+            self.on_delivered(target)
+        self.send_all(pool)
+
+
+class SimCluster:
+    """
+    Klaster węzłów w symulatorze. Dla Rafta odtwarza pętle z consensus_server
+    (timeout wyborczy, heartbeat lidera) jako tyknięcia w czasie wirtualnym.
+    """
+
+    TICK = 0.05
+
+    def __init__(self, algorithm: str, num_nodes: int, network: SimNetwork) -> None:
+        self.algorithm = algorithm
+        self.network = network
+        self.sim = network.sim
+        self.nodes: List[Any] = []
+        network.on_delivered = self._on_delivered
+
+        self.latencies: List[float] = []
+        self.proposed = 0
+        self.completed = 0
+        self.elections = 0
+
+        self._raft_pending: List[Tuple[int, int, float]] = []
+        self._paxos_pending: Dict[str, float] = {}
+        self._paxos_rounds: Dict[str, int] = {}
+        self._paxos_seen: Dict[str, int] = {}
+        self._last_heartbeat: Dict[str, float] = {}
+
+        quiet = lambda message, level="INFO": None
+        clock = lambda: self.sim.now
+        for i in range(num_nodes):
+            ip = f"10.0.{i // 250}.{i % 250 + 1}"
+            if algorithm == "raft":
+                from raft_nodes import Node
+                node = Node(ip, True, i + 1, logger=quiet)
+                node._now = clock
+                node._reset_election_deadline()
+            else:
+                from paxos_nodes import Node
+                node = Node(ip, True, i + 1, logger=quiet)
+                # Timeouty faz, szybkiej ścieżki, catch-upu i dzierżaw blokad liczą się w czasie wirtualnym.
+                node._now = clock
+                node.locks._now = clock
+                self._paxos_seen[ip] = 0
+            network.register(node)
+            self.nodes.append(node)
+            self._paxos_rounds[ip] = 0
+            self._last_heartbeat[ip] = 0.0
+
+        if algorithm == "raft":
+            for node in self.nodes:
+                self.sim.schedule(self.sim.rng.uniform(0, self.TICK), self._raft_tick, node)
+
+    @property
+    def leader(self) -> Optional[Any]:
+        leaders = [n for n in self.nodes if getattr(n, "role", None) == "leader"]
+        return max(leaders, key=lambda n: n.current_term) if leaders else None
+
+    # --- Raft timers ---
+    def _raft_tick(self, node: Any) -> None:
+        from raft_messages import RaftMessage, RaftMessageType
+
+        now = self.sim.now
+        if node.role == "leader":
+            if now - self._last_heartbeat[node.ip_addr] >= node.heartbeat_interval:
+                self._last_heartbeat[node.ip_addr] = now
+                pool: List[Any] = []
+                node.broadcast_append_entries(pool, self.network.all_ips)
+                self.network.send_all(pool)
+        elif now >= node.election_deadline:
+            if node.role == "candidate":
+                node.on_election_failed()
+            self.elections += 1
+            last_idx, last_term = node.begin_election()
+            content = {"candidate_id": node.ip_addr, "last_log_index": last_idx, "last_log_term": last_term}
+            self.network.send_all([
+                RaftMessage(node.ip_addr, ip, RaftMessageType.REQUEST_VOTE, node.current_term, content)
+                for ip in self.network.all_ips if ip != node.ip_addr
+            ])
+        self.sim.schedule(self.TICK, self._raft_tick, node)
+
+    # --- Client operations ---
+    def propose(self, operation: str) -> bool:
+        if self.algorithm == "raft":
+            leader = self.leader
+            if leader is None:
+                return False
+            index = leader.get_last_log_index() + 1
+            leader.log.append((leader.current_term, index), datetime.now(), operation)
+            heapq.heappush(self._raft_pending, (index, leader.current_term, self.sim.now))
+            pool: List[Any] = []
+            leader.broadcast_append_entries(pool, self.network.all_ips)
+        else:
+            from paxos_messages import PaxosMessageType
+
+            proposer = self.nodes[self.proposed % len(self.nodes)]
+            self._paxos_rounds[proposer.ip_addr] += 1
+            round_id = f"{self._paxos_rounds[proposer.ip_addr]}.{proposer.ID}"
+            proposer.message_content = operation
+            self._paxos_pending[operation] = self.sim.now
+            pool = []
+            proposer.send_message(pool, self.network.all_ips, operation, PaxosMessageType.PREPARE, round_id)
+        self.proposed += 1
+        self.network.send_all(pool)
+        return True
+
+    def _on_delivered(self, node: Any) -> None:
+        if self.algorithm == "raft":
+            if node.role != "leader":
+                return
+            pending = self._raft_pending
+            while pending and pending[0][0] <= node.commit_index:
+                index, term, started = heapq.heappop(pending)
+                if node.log.entries[index]["request_number"][0] == term:
+                    self.completed += 1
+                    self.latencies.append(self.sim.now - started)
+            return
+
+        # Jedna dostawa może dopisać kilka wpisów (np. zaległe decyzje), więc sprawdzamy wszystkie od ostatniego razu.
+        entries = node.log.entries
+        seen = min(self._paxos_seen[node.ip_addr], len(entries))
+        for entry in entries[seen:]:
+            started = self._paxos_pending.pop(entry["message"], None)
+            if started is not None:
+                self.completed += 1
+                self.latencies.append(self.sim.now - started)
+        self._paxos_seen[node.ip_addr] = len(entries)
+
+
+def run_simulation(
+    algorithm: str = "raft",
+    nodes: int = 5,
+    ops: int = 1000,
+    rate: float = 1000.0,
+    latency: Tuple[float, float] = (0.001, 0.005),
+    bandwidth: Optional[float] = None,
+    loss: float = 0.0,
+    partition_at: Optional[float] = None,
+    heal_at: Optional[float] = None,
+    warmup: float = 3.0,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Uruchamia symulację i zwraca podsumowanie (czasy w sekundach wirtualnych).
+    Partycja odcina mniejszość (pierwsze nodes // 2 węzłów, w tym zwykle lidera).
+    """
+    random.seed(seed)
+    sim = Simulator(seed)
+    network = SimNetwork(sim, latency, bandwidth, loss)
+    cluster = SimCluster(algorithm, nodes, network)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if algorithm == "raft":
+            sim.run(until=warmup)
+    start = sim.now
+
+    interval = 1.0 / rate
+    for i in range(ops):
+        sim.schedule(start - sim.now + i * interval, cluster.propose, f"DEPOSIT;KONTO_A;1;REQ:{i}")
+    if partition_at is not None:
+        minority = [n.ip_addr for n in cluster.nodes[: nodes // 2]]
+        majority = [n.ip_addr for n in cluster.nodes[nodes // 2:]]
+        sim.schedule(start - sim.now + partition_at, network.partition, [minority, majority])
+    if heal_at is not None:
+        sim.schedule(start - sim.now + heal_at, network.heal)
+
+    end = start + ops * interval + 5.0
+    wall_start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        sim.run(until=end)
+    wall = time.perf_counter() - wall_start
+
+    latencies = sorted(l * 1000 for l in cluster.latencies)
+    return {
+        "algorithm": algorithm,
+        "nodes": nodes,
+        "seed": seed,
+        "virtual_time_s": round(sim.now - start, 4),
+        "wall_time_s": round(wall, 4),
+        "ops_proposed": cluster.proposed,
+        "ops_committed": cluster.completed,
+        "elections": cluster.elections,
+        "messages_sent": network.sent,
+        "messages_delivered": network.delivered,
+        "messages_dropped": network.dropped,
+        "bytes_sent": network.bytes_sent,
+        "messages_per_wall_minute": round(network.delivered / wall * 60) if wall > 0 else None,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p99": percentile(latencies, 99),
+            "p999": percentile(latencies, 99.9),
+            "max": latencies[-1] if latencies else None,
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Deterministic discrete-event simulation of Raft/Paxos clusters")
+    parser.add_argument("--algorithm", choices=["raft", "paxos"], default="raft")
+    parser.add_argument("--nodes", type=int, default=5)
+    parser.add_argument("--ops", type=int, default=10000)
+    parser.add_argument("--rate", type=float, default=1000.0, help="client operations per virtual second")
+    parser.add_argument("--latency-ms", default="1,5", help="min,max one-way latency")
+    parser.add_argument("--bandwidth", type=float, default=None, help="link bandwidth in bytes/s (default: unlimited)")
+    parser.add_argument("--loss", type=float, default=0.0, help="packet loss probability")
+    parser.add_argument("--partition-at", type=float, default=None, help="virtual second to cut off the minority")
+    parser.add_argument("--heal-at", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    lat_min, lat_max = (float(x) / 1000.0 for x in args.latency_ms.split(","))
+    report = run_simulation(
+        algorithm=args.algorithm,
+        nodes=args.nodes,
+        ops=args.ops,
+        rate=args.rate,
+        latency=(lat_min, lat_max),
+        bandwidth=args.bandwidth,
+        loss=args.loss,
+        partition_at=args.partition_at,
+        heal_at=args.heal_at,
+        seed=args.seed,
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
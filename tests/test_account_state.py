@@ -0,0 +1,41 @@
+import pytest
+
+from account_state import AccountStore
+
+
+def test_incremental_root_matches_rebuilt_store():
+    store = AccountStore({"KONTO_A": 10000.0, "KONTO_B": 5000.0})
+    before = store.root()
+    store["KONTO_A"] -= 100.0
+    store["KONTO_C"] = 1.0
+    del store["KONTO_C"]
+    store["KONTO_A"] += 100.0
+    assert store.root() == before
+
+    store["KONTO_D"] = 7.0
+    assert store.root() == AccountStore({"KONTO_D": 7.0, "KONTO_B": 5000.0, "KONTO_A": 10000.0}).root()
+    assert store == {"KONTO_A": 10000.0, "KONTO_B": 5000.0, "KONTO_D": 7.0}
+
+
+def test_descent_finds_and_repairs_only_differing_bucket():
+    accounts = {f"KONTO_{i}": float(i) for i in range(200)}
+    reference, replica = AccountStore(accounts), AccountStore(accounts)
+    replica["KONTO_42"] = -1.0
+    replica["KONTO_X"] = 3.0
+
+    level, indices = 0, [0]
+    for _ in range(replica.depth):
+        indices = replica.children(replica.mismatched(level, indices, reference.hashes(level, indices)))
+        level += 1
+    differing = replica.mismatched(level, indices, reference.hashes(level, indices))
+    assert sorted(differing) == sorted({replica.bucket_of("KONTO_42"), replica.bucket_of("KONTO_X")})
+
+    for bucket in differing:
+        replica.replace_bucket(bucket, reference.bucket(bucket))
+    assert replica.root() == reference.root()
+    assert replica == reference
+
+
+def test_bucket_count_must_be_power_of_fanout():
+    with pytest.raises(ValueError):
+        AccountStore(buckets=48, fanout=4)
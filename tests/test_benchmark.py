@@ -0,0 +1,31 @@
+import json
+import pytest
+from tests.benchmark import BenchmarkConfig, parse_mix, percentile, run_benchmark
+
+
+def test_percentile_nearest_rank():
+    values = sorted(float(i) for i in range(1, 1001))
+    assert percentile(values, 50) == 500.0
+    assert percentile(values, 99) == 990.0
+    assert percentile(values, 99.9) == 999.0
+    assert percentile([], 50) is None
+
+
+def test_parse_mix_normalizes_and_validates():
+    mix = parse_mix("deposit=3,withdraw=1")
+    assert mix == {"deposit": 0.75, "withdraw": 0.25}
+    with pytest.raises(ValueError):
+        parse_mix("steal=1")
+
+
+@pytest.mark.asyncio
+async def test_raft_benchmark_reports_throughput_and_latency():
+    config = BenchmarkConfig(algorithm="raft", rates=[50.0], duration=0.3, seed=7)
+    report = await run_benchmark(config)
+
+    result = report["results"][0]
+    assert result["ops_completed"] > 0
+    assert result["ops_failed"] == 0
+    assert result["latency_ms"]["p50"] <= result["latency_ms"]["p99"] <= result["latency_ms"]["max"]
+    assert result["messages_per_op"] > 0
+    json.dumps(report)
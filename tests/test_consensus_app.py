@@ -64,3 +64,531 @@ async def test_two_nodes_raft_mocked():
     # Check that node2 received the entry
     last_entry_node2 = node2.node.log.entries[-1]
     assert last_entry_node2["message"] == "SET x=42"
+
+@pytest.mark.asyncio
+async def test_outgoing_messages_are_coalesced_per_peer():
+    peers = [{"ip": "10.0.0.2", "tcp_port": 5002}, {"ip": "10.0.0.3", "tcp_port": 5003}]
+    server = ConsensusServer(1, 8000, 5000, peers=peers, algorithm="raft")
+
+    batches = []
+    async def mock_send_batch(ip, port, messages):
+        batches.append((ip, port, list(messages)))
+    server.send_tcp_messages = mock_send_batch
+
+    from raft_messages import RaftMessage, RaftMessageType
+    for i in range(50):
+        for peer in peers:
+            msg = RaftMessage(server.ip_addr, peer["ip"], RaftMessageType.APPEND_RESPONSE, 0, {"success": True, "index": i})
+            await server._deliver_outgoing(msg, [], 2)
+
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert sorted((ip, port, len(msgs)) for ip, port, msgs in batches) == [("10.0.0.2", 5002, 50), ("10.0.0.3", 5003, 50)]
+
+@pytest.mark.asyncio
+async def test_election_votes_go_through_outbox():
+    peers = [{"ip": "10.0.0.2", "tcp_port": 5002}, {"ip": "10.0.0.3", "tcp_port": 5003, "role": "learner"}]
+    server = ConsensusServer(1, 8000, 5000, peers=peers, algorithm="raft")
+    batches = []
+    async def mock_send_batch(ip, port, messages):
+        batches.append((ip, [m.message_type.name for m in messages]))
+    server.send_tcp_messages = mock_send_batch
+
+    await server.start_election_raft()
+    assert server._outbox
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert batches == [("10.0.0.2", ["REQUEST_VOTE"])]
+
+@pytest.mark.asyncio
+async def test_batched_frame_is_processed_in_order():
+    server = ConsensusServer(2, 8001, 5001, peers=[{"ip": "10.0.0.1", "tcp_port": 5000}], algorithm="raft")
+    sent = []
+    async def mock_send_batch(ip, port, messages):
+        sent.extend(messages)
+    server.send_tcp_messages = mock_send_batch
+
+    heartbeat = {
+        "from_ip": "10.0.0.1", "to_ip": server.ip_addr, "message_type": "APPEND_ENTRIES",
+        "message_content": {"prev_log_index": -1, "prev_log_term": 0, "entries": [], "leader_commit": -1},
+    }
+    task = asyncio.create_task(server._tcp_inbound_loop())
+    server._inbound.put_nowait({"messages": [dict(heartbeat, term=1), dict(heartbeat, term=2)]})
+    await asyncio.sleep(0.05)
+    task.cancel()
+
+    assert server.node.current_term == 2
+    assert server.node.leader_id == "10.0.0.1"
+    assert len(sent) == 2
+
+@pytest.mark.asyncio
+async def test_follower_acknowledges_before_applying():
+    server = ConsensusServer(2, 8001, 5001, peers=[{"ip": "10.0.0.1", "tcp_port": 5000}], algorithm="raft")
+    server.apply_batch_size = 2
+    sent = []
+    async def mock_send_batch(ip, port, messages):
+        sent.extend(messages)
+    server.send_tcp_messages = mock_send_batch
+
+    entries = [
+        {"request_number": (1, i), "timestamp": str(datetime(2025, 1, 1)), "message": "DEPOSIT;KONTO_A;10"}
+        for i in range(5)
+    ]
+    await server.process_consensus_message({
+        "from_ip": "10.0.0.1", "to_ip": server.ip_addr, "message_type": "APPEND_ENTRIES", "term": 1,
+        "message_content": {"prev_log_index": -1, "prev_log_term": 0, "entries": entries, "leader_commit": 4},
+    })
+
+    # Odpowiedź jest już w kolejce, a maszyna stanów jeszcze nic nie wykonała.
+    assert server.node.commit_index == 4
+    assert server.node.apply_lag() == 5
+    assert server.node.accounts["KONTO_A"] == 10000.0
+
+    assert await server.wait_applied(4, timeout=1.0)
+    status = await server.route_http_request("GET", "/status", "")
+    assert status["apply_lag"] == 0
+    assert server.node.accounts["KONTO_A"] == 10050.0
+
+    await asyncio.sleep(0)
+    assert sent[0].message_content == {"success": True, "index": 4}
+
+def test_parse_peers_with_learner_role():
+    from consensus_server import parse_peers
+    peers = parse_peers("10.0.0.2:5000;10.0.0.3:5000:learner")
+    assert peers == [
+        {"ip": "10.0.0.2", "tcp_port": 5000, "role": "voter"},
+        {"ip": "10.0.0.3", "tcp_port": 5000, "role": "learner"},
+    ]
+    with pytest.raises(ValueError):
+        parse_peers("10.0.0.2:5000:observer")
+
+@pytest.mark.asyncio
+async def test_learners_are_excluded_from_quorums():
+    peers = [
+        {"ip": "10.0.0.2", "tcp_port": 5000, "role": "voter"},
+        {"ip": "10.0.0.3", "tcp_port": 5000, "role": "learner"},
+        {"ip": "10.0.0.4", "tcp_port": 5000, "role": "learner"},
+    ]
+    server = ConsensusServer(1, 8000, 5000, peers=peers, algorithm="raft")
+    server.send_tcp_messages = lambda *args: asyncio.sleep(0)
+    assert server.quorum() == 2
+
+    from raft_messages import RaftMessage, RaftMessageType
+    node = server.node
+    node.current_term = 1
+    node.become_leader(server.all_ips(), [])
+    node.log.append((1, 0), datetime.now(), "DEPOSIT;KONTO_A;1")
+
+    # Potwierdzenia samych learnerów nie zatwierdzają wpisu.
+    for ip in ("10.0.0.3", "10.0.0.4"):
+        msg = RaftMessage(ip, server.ip_addr, RaftMessageType.APPEND_RESPONSE, 1, {"success": True, "index": 0})
+        await server.process_consensus_message(server._message_to_dict(msg))
+    assert node.commit_index == -1
+
+    msg = RaftMessage("10.0.0.2", server.ip_addr, RaftMessageType.APPEND_RESPONSE, 1, {"success": True, "index": 0})
+    await server.process_consensus_message(server._message_to_dict(msg))
+    assert node.commit_index == 0
+
+@pytest.mark.asyncio
+async def test_learner_does_not_vote_or_stand_for_election():
+    server = ConsensusServer(3, 8002, 5002, peers=[{"ip": "10.0.0.1", "tcp_port": 5000, "role": "voter"}], algorithm="raft", role="learner")
+    sent = []
+    async def mock_send_batch(ip, port, messages):
+        sent.extend(messages)
+    server.send_tcp_messages = mock_send_batch
+
+    await server.process_consensus_message({
+        "from_ip": "10.0.0.1", "to_ip": server.ip_addr, "message_type": "REQUEST_VOTE", "term": 1,
+        "message_content": {"candidate_id": "10.0.0.1", "last_log_index": -1, "last_log_term": 0},
+    })
+    await asyncio.sleep(0.01)
+    assert sent[0].message_content == {"granted": False}
+
+    server.node.election_deadline = 0
+    task = asyncio.create_task(server._raft_election_loop())
+    await asyncio.sleep(0.15)
+    task.cancel()
+    assert server.node.role == "follower"
+    assert server.node.current_term == 1
+
+@pytest.mark.asyncio
+async def test_membership_add_promote_and_remove():
+    peers = [{"ip": "10.0.0.2", "tcp_port": 5000}, {"ip": "10.0.0.3", "tcp_port": 5000}]
+    server = ConsensusServer(1, 8000, 5000, peers=peers, algorithm="raft")
+    server.send_tcp_messages = lambda *args: asyncio.sleep(0)
+    node = server.node
+    node.current_term = 1
+    node.become_leader(server.all_ips(), [])
+
+    from raft_messages import RaftMessage, RaftMessageType
+    async def ack(ip, index):
+        msg = RaftMessage(ip, server.ip_addr, RaftMessageType.APPEND_RESPONSE, 1, {"success": True, "index": index})
+        await server.process_consensus_message(server._message_to_dict(msg))
+
+    result = await server.route_http_request("POST", "/membership", '{"action": "add", "ip": "10.0.0.4", "tcp_port": 5000}')
+    assert result["success"]
+    assert server.peers_by_ip["10.0.0.4"]["role"] == "learner"
+    assert server.quorum() == 2
+
+    # Kolejna zmiana musi poczekać na zatwierdzenie poprzedniej.
+    busy = server.change_membership("remove", "10.0.0.3")
+    assert not busy["success"]
+
+    await ack("10.0.0.2", 0)
+    assert node.commit_index == 0
+    await ack("10.0.0.4", 0)
+    server._promote_caught_up_learners()
+    assert server.peers_by_ip["10.0.0.4"]["role"] == "voter"
+    assert server.quorum() == 3
+
+    await ack("10.0.0.2", 1)
+    await ack("10.0.0.4", 1)
+    assert node.commit_index == 1
+    class FakeWriter:
+        closed = False
+        def close(self):
+            self.closed = True
+    links = {(ip, lane): FakeWriter() for ip in ("10.0.0.2", "10.0.0.3") for lane in (0, 1)}
+    server._links.update(links)
+    assert server.change_membership("remove", "10.0.0.3")["success"]
+    assert "10.0.0.3" not in server.peers_by_ip
+    assert sorted(server._links) == [("10.0.0.2", 0), ("10.0.0.2", 1)]
+    assert links[("10.0.0.3", 0)].closed and links[("10.0.0.3", 1)].closed
+    assert not links[("10.0.0.2", 0)].closed
+    assert server.quorum() == 2
+
+    status = await server.route_http_request("GET", "/membership", "")
+    assert [m["ip"] for m in status["members"]] == ["10.0.0.2", "10.0.0.4", server.ip_addr]
+    assert status["committed"] is False
+
+@pytest.mark.asyncio
+async def test_follower_adopts_and_reverts_uncommitted_config():
+    server = ConsensusServer(2, 8001, 5001, peers=[{"ip": "10.0.0.1", "tcp_port": 5000}], algorithm="raft")
+    server.send_tcp_messages = lambda *args: asyncio.sleep(0)
+    config = 'CONFIG;[{"ip": "10.0.0.1", "tcp_port": 5000, "role": "voter"}, {"ip": "127.0.0.1", "tcp_port": 5001, "role": "voter"}, {"ip": "10.0.0.5", "tcp_port": 5000, "role": "learner"}]'
+    entry = {"request_number": (1, 0), "timestamp": str(datetime(2025, 1, 1)), "message": config}
+
+    def append(term, entries, prev_index=-1, prev_term=0):
+        return server.process_consensus_message({
+            "from_ip": "10.0.0.1", "to_ip": server.ip_addr, "message_type": "APPEND_ENTRIES", "term": term,
+            "message_content": {"prev_log_index": prev_index, "prev_log_term": prev_term, "entries": entries, "leader_commit": -1},
+        })
+
+    await append(1, [entry])
+    assert server.peers_by_ip["10.0.0.5"]["role"] == "learner"
+    assert server.node.learners == {"10.0.0.5"}
+    assert "10.0.0.5" in server.node.match_tracker and len(server.node.match_tracker) == 2
+
+    # Nowy lider nadpisuje niezatwierdzony wpis CONFIG - konfiguracja wraca do startowej.
+    replacement = {"request_number": (2, 0), "timestamp": str(datetime(2025, 1, 1)), "message": "DEPOSIT;KONTO_A;1"}
+    await append(2, [replacement])
+    assert list(server.peers_by_ip) == ["10.0.0.1"]
+    assert server.node.learners == set()
+    assert "10.0.0.5" not in server.node.match_tracker
+
+@pytest.mark.asyncio
+async def test_follower_replaces_config_overwritten_at_the_same_index():
+    server = ConsensusServer(2, 8001, 5001, peers=[{"ip": "10.0.0.1", "tcp_port": 5000}], algorithm="raft")
+    server.send_tcp_messages = lambda *args: asyncio.sleep(0)
+    members = '[{"ip": "10.0.0.1", "tcp_port": 5000, "role": "voter"}, {"ip": "127.0.0.1", "tcp_port": 5001, "role": "voter"}, {"ip": "%s", "tcp_port": 5000, "role": "learner"}]'
+
+    def append(term, learner):
+        entry = {"request_number": (term, 0), "timestamp": str(datetime(2025, 1, 1)), "message": "CONFIG;" + members % learner}
+        return server.process_consensus_message({
+            "from_ip": "10.0.0.1", "to_ip": server.ip_addr, "message_type": "APPEND_ENTRIES", "term": term,
+            "message_content": {"prev_log_index": -1, "prev_log_term": 0, "entries": [entry], "leader_commit": -1},
+        })
+
+    await append(1, "10.0.0.5")
+    assert server.node.learners == {"10.0.0.5"}
+
+    # Nowy lider obcina niezatwierdzony CONFIG i wstawia inny na tę samą pozycję.
+    await append(2, "10.0.0.6")
+    assert server.node.log.last_config_index() == 0
+    assert server.node.learners == {"10.0.0.6"}
+    assert sorted(server.peers_by_ip) == ["10.0.0.1", "10.0.0.6"]
+    assert "10.0.0.5" not in server.node.match_tracker
+
+def test_leadership_transfer_catches_up_target_then_times_it_out():
+    from raft_nodes import Node
+    ips = ["10.0.0.1", "10.0.0.2", "10.0.0.3"]
+    nodes = {ip: Node(ip, True, i, logger=lambda *a: None) for i, ip in enumerate(ips, 1)}
+    leader, target = nodes["10.0.0.1"], nodes["10.0.0.2"]
+    leader.current_term = 1
+    leader.become_leader(ips, [])
+    for i in range(3):
+        leader.log.append((1, i), datetime.now(), "DEPOSIT;KONTO_A;1")
+
+    def route(pool, drop_to=()):
+        while pool:
+            msg = pool.pop(0)
+            if msg.to_ip in drop_to: continue
+            nodes[msg.to_ip].receive_message(msg, pool, 2, ips)
+
+    pool = []
+    leader.start_leadership_transfer("10.0.0.2", pool, ips)
+    assert leader.transfer_in_progress()
+    assert [m.message_type.name for m in pool] == ["APPEND_ENTRIES"]
+
+    route(pool, drop_to=("10.0.0.3",))
+    assert len(target.log) == 3
+    assert target.role == "leader"
+    assert target.current_term == 2
+    assert leader.role == "follower"
+    assert leader.leader_id == "10.0.0.2"
+    assert not leader.transfer_in_progress()
+
+@pytest.mark.asyncio
+async def test_proposals_are_rejected_during_transfer():
+    server = ConsensusServer(1, 8000, 5000, peers=[{"ip": "10.0.0.2", "tcp_port": 5000}, {"ip": "10.0.0.3", "tcp_port": 5000}], algorithm="raft")
+    server.send_tcp_messages = lambda *args: asyncio.sleep(0)
+    server.node.current_term = 1
+    server.node.become_leader(server.all_ips(), [])
+
+    result = await server.transfer_leadership("10.0.0.2", timeout=0.05)
+    assert not result["success"]
+    rejected = await server.route_http_request("POST", "/propose", '{"operation": "DEPOSIT;KONTO_A;1"}')
+    assert rejected["error"] == "Leadership transfer in progress"
+
+    server.node.transfer_deadline = 0
+    assert not server.node.transfer_in_progress()
+    assert (await server.transfer_leadership("10.0.0.9"))["error"] == "10.0.0.9 is not a voting member"
+
+def test_timing_is_derived_from_rtt_and_adopted_by_followers():
+    from raft_nodes import Node
+    clock = [100.0]
+    ips = ["10.0.0.1", "10.0.0.2"]
+    leader, follower = (Node(ip, True, i, logger=lambda *a: None) for i, ip in enumerate(ips, 1))
+    for node in (leader, follower):
+        node._now = lambda: clock[0]
+    leader.current_term = 1
+    leader.become_leader(ips, [])
+
+    for _ in range(20):
+        pool = []
+        leader.broadcast_append_entries(pool, ips)
+        responses = []
+        follower.receive_message(pool[0], responses, 2, ips)
+        clock[0] += 0.02
+        leader.receive_message(responses[0], [], 2, ips)
+
+    assert abs(leader.srtt["10.0.0.2"] - 0.02) < 1e-9
+    # 2 * RTO = 2 * (20 ms + 4 * ~0) -> 40 ms, poniżej dolnej granicy 50 ms
+    assert leader.heartbeat_interval == 0.05
+    assert leader.election_base == 0.5
+
+    pool = []
+    leader.broadcast_append_entries(pool, ips)
+    follower.receive_message(pool[0], [], 2, ips)
+    assert follower.heartbeat_interval == 0.05
+    assert follower.election_base == 0.5
+    assert follower.election_jitter == 0.25
+
+    follower.configure_timing(election_min=1.0)
+    assert follower.election_base == 1.0
+
+@pytest.mark.asyncio
+async def test_status_reports_timing(monkeypatch):
+    monkeypatch.setenv("RAFT_HEARTBEAT_MAX", "0.1")
+    server = ConsensusServer(1, 8000, 5000, peers=[], algorithm="raft")
+    status = await server.route_http_request("GET", "/status", "")
+    assert status["timing"]["heartbeat_interval"] == 0.1
+    assert status["timing"]["rtt_ms"] == {}
+
+def test_message_lanes():
+    from consensus_server import message_lane, frame_lane, CONTROL_LANE, BULK_LANE
+    assert message_lane("VOTE", {"granted": True}) == CONTROL_LANE
+    assert message_lane("PREPARE", "op") == CONTROL_LANE
+    assert message_lane("APPEND_ENTRIES", {"entries": []}) == CONTROL_LANE
+    assert message_lane("APPEND_ENTRIES", {"entries": [{"message": "x"}]}) == BULK_LANE
+    assert message_lane("ACCEPT", "op") == BULK_LANE
+    assert frame_lane({"messages": [{"message_type": "APPEND_RESPONSE", "message_content": {}}]}) == CONTROL_LANE
+
+@pytest.mark.asyncio
+async def test_inbound_heartbeat_overtakes_queued_entries_from_the_same_leader():
+    server = ConsensusServer(2, 8001, 5001, peers=[{"ip": "10.0.0.1", "tcp_port": 5000}], algorithm="raft")
+    def append(entries):
+        return {"messages": [{"from_ip": "10.0.0.1", "to_ip": server.ip_addr, "message_type": "APPEND_ENTRIES", "term": 1,
+                              "message_content": {"prev_log_index": -1, "prev_log_term": 0, "entries": entries, "leader_commit": -1}}]}
+    bulk = append([{"request_number": (1, 0), "timestamp": str(datetime(2025, 1, 1)), "message": "DEPOSIT;KONTO_A;1"}])
+    heartbeat = append([])
+    server._inbound.put_nowait(bulk)
+    server._inbound.put_nowait(heartbeat)
+
+    assert await server._inbound.get() is heartbeat
+    assert await server._inbound.get() is bulk
+
+@pytest.mark.asyncio
+async def test_lanes_use_separate_persistent_connections():
+    connections = []
+    frames = []
+    from framing import FrameProtocol
+    def factory():
+        connections.append(1)
+        return FrameProtocol(frames.append)
+    listener = await asyncio.get_running_loop().create_server(factory, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+
+    server = ConsensusServer(1, 8000, 5000, peers=[{"ip": "127.0.0.1", "tcp_port": port}], algorithm="raft")
+    from raft_messages import RaftMessage, RaftMessageType
+    bulk = RaftMessage("10.0.0.1", "127.0.0.1", RaftMessageType.APPEND_ENTRIES, 1, {"entries": [{"message": "x" * 100000}]})
+    heartbeat = RaftMessage("10.0.0.1", "127.0.0.1", RaftMessageType.APPEND_ENTRIES, 1, {"entries": []})
+    for _ in range(3):
+        await server.send_tcp_message("127.0.0.1", port, bulk)
+        await server.send_tcp_message("127.0.0.1", port, heartbeat)
+    await asyncio.sleep(0.05)
+
+    assert len(connections) == 2
+    assert len(frames) == 6
+    for lane in (0, 1):
+        server._drop_link("127.0.0.1", lane)
+    listener.close()
+
+def test_thrifty_raft_replicates_to_fastest_quorum():
+    from raft_nodes import Node
+    ips = [f"10.0.0.{i}" for i in range(1, 6)]
+    leader = Node(ips[0], True, 1, logger=lambda *a: None)
+    leader.thrifty = True
+    leader.current_term = 1
+    leader.become_leader(ips, [])
+    leader.srtt = {"10.0.0.2": 0.05, "10.0.0.3": 0.001, "10.0.0.4": 0.002, "10.0.0.5": 0.03}
+    leader.rttvar = {ip: 0.0 for ip in leader.srtt}
+    leader.log.append((1, 0), datetime.now(), "DEPOSIT;KONTO_A;1")
+
+    pool = []
+    leader.replicate(pool, ips, 3)
+    assert sorted(m.to_ip for m in pool) == ["10.0.0.3", "10.0.0.4"]
+
+def test_follower_repairs_diverged_bucket_from_heartbeat_digest():
+    from raft_nodes import Node
+    ips = ["10.0.0.1", "10.0.0.2", "10.0.0.3"]
+    nodes = {ip: Node(ip, True, i, logger=lambda *a: None) for i, ip in enumerate(ips, 1)}
+    leader, follower = nodes["10.0.0.1"], nodes["10.0.0.2"]
+    leader.current_term = 1
+    leader.become_leader(ips, [])
+    follower.accounts["KONTO_B"] = 1.0
+
+    pool = []
+    leader.broadcast_append_entries(pool, ["10.0.0.2"])
+    delivered = []
+    while pool:
+        msg = pool.pop(0)
+        delivered.append(msg.message_type.name)
+        nodes[msg.to_ip].receive_message(msg, pool, 2, ips)
+
+    # Heartbeat, zejście po poziomach drzewa i jeden kubełek - bez przesyłania całego stanu.
+    assert delivered.count("DIGEST_REQUEST") == follower.accounts.depth + 1
+    assert follower.accounts == leader.accounts
+    assert (follower.divergences, follower.repaired_buckets) == (1, 1)
+
+@pytest.mark.asyncio
+async def test_account_history_is_paginated_from_index():
+    server = ConsensusServer(1, 8000, 5000, peers=[], algorithm="raft")
+    ops = ["DEPOSIT;KONTO_A;1", "TRANSFER;KONTO_B;KONTO_C;2", "WITHDRAW;KONTO_A;3", "DEPOSIT;KONTO_C;4",
+           "TRANSFER;KONTO_C;KONTO_A;5"]
+    for i, op in enumerate(ops):
+        server.node.log.append((1, i), datetime.now(), op)
+    server.node.commit_index = len(ops) - 1
+    server.node.apply_committed_entries()
+
+    page = await server.route_http_request("GET", "/accounts/KONTO_A/history?offset=1&limit=2", "")
+    assert page["total"] == 3
+    assert [e["index"] for e in page["entries"]] == [2, 4]
+    assert page["entries"][0]["message"] == "WITHDRAW;KONTO_A;3"
+
+    page = await server.route_http_request("GET", "/accounts/KONTO_C/history", "")
+    assert [e["index"] for e in page["entries"]] == [1, 3, 4]
+    assert "error" in await server.route_http_request("GET", "/accounts/KONTO_A/history?limit=0", "")
+
+@pytest.mark.asyncio
+async def test_accounts_at_index_and_time():
+    server = ConsensusServer(1, 8000, 5000, peers=[], algorithm="raft")
+    for i, op in enumerate(["DEPOSIT;KONTO_A;1", "WITHDRAW;KONTO_A;2"]):
+        server.node.log.append((1, i), datetime.now(), op)
+    server.node.commit_index = 1
+    server.node.apply_committed_entries()
+
+    at_first = await server.route_http_request("GET", "/accounts?at_index=0", "")
+    assert at_first["accounts"]["KONTO_A"] == 10001.0
+    before = await server.route_http_request("GET", "/accounts?at_time=2000-01-01T00:00:00", "")
+    assert (before["at_index"], before["accounts"]["KONTO_A"]) == (-1, 10000.0)
+    assert "error" in await server.route_http_request("GET", "/accounts?at_index=x", "")
+
+@pytest.mark.asyncio
+async def test_log_is_paginated_and_streamed_as_chunked_ndjson():
+    import json
+    server = ConsensusServer(1, 8000, 5000, peers=[], algorithm="raft")
+    for i in range(5):
+        server.node.log.append((1, i), datetime.now(), f"DEPOSIT;KONTO_A;{i}")
+
+    page = await server.route_http_request("GET", "/log?from=1&limit=3", "")
+    assert [e["message"] for e in page["log"]] == ["DEPOSIT;KONTO_A;1", "DEPOSIT;KONTO_A;2", "DEPOSIT;KONTO_A;3"]
+    assert (page["total"], page["next"]) == (5, 4)
+    assert (await server.route_http_request("GET", "/log?from=4", ""))["next"] is None
+
+    class Writer:
+        def __init__(self):
+            self.data, self.drains = b"", 0
+        def write(self, data):
+            self.data += data
+        async def drain(self):
+            self.drains += 1
+
+    writer = Writer()
+    await server.stream_log(writer, "from=1", batch=2)
+    head, _, body = writer.data.partition(b"\r\n\r\n")
+    assert b"Transfer-Encoding: chunked" in head
+    chunks = []
+    while True:
+        size, _, body = body.partition(b"\r\n")
+        if int(size, 16) == 0: break
+        chunks.append(body[:int(size, 16)])
+        body = body[int(size, 16) + 2:]
+    assert len(chunks) == 2 and writer.drains == 3
+    lines = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+    assert [line["index"] for line in lines] == [1, 2, 3, 4]
+
+@pytest.mark.asyncio
+async def test_subscribe_streams_applied_entries_and_follows_new_ones():
+    import json
+    server = ConsensusServer(1, 8000, 5000, peers=[], algorithm="raft")
+    for i in range(4):
+        server.node.log.append((1, i), datetime.now(), f"DEPOSIT;KONTO_A;{i}")
+    server.node.commit_index = 2
+    server.node.apply_committed_entries()
+
+    class Reader:
+        eof = False
+        def at_eof(self):
+            return self.eof
+
+    class Writer:
+        def __init__(self):
+            self.data = b""
+        def write(self, data):
+            self.data += data
+        async def drain(self):
+            pass
+        def is_closing(self):
+            return False
+
+    reader, writer = Reader(), Writer()
+    task = asyncio.create_task(server.subscribe(reader, writer, "from=1", idle=5.0))
+    await asyncio.sleep(0.01)
+    # Wpis 3 jest w logu, ale niezatwierdzony - nie może wyjść w strumieniu.
+    assert b'"index": 3' not in writer.data and len(server._subscribers) == 1
+
+    server.node.commit_index = 3
+    server.node.apply_committed_entries()
+    server._notify_subscribers()
+    await asyncio.sleep(0.01)
+    reader.eof = True
+    server._notify_subscribers()
+    await asyncio.wait_for(task, 1.0)
+
+    body = writer.data.partition(b"\r\n\r\n")[2]
+    lines = [json.loads(line) for line in body.splitlines() if line.startswith(b"{")]
+    assert [line["index"] for line in lines] == [1, 2, 3]
+    assert body.endswith(b"0\r\n\r\n") and server._subscribers == []
@@ -0,0 +1,109 @@
+import random
+
+import pytest
+from consensus_server import ConsensusServer
+from epaxos_messages import EPaxosMessage, EPaxosMessageType
+
+
+def make_epaxos_cluster(n):
+    from epaxos_nodes import Node
+    ips = [f"10.0.0.{i}" for i in range(1, n + 1)]
+    return ips, {ip: Node(ip, True, i, logger=lambda *a: None) for i, ip in enumerate(ips, 1)}
+
+
+def run_pool(nodes, ips, pool, rng=None):
+    delivered = 0
+    while pool:
+        msg = pool.pop(rng.randrange(len(pool)) if rng else 0)
+        delivered += 1
+        nodes[msg.to_ip].receive_message(msg, pool, len(ips) // 2 + 1, ips)
+    return delivered
+
+
+@pytest.mark.asyncio
+async def test_epaxos_selectable_as_algorithm():
+    server = ConsensusServer(1, 8000, 5000, peers=[], algorithm="epaxos")
+    assert server.algorithm == "epaxos"
+    assert server.MessageType is EPaxosMessageType
+
+    result = await server.route_http_request("POST", "/propose", '{"operation": "DEPOSIT;KONTO_A;100"}')
+    assert result["executed"] is True and result["success"] is True
+    assert result["new_state"]["KONTO_A"] == 10100.0
+
+    switched = await server.route_http_request("POST", "/switch_algorithm", '{"algorithm": "paxos"}')
+    assert switched == {"success": True, "algorithm": "paxos"}
+
+
+@pytest.mark.asyncio
+async def test_epaxos_propose_timeout_is_reported_as_failure():
+    server = ConsensusServer(1, 8000, 5000, peers=[{"ip": "10.0.0.9", "tcp_port": 5009}], algorithm="epaxos")
+    server._enqueue_outgoing = lambda message: None
+    # Peer nie odpowiada - instancja nie zostaje zatwierdzona przed timeoutem.
+    result = await server.propose_operation_epaxos("DEPOSIT;KONTO_A;100", timeout=0.05)
+    assert (result["success"], result["executed"]) == (False, False)
+    assert "error" in result
+
+
+def test_concurrent_deposits_commit_on_fast_path_from_every_replica():
+    ips, nodes = make_epaxos_cluster(4)
+    pool = []
+    for amount, ip in enumerate(ips, 1):
+        nodes[ip].propose(pool, ips, f"DEPOSIT;KONTO_A;{amount}")
+    delivered = run_pool(nodes, ips, pool)
+
+    # PRE_ACCEPT, PRE_ACCEPT_OK i COMMIT do trzech pozostałych replik na każdą operację
+    assert delivered == 4 * 3 * 3
+    assert all(node.fast_commits == 1 and node.slow_commits == 0 for node in nodes.values())
+    assert all(node.accounts["KONTO_A"] == 10010.0 for node in nodes.values())
+
+
+def test_interfering_operations_execute_in_the_same_order_everywhere():
+    ips, nodes = make_epaxos_cluster(4)
+    rng = random.Random(3)
+    ops = ["DEPOSIT;KONTO_A;5", "WITHDRAW;KONTO_A;7000", "TRANSFER;KONTO_A;KONTO_B;3000", "WITHDRAW;KONTO_B;6000"]
+    for _ in range(20):
+        pool = []
+        for ip in ips:
+            nodes[ip].propose(pool, ips, rng.choice(ops))
+        run_pool(nodes, ips, pool, rng)
+
+    states = [node.accounts for node in nodes.values()]
+    assert all(state == states[0] for state in states)
+    assert all(len(node.log) == 80 for node in nodes.values())
+    assert sum(node.slow_commits for node in nodes.values()) > 0
+
+
+def test_dependency_cycle_is_executed_by_seq():
+    ips, nodes = make_epaxos_cluster(3)
+    node = nodes[ips[2]]
+    commit = lambda instance, command, seq, deps: EPaxosMessage(
+        ips[0], node.ip_addr, EPaxosMessageType.COMMIT, instance, {"command": command, "seq": seq, "deps": deps})
+
+    node.receive_message(commit("1.0", "WITHDRAW;KONTO_A;10000", 2, [[2, 0]]), [], 2, ips)
+    assert len(node.log) == 0
+    node.receive_message(commit("2.0", "DEPOSIT;KONTO_A;500", 1, [[1, 0]]), [], 2, ips)
+
+    assert [e["instance"] for e in node.log.entries] == ["2.0", "1.0"]
+    assert node.accounts["KONTO_A"] == 500.0
+
+
+@pytest.mark.parametrize("order", ["reverse", "first_last"])
+def test_commits_recheck_only_unblocked_instances(order):
+    ips, nodes = make_epaxos_cluster(3)
+    node = nodes[ips[2]]
+    traversals = []
+    execute_from = node._execute_from
+    node._execute_from = lambda root: traversals.append(root) or execute_from(root)
+    n = 200
+    commits = [EPaxosMessage(ips[0], node.ip_addr, EPaxosMessageType.COMMIT, f"1.{k}",
+                             {"command": "WITHDRAW;KONTO_A;1", "seq": k + 1, "deps": [[1, k - 1]] if k else []})
+               for k in range(n)]
+    # Łańcuch zależności zatwierdzany od końca albo z pierwszą instancją na samym końcu.
+    commits = commits[::-1] if order == "reverse" else commits[1:] + commits[:1]
+    for message in commits:
+        node.receive_message(message, [], 2, ips)
+
+    assert [e["instance"] for e in node.log.entries] == [f"1.{k}" for k in range(n)]
+    assert node.accounts["KONTO_A"] == 10000.0 - n
+    assert len(traversals) <= 2 * n
+    assert not node._blocked and not node._blocked_by
@@ -31,10 +31,10 @@ async def test_paxos_propose_flow():
 
     # Mockowanie wysyłania (nie chcemy otwierać socketów)
     sent_messages = []
-    async def mock_send(ip, port, message):
-        sent_messages.append(message)
+    async def mock_send(ip, port, messages):
+        sent_messages.extend(messages)
     
-    server.send_tcp_message = mock_send
+    server.send_tcp_messages = mock_send
 
     # Wywołujemy metodę serwera, która rozpoczyna Paxos
     operation = "TRANSFER;A;B;10"
@@ -121,4 +121,480 @@ async def test_two_nodes_paxos_prepare_promise():
         
         # 4. Próbujemy ponownie nową transakcją (teraz powinno się udać)
         success_retry = server.node.try_lock_all("TX_NEW", ["KONTO_A"])
-        assert success_retry is True
\ No newline at end of file
+        assert success_retry is True
+
+
+def _accepted(from_ip, round_id, value):
+    return PaxosMessage(from_ip, "127.0.0.1", PaxosMessageType.ACCEPTED, round_id, value)
+
+@pytest.mark.asyncio
+async def test_paxos_learner_state_is_collected_after_decision():
+    server = ConsensusServer(1, 8000, 5000, peers=[], algorithm="paxos")
+    node = server.node
+    ips = ["10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.4"]
+    value = "DEPOSIT;KONTO_A;100"
+
+    # Duplikat od tego samego akceptora nie może zaliczyć się do kworum
+    node.receive_message(_accepted(ips[0], "1.1", value), [], 3, ips)
+    node.receive_message(_accepted(ips[0], "1.1", value), [], 3, ips)
+    node.receive_message(_accepted(ips[1], "1.1", value), [], 3, ips)
+    assert len(node.log) == 0
+
+    node.receive_message(_accepted(ips[2], "1.1", value), [], 3, ips)
+    assert len(node.log) == 1
+    assert node.accounts["KONTO_A"] == 10100.0
+    assert node.decided_watermark == (1, 1)
+    assert node.accepted_phase_values == {}
+
+    # Spóźnione ACCEPTED zamkniętej rundy nie odtwarza stanu
+    node.receive_message(_accepted(ips[3], "1.1", value), [], 3, ips)
+    assert node.accepted_phase_values == {}
+    assert len(node.log) == 1
+
+def test_round_reaching_quorum_after_higher_decision_is_applied():
+    ips, nodes = make_paxos_cluster(3)
+    node = nodes[ips[0]]
+    for ip in ips[:2]:
+        node.receive_message(_accepted(ip, "2.2", "DEPOSIT;KONTO_A;5"), [], 2, ips)
+    for ip in ips[:2]:
+        node.receive_message(_accepted(ip, "1.1", "DEPOSIT;KONTO_B;7"), [], 2, ips)
+
+    assert node.decided_values == {(2, 2): "DEPOSIT;KONTO_A;5", (1, 1): "DEPOSIT;KONTO_B;7"}
+    assert (node.accounts["KONTO_A"], node.accounts["KONTO_B"]) == (10005.0, 5007.0)
+    assert node.decided_watermark == (2, 2) and node.accepted_phase_values == {}
+
+@pytest.mark.asyncio
+async def test_paxos_log_entries_view():
+    server = ConsensusServer(1, 8000, 5000, peers=[], algorithm="paxos")
+    stamp = datetime(2025, 1, 2, 3, 4, 5)
+    for i in range(3):
+        server.node.log.append((i + 1, 1), f"DEPOSIT;KONTO_A;{i}", stamp)
+
+    entries = server.node.log.entries
+    assert len(entries) == 3
+    assert entries[-1] == {"request_number": (3, 1), "timestamp": str(stamp), "message": "DEPOSIT;KONTO_A;2"}
+    assert [e["message"] for e in entries[1:]] == ["DEPOSIT;KONTO_A;1", "DEPOSIT;KONTO_A;2"]
+
+
+def make_paxos_cluster(n, **flags):
+    from paxos_nodes import Node
+    ips = [f"10.0.0.{i}" for i in range(1, n + 1)]
+    nodes = {}
+    for i, ip in enumerate(ips, 1):
+        node = Node(ip, True, i, logger=lambda *a: None)
+        for name, value in flags.items():
+            setattr(node, name, value)
+        nodes[ip] = node
+    return ips, nodes
+
+
+def run_pool(nodes, ips, pool, quorum, drop_to=()):
+    delivered = 0
+    while pool:
+        msg = pool.pop(0)
+        if msg.to_ip in drop_to: continue
+        delivered += 1
+        nodes[msg.to_ip].receive_message(msg, pool, quorum, ips)
+    return delivered
+
+
+def test_thrifty_distinguished_learner_cuts_messages():
+    ips, nodes = make_paxos_cluster(5)
+    proposer = nodes[ips[0]]
+    proposer.message_content = "DEPOSIT;KONTO_A;1"
+    pool = []
+    proposer.broadcast_phase(pool, ips, 3, "DEPOSIT;KONTO_A;1", PaxosMessageType.PREPARE, "1.1")
+    classic = run_pool(nodes, ips, pool, 3)
+
+    ips, nodes = make_paxos_cluster(5, thrifty=True, distinguished_learner=True)
+    proposer = nodes[ips[0]]
+    proposer.message_content = "DEPOSIT;KONTO_A;1"
+    pool = []
+    proposer.broadcast_phase(pool, ips, 3, "DEPOSIT;KONTO_A;1", PaxosMessageType.PREPARE, "1.1")
+    thrifty = run_pool(nodes, ips, pool, 3)
+
+    assert (classic, thrifty) == (40, 16)
+    assert all(node.log.entries[-1]["message"] == "DEPOSIT;KONTO_A;1" for node in nodes.values())
+
+
+def test_thrifty_phase_falls_back_to_remaining_nodes():
+    ips, nodes = make_paxos_cluster(5, thrifty=True)
+    proposer = nodes[ips[0]]
+    clock = [0.0]
+    proposer._now = lambda: clock[0]
+    proposer.message_content = "DEPOSIT;KONTO_A;1"
+
+    pool = []
+    proposer.broadcast_phase(pool, ips, 3, "DEPOSIT;KONTO_A;1", PaxosMessageType.PREPARE, "1.1")
+    slow = [m.to_ip for m in pool if m.to_ip != proposer.ip_addr]
+    run_pool(nodes, ips, pool, 3, drop_to=slow)
+    assert not proposer.accept_sent
+
+    proposer.expire_pending_phase(pool)
+    assert pool == []
+    clock[0] += proposer.thrifty_timeout
+    proposer.expire_pending_phase(pool)
+    assert sorted(m.to_ip for m in pool) == sorted(set(ips) - set(slow) - {proposer.ip_addr})
+    run_pool(nodes, ips, pool, 3)
+    assert len(proposer.log) == 1
+
+
+def test_late_decision_does_not_clobber_newer_proposal():
+    ips, nodes = make_paxos_cluster(3)
+    node = nodes[ips[1]]
+    node.message_content = "DEPOSIT;KONTO_A;2"
+    node.proposer_round_id = (2, 2)
+    node.receive_message(PaxosMessage(ips[0], node.ip_addr, PaxosMessageType.DECIDED, "1.1", "DEPOSIT;KONTO_A;1"), [], 2, ips)
+
+    assert node.log.entries[-1]["message"] == "DEPOSIT;KONTO_A;1"
+    assert node.message_content == "DEPOSIT;KONTO_A;2"
+
+
+def test_flexible_quorums_decide_with_smaller_phase2():
+    ips, nodes = make_paxos_cluster(5, phase1_quorum=4, phase2_quorum=2)
+    proposer = nodes[ips[0]]
+    proposer.message_content = "DEPOSIT;KONTO_A;1"
+    pool = []
+    proposer.broadcast_phase(pool, ips, 3, "DEPOSIT;KONTO_A;1", PaxosMessageType.PREPARE, "1.1")
+    # Trzy obietnice to większość, ale za mało dla Q1=4
+    run_pool(nodes, ips, pool, 3, drop_to=ips[3:])
+    assert not proposer.accept_sent
+
+    ips, nodes = make_paxos_cluster(5, phase1_quorum=4, phase2_quorum=2)
+    proposer = nodes[ips[0]]
+    proposer.message_content = "DEPOSIT;KONTO_A;1"
+    pool = []
+    proposer.broadcast_phase(pool, ips, 3, "DEPOSIT;KONTO_A;1", PaxosMessageType.PREPARE, "1.1")
+    # Tylko propozytor i jeden akceptor odpowiadają na ACCEPT - to wystarcza dla Q2=2
+    while pool:
+        msg = pool.pop(0)
+        if msg.message_type == PaxosMessageType.ACCEPT and msg.to_ip not in ips[:2]: continue
+        nodes[msg.to_ip].receive_message(msg, pool, 3, ips)
+    assert len(proposer.log) == 1
+
+
+def test_invalid_flexible_quorums_rejected_at_startup(monkeypatch):
+    peers = [{"ip": f"10.0.0.{i}", "tcp_port": 5000 + i} for i in range(2, 6)]
+    monkeypatch.setenv("PAXOS_Q1", "2")
+    monkeypatch.setenv("PAXOS_Q2", "3")
+    with pytest.raises(ValueError):
+        ConsensusServer(1, 8000, 5000, peers=peers, algorithm="paxos")
+
+    monkeypatch.setenv("PAXOS_Q1", "4")
+    monkeypatch.delenv("PAXOS_Q2")
+    server = ConsensusServer(1, 8000, 5000, peers=peers, algorithm="paxos")
+    assert (server.node.phase1_quorum, server.node.phase2_quorum) == (4, 2)
+
+
+@pytest.mark.parametrize("algorithm", ["raft", "epaxos"])
+def test_invalid_flexible_quorums_ignored_by_other_algorithms(monkeypatch, algorithm):
+    peers = [{"ip": f"10.0.0.{i}", "tcp_port": 5000 + i} for i in range(2, 6)]
+    monkeypatch.setenv("PAXOS_Q1", "2")
+    monkeypatch.setenv("PAXOS_Q2", "3")
+    server = ConsensusServer(1, 8000, 5000, peers=peers, algorithm=algorithm)
+    assert server.algorithm == algorithm
+
+
+@pytest.mark.asyncio
+async def test_switch_to_paxos_with_invalid_quorums_keeps_previous_node(monkeypatch):
+    peers = [{"ip": f"10.0.0.{i}", "tcp_port": 5000 + i} for i in range(2, 6)]
+    server = ConsensusServer(1, 8000, 5000, peers=peers, algorithm="raft")
+    node = server.node
+    monkeypatch.setenv("PAXOS_Q1", "2")
+    monkeypatch.setenv("PAXOS_Q2", "2")
+
+    result = await server.route_http_request("POST", "/switch_algorithm", '{"algorithm": "paxos"}')
+    assert result["success"] is False
+    assert (server.algorithm, server.node) == ("raft", node)
+    status = await server.route_http_request("GET", "/status", "")
+    assert status["algorithm"] == "raft"
+
+    # Błąd samej inicjalizacji (już po sprawdzeniu konfiguracji) też przywraca poprzedni węzeł.
+    monkeypatch.delenv("PAXOS_Q1")
+    monkeypatch.delenv("PAXOS_Q2")
+    import paxos_nodes
+    def broken_init(self, *args, **kwargs):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(paxos_nodes.Node, "__init__", broken_init)
+
+    result = await server.route_http_request("POST", "/switch_algorithm", '{"algorithm": "paxos"}')
+    assert result == {"success": False, "error": "boom", "algorithm": "raft"}
+    assert (server.algorithm, server.node) == ("raft", node)
+
+
+def test_commutative_deposits_commit_on_fast_path():
+    ips, nodes = make_paxos_cluster(5)
+    outcomes = {}
+    pool = []
+    for ip, amount in ((ips[0], 1), (ips[3], 2)):
+        nodes[ip].on_fast_outcome = lambda op_id, ok: outcomes.__setitem__(op_id, ok)
+        nodes[ip].start_fast_proposal(pool, ips, f"DEPOSIT;KONTO_A;{amount}")
+    delivered = run_pool(nodes, ips, pool, 3)
+
+    assert sorted(outcomes.values()) == [True, True]
+    assert delivered == 2 * 3 * 5
+    assert all(node.accounts["KONTO_A"] == 10003.0 and len(node.log) == 2 for node in nodes.values())
+
+
+def test_conflicting_fast_operation_falls_back():
+    ips, nodes = make_paxos_cluster(3)
+    for node in nodes.values():
+        node.accepted_value, node.highest_accepted_id = "WITHDRAW;KONTO_A;50", (1, 1)
+    outcomes = []
+    nodes[ips[1]].on_fast_outcome = lambda op_id, ok: outcomes.append(ok)
+    pool = []
+    nodes[ips[1]].start_fast_proposal(pool, ips, "DEPOSIT;KONTO_A;1")
+    run_pool(nodes, ips, pool, 2)
+    assert outcomes == [False]
+    assert all(not node.fast_pending and len(node.log) == 0 for node in nodes.values())
+
+    # Rozłączne konto nie koliduje z WITHDRAW w toku
+    nodes[ips[1]].start_fast_proposal(pool, ips, "DEPOSIT;KONTO_B;1")
+    run_pool(nodes, ips, pool, 2)
+    assert outcomes == [False, True]
+
+
+def test_decision_waits_for_conflicting_fast_operation():
+    ips, nodes = make_paxos_cluster(3)
+    node = nodes[ips[2]]
+    node.accounts["KONTO_A"] = 0.0
+    node.receive_message(PaxosMessage(ips[0], node.ip_addr, PaxosMessageType.FAST_ACCEPT, "1.1", "DEPOSIT;KONTO_A;100"), [], 2, ips)
+    # Decyzja rundy 2.2 przyszła, zanim koordynator zatwierdził depozyt uzgodniony przed tą rundą
+    node.receive_message(PaxosMessage(ips[1], node.ip_addr, PaxosMessageType.DECIDED, "2.2", "WITHDRAW;KONTO_A;100"), [], 2, ips)
+    assert node.accounts["KONTO_A"] == 0.0 and len(node.log) == 0
+
+    node.receive_message(PaxosMessage(ips[0], node.ip_addr, PaxosMessageType.FAST_COMMIT, "1.1", "0.0;DEPOSIT;KONTO_A;100"), [], 2, ips)
+    assert node.accounts["KONTO_A"] == 0.0
+    assert [e["message"] for e in node.log.entries] == ["DEPOSIT;KONTO_A;100", "WITHDRAW;KONTO_A;100"]
+
+
+def test_learner_without_fast_accept_orders_fast_operation_like_voters():
+    ips, nodes = make_paxos_cluster(3)
+    voter, learner = nodes[ips[1]], nodes[ips[2]]
+    fast, slow = "DEPOSIT;KONTO_A;100", "WITHDRAW;KONTO_A;10050"
+    fast_accept = PaxosMessage(ips[0], voter.ip_addr, PaxosMessageType.FAST_ACCEPT, "1.1", fast)
+    decided = lambda to: PaxosMessage(ips[0], to, PaxosMessageType.DECIDED, "1.1", slow)
+    commit = lambda to: PaxosMessage(ips[0], to, PaxosMessageType.FAST_COMMIT, "1.1", f"0.0;{fast}")
+
+    voter.receive_message(fast_accept, [], 2, ips)
+    voter.receive_message(decided(voter.ip_addr), [], 2, ips)
+    voter.receive_message(commit(voter.ip_addr), [], 2, ips)
+    # Learner nie dostał FAST_ACCEPT: wykonuje wypłatę od razu (brak środków), a depozyt staje przed nią.
+    learner.receive_message(decided(learner.ip_addr), [], 2, ips)
+    assert learner.accounts["KONTO_A"] == 10000.0
+    learner.receive_message(commit(learner.ip_addr), [], 2, ips)
+
+    for node in (voter, learner):
+        assert node.accounts["KONTO_A"] == 50.0
+        assert [e["message"] for e in node.log.entries] == [fast, slow]
+
+
+def _accept(node, round_id, value):
+    return PaxosMessage("10.0.0.1", node.ip_addr, PaxosMessageType.ACCEPT, round_id, value)
+
+
+def test_older_transaction_waits_for_lock_instead_of_retrying():
+    ips, nodes = make_paxos_cluster(3)
+    node = nodes[ips[2]]
+    younger = "WITHDRAW;KONTO_A;100;TX_ID:200-1"
+    older = "WITHDRAW;KONTO_A;50;TX_ID:100-2"
+    pool = []
+    node.receive_message(_accept(node, "1.1", younger), pool, 2, ips)
+    pool.clear()
+
+    node.receive_message(_accept(node, "2.2", older), pool, 2, ips)
+    assert pool == []
+    assert node.locked_accounts == {"KONTO_A": "200-1"}
+
+    node.receive_message(PaxosMessage(ips[0], node.ip_addr, PaxosMessageType.DECIDED, "1.1", younger), pool, 2, ips)
+    assert {(m.message_type, m.message_content) for m in pool} == {(PaxosMessageType.ACCEPTED, older)}
+    assert node.locked_accounts == {"KONTO_A": "100-2"}
+
+
+def test_younger_transaction_dies_and_only_its_proposer_retries():
+    ips, nodes = make_paxos_cluster(3)
+    proposer = nodes[ips[0]]
+    older = "WITHDRAW;KONTO_A;50;TX_ID:100-2"
+    younger = "WITHDRAW;KONTO_A;100;TX_ID:200-1"
+    pool = []
+    for node in nodes.values():
+        node.receive_message(PaxosMessage(ips[1], node.ip_addr, PaxosMessageType.ACCEPT, "1.2", older), pool, 2, ips)
+    pool.clear()
+
+    proposer.set_new_proposal(younger, (2, 1))
+    proposer.send_message(pool, ips, younger, PaxosMessageType.ACCEPT, "2.1")
+    run_pool(nodes, ips, pool, 2)
+    # Akceptorzy odrzucili rundę (wait-die); propozytor czeka na decyzję blokującej transakcji.
+    assert proposer.message_content == "" and list(proposer._lock_retries) == ["200-1"]
+    assert all(not node._lock_retries for node in nodes.values() if node is not proposer)
+
+    pool = [PaxosMessage(ips[1], ip, PaxosMessageType.DECIDED, "1.2", older) for ip in ips]
+    prepares = []
+    while pool:
+        msg = pool.pop(0)
+        if msg.message_type == PaxosMessageType.PREPARE: prepares.append(msg)
+        nodes[msg.to_ip].receive_message(msg, pool, 2, ips)
+    assert {(m.from_ip, m.message_content) for m in prepares} == {(proposer.ip_addr, younger)}
+    assert len(prepares) == 3
+    for node in nodes.values():
+        assert [e["message"] for e in node.log.entries] == [older, younger]
+        assert node.locked_accounts == {}
+    node._apply_decided((9, 9), older)
+    assert node.accounts["KONTO_A"] == 9850.0
+
+
+def test_applied_tx_ids_are_bounded():
+    ips, nodes = make_paxos_cluster(1)
+    node = nodes[ips[0]]
+    node.tx_dedup_window = 2
+    for i in range(3):
+        node._apply_decided((i + 1, 1), f"DEPOSIT;KONTO_A;1;TX_ID:{i}-1")
+    assert list(node.applied_tx_ids) == ["1-1", "2-1"]
+
+
+def _decide_everywhere(nodes, ips, round_id, value, drop_to=()):
+    pool = [PaxosMessage(ips[0], ip, PaxosMessageType.DECIDED, round_id, value) for ip in ips]
+    run_pool(nodes, ips, pool, 2, drop_to)
+
+
+def test_restarted_node_catches_up_in_batches():
+    ips, nodes = make_paxos_cluster(3)
+    for i in range(1, 6):
+        _decide_everywhere(nodes, ips, f"{i}.1", f"WITHDRAW;KONTO_A;{i}")
+    restarted = make_paxos_cluster(3)[1][ips[2]]
+    nodes[ips[2]] = restarted
+    for node in nodes.values():
+        node.catchup_batch = 2
+
+    pool = []
+    restarted.request_catchup(pool, ips)
+    requests = run_pool(nodes, ips, pool, 2) // 2
+
+    assert requests == 3
+    assert restarted.catchup is None
+    assert restarted.accounts == nodes[ips[0]].accounts
+    assert restarted.decided_watermark == (5, 1)
+
+
+def test_late_vote_of_unknown_round_triggers_catchup_to_next_peer():
+    ips, nodes = make_paxos_cluster(3)
+    # Wynik zależy od kolejności: 8000 przed 3000 daje 1000 (druga wypłata odrzucona), odwrotnie - 6000.
+    _decide_everywhere(nodes, ips, "1.1", "WITHDRAW;KONTO_A;1000")
+    lagging = nodes[ips[2]]
+    _decide_everywhere(nodes, ips, "2.1", "WITHDRAW;KONTO_A;8000", drop_to=[lagging.ip_addr])
+    clock = [0.0]
+    lagging._now = lambda: clock[0]
+    _decide_everywhere(nodes, ips, "3.1", "WITHDRAW;KONTO_A;3000")
+    assert lagging.accounts["KONTO_A"] == 6000.0
+
+    pool = [PaxosMessage(ips[0], lagging.ip_addr, PaxosMessageType.ACCEPTED, "2.1", "WITHDRAW;KONTO_A;8000")]
+    # Pierwszy peer w kolejności węzła 3 nie odpowiada.
+    run_pool(nodes, ips, pool, 2, drop_to=[ips[1]])
+    assert lagging.catchup is not None and lagging.catchup.after == (1, 1)
+
+    clock[0] += lagging.catchup_timeout
+    lagging.expire_catchup(pool)
+    assert [m.to_ip for m in pool] == [ips[0]]
+    run_pool(nodes, ips, pool, 2)
+    assert lagging.catchup is None
+    assert lagging.accounts == nodes[ips[0]].accounts and lagging.accounts["KONTO_A"] == 1000.0
+    assert [e["message"] for e in lagging.log.entries] == [e["message"] for e in nodes[ips[0]].log.entries]
+    assert lagging.history.balances_at(1) == nodes[ips[0]].history.balances_at(1)
+
+
+def test_catchup_batch_reorders_state_with_one_rebuild():
+    ips, nodes = make_paxos_cluster(3)
+    lagging = nodes[ips[2]]
+    for i in range(1, 11):
+        _decide_everywhere(nodes, ips, f"{i}.1", f"WITHDRAW;KONTO_A;{1000 * (i % 4) + 500}", drop_to=[lagging.ip_addr])
+    # Późniejsza decyzja dotarła na żywo - wszystkie nadrobione rundy stają przed nią i z nią kolidują.
+    _decide_everywhere(nodes, ips, "11.1", "WITHDRAW;KONTO_A;700")
+    rebuilds = []
+    rebuild = lagging._rebuild_state
+    lagging._rebuild_state = lambda: (rebuilds.append(1), rebuild())
+
+    pool = []
+    lagging.request_catchup(pool, ips)
+    run_pool(nodes, ips, pool, 2)
+
+    assert len(rebuilds) == 1
+    assert lagging.accounts == nodes[ips[0]].accounts
+    assert [e["message"] for e in lagging.log.entries] == [e["message"] for e in nodes[ips[0]].log.entries]
+    assert lagging.synced_through == (11, 1)
+
+
+def _withdrawals(n):
+    # Część wypłat nie przejdzie - wynik zależy od kolejności wykonania.
+    return {i: f"WITHDRAW;KONTO_A;{1000 * (i % 4) + 500}" for i in range(1, n + 1)}
+
+
+def test_decided_state_is_pruned_below_applied_base():
+    ips, nodes = make_paxos_cluster(2)
+    pruned, reference = nodes[ips[0]], nodes[ips[1]]
+    pruned.applied_window = 4
+    values = _withdrawals(20)
+    decided = lambda node, i, value: node.receive_message(
+        PaxosMessage(ips[1], node.ip_addr, PaxosMessageType.DECIDED, f"{i}.1", value), [], 2, ips)
+    for i in [*range(1, 19), 20, 19]:
+        decided(pruned, i, values[i])
+    for i in range(1, 21):
+        decided(reference, i, values[i])
+
+    assert len(pruned._applied) < 8 and len(pruned.decided_values) == len(pruned.decided_rounds) < 8
+    assert pruned.decided_floor > (0, 0)
+    assert pruned.accounts == reference.accounts
+    assert [e["message"] for e in pruned.log.entries] == [e["message"] for e in reference.log.entries]
+    assert pruned._decided_before((1, 2)) == pruned.decided_floor
+
+    # Powtórzona decyzja rundy sprzed decided_floor nie wykonuje się drugi raz.
+    decided(pruned, 1, values[1])
+    assert pruned.accounts == reference.accounts and len(pruned.log) == len(reference.log)
+
+
+def test_catchup_from_pruned_peer_installs_its_base():
+    ips, nodes = make_paxos_cluster(3)
+    for node in nodes.values():
+        node.applied_window = 4
+    restarted = nodes[ips[2]]
+    values = _withdrawals(20)
+    for i in range(1, 21):
+        _decide_everywhere(nodes, ips, f"{i}.1", values[i], drop_to=[restarted.ip_addr])
+    peer = nodes[ips[1]]
+
+    pool = []
+    restarted.request_catchup(pool, ips)
+    run_pool(nodes, ips, pool, 2)
+
+    assert restarted.catchup is None and restarted.synced_through == (20, 1)
+    assert restarted.decided_floor == peer.decided_floor
+    assert restarted.accounts == peer.accounts
+    # Log zaczyna się od stanu bazowego peera.
+    assert [e["message"] for e in restarted.log.entries] == \
+        [e["message"] for e in peer.log.entries][peer._base.log_length:]
+
+
+def test_periodic_sync_recovers_rounds_missed_entirely():
+    ips, nodes = make_paxos_cluster(3)
+    lagging = nodes[ips[2]]
+    clock = [0.0]
+    lagging._now = lambda: clock[0]
+    pool = []
+    lagging.request_catchup(pool, ips)
+    run_pool(nodes, ips, pool, 2)
+    # Węzeł nie dostał żadnej wiadomości tych rund - nie ma głosu, który zdradziłby lukę.
+    for i in range(1, 4):
+        _decide_everywhere(nodes, ips, f"{i}.1", f"WITHDRAW;KONTO_A;{i}000", drop_to=[lagging.ip_addr])
+    assert lagging.catchup is None and lagging.decided_values == {}
+
+    lagging.sync_decisions(pool, ips)
+    assert pool == []
+    clock[0] += lagging.catchup_interval
+    lagging.sync_decisions(pool, ips)
+    run_pool(nodes, ips, pool, 2)
+
+    assert lagging.accounts == nodes[ips[0]].accounts
+    assert lagging.synced_through == (3, 1)
+    # Kolejna synchronizacja pyta następnego peera i tylko o rundy po synced_through.
+    clock[0] += lagging.catchup_interval
+    lagging.sync_decisions(pool, ips)
+    assert [(m.to_ip, m.round_identifier) for m in pool] == [(ips[1], "3.1")]
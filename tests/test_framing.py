@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from framing import FrameProtocol, encode_frame
+
+
+def feed(protocol, data: bytes, chunk: int):
+    """Symuluje transport: kopiuje dane do bufora zwróconego przez get_buffer."""
+    for i in range(0, len(data), chunk):
+        part = data[i:i + chunk]
+        buf = protocol.get_buffer(len(part))
+        buf[:len(part)] = part
+        protocol.buffer_updated(len(part))
+
+
+def test_many_frames_in_one_read():
+    frames = []
+    protocol = FrameProtocol(frames.append)
+    data = b"".join(b"".join(encode_frame({"n": i})) for i in range(100))
+
+    feed(protocol, data, len(data))
+
+    assert [f["n"] for f in frames] == list(range(100))
+
+
+def test_frames_split_across_reads_and_buffer_growth():
+    frames = []
+    protocol = FrameProtocol(frames.append, initial_size=16)
+    big = {"entries": ["x" * 1000] * 200}
+    data = b"".join(encode_frame({"a": 1})) + b"".join(encode_frame(big)) + b"".join(encode_frame({"b": 2}))
+
+    feed(protocol, data, 7)
+
+    assert frames == [{"a": 1}, big, {"b": 2}]
+
+
+def test_utf8_payload_split_inside_multibyte_character():
+    frames = []
+    protocol = FrameProtocol(frames.append)
+    body = '{"konto": "Łódź"}'.encode("utf-8")
+    data = len(body).to_bytes(4, "big") + body
+
+    feed(protocol, data, 16)
+
+    assert frames == [{"konto": "Łódź"}]
+
+
+@pytest.mark.asyncio
+async def test_protocol_over_real_socket():
+    received = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(lambda: FrameProtocol(received.put_nowait), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    _, writer = await asyncio.open_connection("127.0.0.1", port)
+    for i in range(3):
+        writer.writelines(encode_frame({"message_type": "VOTE", "i": i}))
+    await writer.drain()
+
+    got = [await asyncio.wait_for(received.get(), 1.0) for _ in range(3)]
+    writer.close()
+    server.close()
+    await server.wait_closed()
+    assert [g["i"] for g in got] == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_lane_queue_lets_control_overtake_bulk_from_the_same_sender():
+    from framing import LaneQueue
+    queue = LaneQueue(lambda frame: frame["lane"])
+    for i, (source, lane) in enumerate([("a", 1), ("a", 1), ("b", 0), ("a", 0), ("b", 1), ("b", 0)]):
+        queue.put_nowait({"from": source, "lane": lane, "n": i})
+
+    assert queue.qsize() == 6
+    order = [(await queue.get())["n"] for _ in range(6)]
+    # Heartbeat/głos "a" (3) nie czeka za wcześniejszymi paczkami "a" (0, 1); w pasie zostaje FIFO.
+    assert order == [2, 3, 5, 0, 1, 4]
+    assert queue.qsize() == 0
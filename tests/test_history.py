@@ -0,0 +1,60 @@
+import random
+from datetime import datetime
+
+from history import HistoryIndex
+
+
+def _raft_node_with_ops(ops):
+    from raft_nodes import Node
+    node = Node("10.0.0.1", True, 1, logger=lambda *a: None)
+    node.history = HistoryIndex(node.accounts, checkpoint_interval=4)
+    for i, op in enumerate(ops):
+        node.log.append((1, i), datetime.now(), op)
+    node.commit_index = len(ops) - 1
+    return node
+
+
+def test_balances_at_every_index_match_replay():
+    rng = random.Random(5)
+    ops = [rng.choice(["DEPOSIT;KONTO_A;{}", "WITHDRAW;KONTO_B;{}", "TRANSFER;KONTO_A;KONTO_C;{}"]).format(rng.randint(1, 900))
+           for _ in range(30)]
+    ops[7] = "SET x=1"
+    node = _raft_node_with_ops(ops)
+
+    states = {-1: dict(node.accounts)}
+    while node.last_applied < node.commit_index:
+        node.apply_committed_entries(limit=1)
+        states[node.last_applied] = dict(node.accounts)
+
+    for index, state in states.items():
+        assert node.history.balances_at(index) == state
+    assert node.history.last_index_at(7) == 6
+    assert node.history.balances_at(100) == node.accounts
+
+
+
+def _record_all(history, ops, accounts):
+    for i, (op, account) in enumerate(ops):
+        accounts[account] = accounts.get(account, 0.0) + 1
+        history.record(i, op, accounts, float(i))
+
+
+def test_truncate_matches_index_built_from_prefix():
+    ops = [("DEPOSIT;KONTO_A;1", "KONTO_A"), ("DEPOSIT;KONTO_B;1", "KONTO_B")] * 5
+    truncated = HistoryIndex({"KONTO_A": 0.0}, checkpoint_interval=4)
+    _record_all(truncated, ops, {"KONTO_A": 0.0})
+    truncated.truncate(6)
+    # Po obcięciu indeks przyjmuje inną końcówkę jak zbudowany od nowa z prefiksu.
+    tail = [("DEPOSIT;KONTO_B;1", "KONTO_B")] * 3
+    accounts = truncated.balances_at(5)
+    for i, (op, account) in enumerate(tail, 6):
+        accounts[account] += 1
+        truncated.record(i, op, accounts, float(i))
+
+    fresh = HistoryIndex({"KONTO_A": 0.0}, checkpoint_interval=4)
+    _record_all(fresh, ops[:6] + tail, {"KONTO_A": 0.0})
+    assert truncated.page("KONTO_A", 0, 100) == fresh.page("KONTO_A", 0, 100) == [0, 2, 4]
+    assert truncated.page("KONTO_B", 0, 100) == fresh.page("KONTO_B", 0, 100)
+    for index in range(-1, 10):
+        assert truncated.balances_at(index) == fresh.balances_at(index)
+        assert truncated.index_at_time(float(index)) == fresh.index_at_time(float(index))
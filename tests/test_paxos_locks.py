@@ -0,0 +1,31 @@
+from paxos_locks import LockOutcome, LockTable, tx_age, with_tx_id
+
+
+def test_tx_age_compares_timestamps_numerically():
+    assert tx_age("9-1") < tx_age("10-1")
+    assert tx_age("1700000000000000000-2") < tx_age("TX_A")
+
+
+def test_generated_tx_ids_are_ordered_by_submission():
+    first = with_tx_id("WITHDRAW;KONTO_A;1", 2)
+    second = with_tx_id("WITHDRAW;KONTO_A;1", 1)
+    age = lambda operation: tx_age(operation.split("TX_ID:", 1)[1])
+    assert age(first) < age(second)
+    assert with_tx_id("WITHDRAW;KONTO_A;1;TX_ID:TX_A_1", 1) == "WITHDRAW;KONTO_A;1;TX_ID:TX_A_1"
+
+
+def test_older_waits_in_fifo_and_younger_dies():
+    clock = [0.0]
+    table = LockTable(ttl=1.0, now=lambda: clock[0])
+    assert table.acquire("20-1", ["KONTO_A"]) is LockOutcome.GRANTED
+    assert table.acquire("30-1", ["KONTO_A"]) is LockOutcome.DIE
+    assert table.acquire("10-1", ["KONTO_A", "KONTO_B"]) is LockOutcome.WAIT
+    assert table.acquire("5-1", ["KONTO_A"]) is LockOutcome.WAIT
+    # KONTO_B jest wolne, ale transakcja czeka na oba konta naraz.
+    assert "KONTO_B" not in table.holders
+
+    assert table.release("20-1") == ["10-1"]
+    assert table.holders == {"KONTO_A": "10-1", "KONTO_B": "10-1"}
+    clock[0] = 1.0
+    assert table.expire() == ["5-1"]
+    assert table.holders == {"KONTO_A": "5-1"}
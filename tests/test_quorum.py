@@ -0,0 +1,70 @@
+import pytest
+
+from quorum import MatchIndexTracker, QuorumCounter, flexible_quorums
+
+
+def test_quorum_index_follows_updates():
+    tracker = MatchIndexTracker()
+    tracker.reset(["a", "b", "c", "d", "e"])
+    assert tracker.quorum_index(3) == -1
+
+    tracker.update("a", 5)
+    tracker.update("b", 3)
+    assert tracker.quorum_index(3) == -1
+    tracker.update("c", 4)
+    assert tracker.quorum_index(3) == 3
+    tracker.update("d", 7)
+    assert tracker.quorum_index(3) == 4
+
+    tracker.update("x", 100)
+    assert "x" not in tracker
+    assert tracker.quorum_index(3) == 4
+
+
+def test_sync_keeps_indices_of_remaining_voters():
+    tracker = MatchIndexTracker()
+    tracker.reset(["a", "b", "c"])
+    tracker.update("a", 4)
+    tracker.update("b", 2)
+    tracker.sync(["a", "b", "c", "d"])
+    assert len(tracker) == 4
+    assert tracker.get("a") == 4
+    assert tracker.get("d") == -1
+    assert tracker.quorum_index(2) == 2
+
+
+def test_learners_are_tracked_but_not_counted():
+    tracker = MatchIndexTracker()
+    tracker.reset(["a", "b", "c"], learners=["l"])
+    tracker.update("l", 9)
+    tracker.update("a", 2)
+    assert tracker.get("l") == 9 and len(tracker) == 3
+    assert tracker.quorum_index(1) == 2
+
+    tracker.sync(["a", "b", "c", "l"])
+    assert tracker.quorum_index(2) == 2 and tracker.quorum_index(1) == 9
+
+
+def test_quorum_counter_reports_quorum_once():
+    counter = QuorumCounter()
+    key = ((1, 1), b"digest")
+    assert not counter.add(key, "a", 2)
+    assert not counter.add(key, "a", 2)
+    assert counter.add(key, "b", 2)
+    assert not counter.add(key, "c", 2)
+    assert counter.count(key) == 3
+
+    counter.add(((2, 1), b"x"), "a", 2)
+    counter.prune(lambda k: k[0] <= (1, 1))
+    assert key not in counter
+    assert len(counter) == 1
+
+
+def test_flexible_quorums_require_intersection():
+    assert flexible_quorums(5) == (3, 3)
+    assert flexible_quorums(5, 4, 2) == (4, 2)
+    assert flexible_quorums(5, phase2=2) == (4, 2)
+    assert flexible_quorums(5, phase1=5) == (5, 1)
+    for q1, q2 in ((2, 3), (3, 2), (0, 5), (6, 1)):
+        with pytest.raises(ValueError):
+            flexible_quorums(5, q1, q2)
@@ -0,0 +1,93 @@
+from datetime import datetime
+from raft_nodes import Log
+
+
+def make_log(n, term=1):
+    log = Log()
+    for i in range(n):
+        log.append((term, i), datetime(2025, 1, 1, 12, 0, 0, i), f"DEPOSIT;KONTO_A;{i}")
+    return log
+
+
+def test_entries_keep_dict_shape():
+    log = make_log(3)
+    assert len(log) == 3
+    assert log.entries[-1] == {
+        "request_number": (1, 2),
+        "timestamp": str(datetime(2025, 1, 1, 12, 0, 0, 2)),
+        "message": "DEPOSIT;KONTO_A;2",
+    }
+    assert [e["message"] for e in log.entries[1:]] == ["DEPOSIT;KONTO_A;1", "DEPOSIT;KONTO_A;2"]
+    assert log.last_term() == 1 and Log().last_term() == 0
+
+
+def test_wire_entry_round_trip():
+    source = make_log(5)
+    copy = Log()
+    for entry in source.slice(0):
+        copy.append_entry({**entry, "request_number": list(entry["request_number"])})
+    assert copy.slice(0) == source.slice(0)
+
+
+def test_truncate_in_place_and_append_after():
+    log = make_log(10)
+    log.truncate(4)
+    assert len(log) == 4
+    assert log.message_at(3) == "DEPOSIT;KONTO_A;3"
+
+    log.append((2, 4), datetime.now(), "WITHDRAW;KONTO_B;7")
+    assert log.request_number_at(4) == (2, 4)
+    assert log.message_at(4) == "WITHDRAW;KONTO_B;7"
+    assert log.term_at(3) == 1
+
+    log.truncate(0)
+    assert len(log) == 0 and log.slice(0) == []
+
+
+def test_follower_single_scan_conflict_handling():
+    from tests.bench_follower_append import append_entries, follower_with, make_entries
+
+    old = make_entries(1, 0, 10)
+    follower = follower_with(old)
+    pool = []
+    follower.receive_message(append_entries(2, 4, 1, make_entries(2, 5, 3)), pool, 2, ["leader", "follower"])
+
+    assert len(follower.log) == 8
+    assert [follower.log.term_at(i) for i in range(8)] == [1] * 5 + [2] * 3
+    assert pool[-1].message_content == {"success": True, "index": 7}
+
+    # Powtórzona (pasująca) paczka nie obcina dłuższego logu
+    follower = follower_with(old)
+    follower.receive_message(append_entries(1, -1, 0, old[:4]), [], 2, ["leader", "follower"])
+    assert len(follower.log) == 10
+
+
+def test_stale_append_entries_does_not_move_commit_index_back():
+    from tests.bench_follower_append import append_entries, follower_with, make_entries
+
+    old = make_entries(1, 0, 10)
+    follower = follower_with(old)
+    current = append_entries(1, 2, 1, old[3:4])
+    current.message_content["leader_commit"] = 3
+    follower.receive_message(current, [], 2, ["leader", "follower"])
+    assert follower.commit_index == 3
+
+    stale = append_entries(1, 0, 1, old[1:2])
+    stale.message_content["leader_commit"] = 5
+    follower.receive_message(stale, [], 2, ["leader", "follower"])
+    assert follower.commit_index == 3 and len(follower.log) == 10
+
+
+def test_config_entries_are_tracked_across_extend_and_truncate():
+    log = make_log(2)
+    assert log.last_config_index() == -1
+    log.append((1, 2), datetime(2025, 1, 1), 'CONFIG;[{"ip": "a", "tcp_port": 1, "role": "voter"}]')
+    log.extend([
+        {"request_number": (1, 3), "timestamp": str(datetime(2025, 1, 1)), "message": "DEPOSIT;KONTO_A;1"},
+        {"request_number": (1, 4), "timestamp": str(datetime(2025, 1, 1)), "message": "CONFIG;[]"},
+    ])
+    assert log.last_config_index() == 4
+    log.truncate(4)
+    assert log.last_config_index() == 2
+    log.truncate(1)
+    assert log.last_config_index() == -1
@@ -0,0 +1,43 @@
+import contextlib
+import os
+
+from tests.simulator import SimCluster, SimNetwork, Simulator, run_simulation
+
+
+def test_simulation_is_deterministic_for_a_seed():
+    first = run_simulation("raft", nodes=5, ops=300, rate=300, loss=0.02, seed=3)
+    second = run_simulation("raft", nodes=5, ops=300, rate=300, loss=0.02, seed=3)
+
+    first.pop("wall_time_s"), second.pop("wall_time_s")
+    first.pop("messages_per_wall_minute"), second.pop("messages_per_wall_minute")
+    assert first == second
+    assert first["ops_committed"] > 0
+
+
+def test_partition_drops_messages_and_cluster_keeps_committing():
+    report = run_simulation("raft", nodes=5, ops=500, rate=100, partition_at=0.5, heal_at=4.0, seed=5)
+
+    assert report["messages_dropped"] > 0
+    assert report["ops_committed"] > 0
+
+
+def test_paxos_simulation_runs_in_virtual_time():
+    report = run_simulation("paxos", nodes=4, ops=50, rate=20, seed=1)
+
+    assert report["virtual_time_s"] > report["wall_time_s"]
+    assert report["ops_committed"] > 0
+
+
+def test_paxos_nodes_run_on_virtual_clock_and_every_logged_op_counts():
+    sim = Simulator(2)
+    network = SimNetwork(sim, (0.001, 0.005), None, 0.0)
+    cluster = SimCluster("paxos", 4, network)
+    for i in range(100):
+        sim.schedule(i / 200, cluster.propose, f"DEPOSIT;KONTO_A;1;REQ:{i}")
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        sim.run(until=2.0)
+
+    node = cluster.nodes[0]
+    assert node._now() == node.locks._now() == sim.now
+    logged = {entry["message"] for n in cluster.nodes for entry in n.log.entries}
+    assert cluster.completed == len(logged) > 0